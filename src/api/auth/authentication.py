@@ -0,0 +1,33 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from users import archive
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """
+    JWT authentication moving archived users back on their next request.
+
+    Refresh tokens outlive the inactivity window of `archive_inactive_users`,
+    so a user archived while holding valid tokens is restored instead of
+    being rejected and having to log in again by SMS.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            return super().get_user(validated_token)
+        except AuthenticationFailed as error:
+            # simplejwt puts the code of the failure in the detail.
+            if not isinstance(error.detail, dict) or error.detail.get('code') != 'user_not_found':
+                raise
+            if archive.restore_id(validated_token[api_settings.USER_ID_CLAIM]) is None:
+                raise
+        return super().get_user(validated_token)
+
+
+class JWTScheme(SimpleJWTScheme):
+    """Describe the authentication in the schema as simplejwt's."""
+
+    target_class = JWTAuthentication
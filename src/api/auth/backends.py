@@ -0,0 +1,94 @@
+from functools import lru_cache
+
+import jwt
+from django.conf import settings
+from django.utils.text import format_lazy
+from django.utils.translation import gettext_lazy as _
+from jwt.algorithms import get_default_algorithms
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+
+from .keys import get_keyring
+
+ASYMMETRIC_ALGORITHMS = {
+    'RS256', 'RS384', 'RS512',
+    'PS256', 'PS384', 'PS512',
+    'ES256', 'ES384', 'ES512',
+    'EdDSA',
+}
+
+
+class KeyRingTokenBackend(TokenBackend):
+    """
+    Token backend signing with the newest published key of the key ring.
+
+    Tokens carry the `kid` header of the key they were signed with, which
+    is used to pick the verifying key, so previous keys remain valid after
+    a rotation. HMAC algorithms are handled by the default backend.
+    """
+
+    def __init__(self, algorithm, keyring=None, **kwargs):
+        self.keyring = keyring
+        super().__init__(algorithm, **kwargs)
+
+    @property
+    def is_asymmetric(self):
+        return self.algorithm in ASYMMETRIC_ALGORITHMS
+
+    def _validate_algorithm(self, algorithm):
+        if algorithm not in ASYMMETRIC_ALGORITHMS:
+            return super()._validate_algorithm(algorithm)
+        # PyJWT registers the asymmetric algorithms only when cryptography
+        # is installed, the key ring needs it to load the keys anyway.
+        if algorithm not in get_default_algorithms():
+            raise TokenBackendError(
+                format_lazy(_('You must have cryptography installed to use {}.'), algorithm)
+            )
+
+    def get_verifying_key(self, token):
+        if not self.is_asymmetric:
+            return super().get_verifying_key(token)
+
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as ex:
+            raise TokenBackendError(_('Token is invalid or expired')) from ex
+
+        key = self.keyring.get(kid)
+        if key is None:
+            raise TokenBackendError(_('Token is invalid or expired'))
+        return key.public_key
+
+    def encode(self, payload):
+        if not self.is_asymmetric:
+            return super().encode(payload)
+
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+
+        key = self.keyring.signing_key
+        return jwt.encode(
+            jwt_payload,
+            key.private_key,
+            algorithm=self.algorithm,
+            headers={'kid': key.kid},
+            json_encoder=self.json_encoder,
+        )
+
+
+@lru_cache(maxsize=None)
+def get_token_backend():
+    """Return the token backend configured in the settings."""
+    return KeyRingTokenBackend(
+        settings.JWT_ALGORITHM,
+        keyring=get_keyring(),
+        signing_key=api_settings.SIGNING_KEY,
+        audience=api_settings.AUDIENCE,
+        issuer=api_settings.ISSUER,
+        leeway=api_settings.LEEWAY,
+        json_encoder=api_settings.JSON_ENCODER,
+    )
@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from jwt.algorithms import get_default_algorithms
+
+KEY_SUFFIX = '.pem'
+
+KID_FORMAT = '%Y%m%dT%H%M%S%f'
+
+
+def generate_private_key(algorithm):
+    """Generate a private key suitable for the signing algorithm."""
+    if algorithm.startswith(('RS', 'PS')):
+        return rsa.generate_private_key(public_exponent=65537, key_size=3072)
+    if algorithm == 'ES256':
+        return ec.generate_private_key(ec.SECP256R1())
+    if algorithm == 'ES384':
+        return ec.generate_private_key(ec.SECP384R1())
+    if algorithm == 'ES512':
+        return ec.generate_private_key(ec.SECP521R1())
+    if algorithm == 'EdDSA':
+        return ed25519.Ed25519PrivateKey.generate()
+    raise ImproperlyConfigured(
+        f'Cannot generate a signing key for {algorithm}.'
+    )
+
+
+class SigningKey:
+    """Private key of the key ring identified by its key ID."""
+
+    def __init__(self, kid, private_key, created_at):
+        self.kid = kid
+        self.private_key = private_key
+        self.public_key = private_key.public_key()
+        self.created_at = created_at
+
+    def jwk(self, algorithm):
+        """Return the public part of the key as a JWK."""
+        jwk = json.loads(
+            get_default_algorithms()[algorithm].to_jwk(self.public_key)
+        )
+        jwk.update(kid=self.kid, use='sig', alg=algorithm)
+        return jwk
+
+
+class KeyRing:
+    """
+    Signing keys stored as PEM files in a directory.
+
+    The file name without the extension is the key ID. Keys are sorted by
+    their IDs, which `rotate_jwt_key` generates from the creation time. The
+    public parts of all the keys are published, so tokens signed with the
+    previous keys stay valid until they expire or the keys are removed. The
+    directory is rescanned at most once per `reload_seconds`, so a rotation
+    is picked up by running processes.
+
+    A new key is published for `publish_seconds` before it signs tokens, so
+    every process serves it in the key set and the verifiers have refetched
+    the key set by the time tokens carrying its ID appear. Until then the
+    newest of the older keys keeps signing.
+    """
+
+    def __init__(self, directory, algorithm, reload_seconds=60, publish_seconds=120):
+        self.directory = directory
+        self.algorithm = algorithm
+        self.reload_seconds = reload_seconds
+        self.publish_seconds = publish_seconds
+        self._keys = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_kid():
+        """Return a key ID that sorts after the existing ones."""
+        return datetime.now(timezone.utc).strftime(KID_FORMAT)
+
+    @staticmethod
+    def _created_at(kid, path):
+        try:
+            created_at = datetime.strptime(kid, KID_FORMAT)
+        except ValueError:
+            return os.path.getmtime(path)
+        return created_at.replace(tzinfo=timezone.utc).timestamp()
+
+    def _load(self):
+        keys = {}
+        if os.path.isdir(self.directory):
+            for name in sorted(os.listdir(self.directory)):
+                if not name.endswith(KEY_SUFFIX):
+                    continue
+                path = os.path.join(self.directory, name)
+                with open(path, 'rb') as file:
+                    private_key = serialization.load_pem_private_key(
+                        file.read(), password=None
+                    )
+                kid = name[:-len(KEY_SUFFIX)]
+                keys[kid] = SigningKey(kid, private_key, self._created_at(kid, path))
+        return keys
+
+    @property
+    def keys(self):
+        """Return the keys by their IDs, oldest first."""
+        now = time.monotonic()
+        if self._loaded_at is None or now - self._loaded_at > self.reload_seconds:
+            with self._lock:
+                if self._loaded_at is None or now - self._loaded_at > self.reload_seconds:
+                    self._keys = self._load()
+                    self._loaded_at = now
+        return self._keys
+
+    def get(self, kid):
+        """Return the key with the given ID or None."""
+        return self.keys.get(kid)
+
+    @property
+    def signing_key(self):
+        """
+        Return the newest published key, used to sign new tokens.
+
+        When no key has been published long enough, as right after the first
+        key is generated, the oldest key signs.
+        """
+        keys = self.keys
+        if not keys:
+            raise ImproperlyConfigured(
+                f'No JWT signing keys found in {self.directory}, '
+                f'run `manage.py rotate_jwt_key`.'
+            )
+        published_before = time.time() - self.publish_seconds
+        published = [kid for kid, key in keys.items() if key.created_at <= published_before]
+        return keys[max(published) if published else min(keys)]
+
+    def add(self, private_key):
+        """Store a new key, which signs tokens once it has been published."""
+        os.makedirs(self.directory, exist_ok=True)
+        kid = self.new_kid()
+        path = os.path.join(self.directory, f'{kid}{KEY_SUFFIX}')
+        content = private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as file:
+            file.write(content)
+        self._loaded_at = None
+        return kid
+
+    def remove(self, kid):
+        """Remove the key, so tokens signed with it are no longer valid."""
+        os.remove(os.path.join(self.directory, f'{kid}{KEY_SUFFIX}'))
+        self._loaded_at = None
+
+    def jwks(self):
+        """Return the JSON Web Key Set of the public keys."""
+        return {
+            'keys': [key.jwk(self.algorithm) for key in self.keys.values()]
+        }
+
+
+@lru_cache(maxsize=None)
+def get_keyring():
+    """Return the key ring configured in the settings."""
+    return KeyRing(
+        settings.JWT_KEYS_DIR,
+        settings.JWT_ALGORITHM,
+        settings.JWT_KEYS_RELOAD_SECONDS,
+        settings.JWT_KEYS_PUBLISH_SECONDS,
+    )
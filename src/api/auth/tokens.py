@@ -0,0 +1,22 @@
+from rest_framework_simplejwt import tokens
+
+from .backends import get_token_backend
+
+
+class KeyRingTokenMixin:
+    """Use the key ring backend to encode and decode the token."""
+
+    def get_token_backend(self):
+        return get_token_backend()
+
+
+class AccessToken(KeyRingTokenMixin, tokens.AccessToken):
+    pass
+
+
+class RefreshToken(KeyRingTokenMixin, tokens.RefreshToken):
+    access_token_class = AccessToken
+
+
+class UntypedToken(KeyRingTokenMixin, tokens.UntypedToken):
+    pass
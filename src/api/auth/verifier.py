@@ -0,0 +1,111 @@
+"""
+Local verification of the API access tokens.
+
+The module depends on PyJWT (with cryptography) and the standard library
+only, so other services can vendor it to validate tokens without calling
+`/api/v1/auth/jwt/verify/`:
+
+    verifier = JWKSVerifier('https://referral.example.com/.well-known/jwks.json')
+    payload = verifier.verify(request_token)
+
+The key set is cached for the `max-age` of the JWKS response. A token
+signed with an unknown key triggers a refresh, which happens at most once
+per `min_refresh_interval`, so rotated keys are picked up immediately while
+tokens with bogus key IDs cannot flood the API with JWKS requests.
+"""
+
+import json
+import re
+import threading
+import time
+import urllib.request
+
+import jwt
+from jwt.algorithms import get_default_algorithms
+
+MAX_AGE = re.compile(r'max-age=(\d+)')
+
+
+class JWKSVerifier:
+    """Token verifier with a cached JSON Web Key Set."""
+
+    def __init__(self, jwks_url, algorithms=('RS256', 'ES256', 'EdDSA'),
+                 audience=None, issuer=None, token_type='access',
+                 cache_ttl=300, min_refresh_interval=30, timeout=5,
+                 leeway=0):
+        self.jwks_url = jwks_url
+        self.algorithms = list(algorithms)
+        self.audience = audience
+        self.issuer = issuer
+        self.token_type = token_type
+        self.cache_ttl = cache_ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.leeway = leeway
+        self._keys = {}
+        self._expires_at = 0
+        self._fetched_at = None
+        self._lock = threading.Lock()
+
+    def fetch(self):
+        """Fetch the key set, returning the keys and their time to live."""
+        with urllib.request.urlopen(self.jwks_url, timeout=self.timeout) as response:
+            jwks = json.load(response)
+            match = MAX_AGE.search(response.headers.get('Cache-Control', ''))
+        ttl = int(match.group(1)) if match else self.cache_ttl
+
+        keys = {}
+        for jwk in jwks.get('keys', []):
+            if jwk.get('alg') not in self.algorithms:
+                continue
+            algorithm = get_default_algorithms()[jwk['alg']]
+            keys[jwk['kid']] = (jwk['alg'], algorithm.from_jwk(json.dumps(jwk)))
+        return keys, ttl
+
+    def refresh(self, force=False):
+        """Refresh the cached key set if it expired or `force` is set."""
+        with self._lock:
+            now = time.monotonic()
+            if force:
+                if (
+                    self._fetched_at is not None
+                    and now - self._fetched_at < self.min_refresh_interval
+                ):
+                    return
+            elif now < self._expires_at:
+                return
+            self._keys, ttl = self.fetch()
+            self._fetched_at = now
+            self._expires_at = now + ttl
+
+    def get_key(self, kid):
+        """Return the algorithm and the public key with the given ID."""
+        self.refresh()
+        if kid not in self._keys:
+            self.refresh(force=True)
+        try:
+            return self._keys[kid]
+        except KeyError:
+            raise jwt.InvalidTokenError(f'Unknown signing key {kid!r}.')
+
+    def verify(self, token):
+        """
+        Validate the token and return its payload.
+
+        Raises `jwt.InvalidTokenError` if the token is malformed, signed with
+        an unknown key, expired or of another type.
+        """
+        kid = jwt.get_unverified_header(token).get('kid')
+        algorithm, key = self.get_key(kid)
+        payload = jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            audience=self.audience,
+            issuer=self.issuer,
+            leeway=self.leeway,
+            options={'verify_aud': self.audience is not None},
+        )
+        if self.token_type and payload.get('token_type') != self.token_type:
+            raise jwt.InvalidTokenError('Token has wrong type.')
+        return payload
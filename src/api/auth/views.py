@@ -0,0 +1,34 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.views import View
+
+from .backends import ASYMMETRIC_ALGORITHMS
+from .keys import get_keyring
+
+
+class JWKSView(View):
+    """
+    JSON Web Key Set with the public keys verifying the API tokens.
+
+    The set is empty when tokens are signed with a shared secret.
+    """
+
+    def get(self, request, *args, **kwargs):
+        """Return the key set, cacheable for `JWKS_MAX_AGE` seconds."""
+        if settings.JWT_ALGORITHM in ASYMMETRIC_ALGORITHMS:
+            jwks = get_keyring().jwks()
+        else:
+            jwks = {'keys': []}
+        content = json.dumps(jwks, sort_keys=True).encode()
+        etag = '"{}"'.format(hashlib.sha256(content).hexdigest()[:32])
+
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type='application/jwk-set+json')
+        response['ETag'] = etag
+        response['Cache-Control'] = f'public, max-age={settings.JWKS_MAX_AGE}'
+        return response
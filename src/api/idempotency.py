@@ -0,0 +1,133 @@
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+from drf_spectacular.utils import OpenApiParameter
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+IDEMPOTENCY_KEY_PARAMETER = OpenApiParameter(
+    HEADER,
+    str,
+    location=OpenApiParameter.HEADER,
+    description=(
+        'Unique key of the request. Retries with the same key and body get '
+        'the response of the first request instead of running it again.'
+    )
+)
+
+
+class IdempotentMixin:
+    """
+    View mixin replaying the responses of requests with an `Idempotency-Key`.
+
+    The first request with a key runs as usual and its response is stored
+    in the `IDEMPOTENCY_CACHE` cache for `IDEMPOTENCY_WINDOW_SECONDS`.
+    Retries with the same key get the stored response byte for byte, with
+    the `Idempotent-Replayed: true` header. A retry arriving while the first
+    request is still running waits for its response, up to
+    `IDEMPOTENCY_WAIT_SECONDS`, and gets 409 if it is not ready by then.
+    Reusing a key for another request body is rejected with 422. Server
+    errors are not stored, so requests failed with 5xx can be retried.
+    """
+
+    idempotent_methods = ('POST',)
+
+    def dispatch(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if request.method not in self.idempotent_methods or key is None:
+            return super().dispatch(request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return JsonResponse(
+                {'detail': f'{HEADER} must contain 1 to {MAX_KEY_LENGTH} characters.'},
+                status=400
+            )
+
+        cache = caches[settings.IDEMPOTENCY_CACHE]
+        cache_key = 'idempotency:{}:{}'.format(
+            self.__class__.__name__, hashlib.sha256(key.encode()).hexdigest()
+        )
+        lock_key = f'{cache_key}:lock'
+        fingerprint = hashlib.sha256(
+            request.method.encode() + b' ' + request.path.encode() + b'\n' + request.body
+        ).hexdigest()
+
+        response = self.wait_for_response(cache, cache_key, lock_key, fingerprint)
+        if response is not None:
+            return response
+
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            if response.status_code < 500 and not response.streaming:
+                cache.set(cache_key, {
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'headers': list(response.items()),
+                    'content': response.content,
+                }, settings.IDEMPOTENCY_WINDOW_SECONDS)
+        finally:
+            cache.delete(lock_key)
+        return response
+
+    def wait_for_response(self, cache, cache_key, lock_key, fingerprint):
+        """
+        Return the response to replay, or None once this request owns the key.
+
+        Ownership is taken by adding the lock entry, which succeeds for one
+        request only. The others poll the cache, at intervals doubling up to
+        `IDEMPOTENCY_MAX_POLL_SECONDS`, until the stored response appears or
+        the lock is released without one.
+        """
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        delay = settings.IDEMPOTENCY_POLL_SECONDS
+        while True:
+            stored = cache.get(cache_key)
+            if stored is not None:
+                return self.replay(stored, fingerprint)
+            if cache.add(lock_key, (fingerprint, token), settings.IDEMPOTENCY_LOCK_SECONDS):
+                # The first request may have finished between the two calls.
+                stored = cache.get(cache_key)
+                if stored is None:
+                    return None
+                cache.delete(lock_key)
+                return self.replay(stored, fingerprint)
+
+            lock = cache.get(lock_key)
+            if lock is not None and lock[0] != fingerprint:
+                return self.mismatch()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                response = JsonResponse(
+                    {'detail': 'A request with this idempotency key is in progress.'},
+                    status=409
+                )
+                response['Retry-After'] = '1'
+                return response
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, settings.IDEMPOTENCY_MAX_POLL_SECONDS)
+
+    def replay(self, stored, fingerprint):
+        """Return the stored response if it belongs to the same request."""
+        if stored['fingerprint'] != fingerprint:
+            return self.mismatch()
+        response = HttpResponse(stored['content'], status=stored['status'])
+        for header, value in stored['headers']:
+            response[header] = value
+        response[REPLAYED_HEADER] = 'true'
+        return response
+
+    @staticmethod
+    def mismatch():
+        """Return the response to a key reused with another request."""
+        return JsonResponse(
+            {'detail': f'{HEADER} was already used with another request.'},
+            status=422
+        )
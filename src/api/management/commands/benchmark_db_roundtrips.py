@@ -0,0 +1,197 @@
+import asyncio
+import threading
+import time
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+
+from api.profiling import summarize
+from config import db
+from users.models import AuthCode, User
+from users.phones import to_key
+
+PHONE_PREFIX = '+78009'
+
+# name: (server-side binding, prepare threshold, pipeline)
+CONFIGURATIONS = {
+    'client binding': (False, None, False),
+    'client binding, pipeline': (False, None, True),
+    'server binding': (True, None, False),
+    'server binding, prepared': (True, 5, False),
+    'server binding, prepared, pipeline': (True, 5, True),
+}
+
+
+class FastHasher(PBKDF2PasswordHasher):
+    """Single-iteration hasher, so the code hash does not hide the database time."""
+
+    iterations = 1
+
+
+class LatencyProxy:
+    """
+    TCP proxy to the database adding a delay in both directions.
+
+    Counts the round trips of every proxied connection as the number of
+    times the client sends again after a response.
+    """
+
+    def __init__(self, host, port, delay):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.round_trips = 0
+        self.loop = asyncio.new_event_loop()
+        self.listen_port = None
+
+    def start(self):
+        """Start the proxy in a thread and return its port."""
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            server = self.loop.run_until_complete(asyncio.start_server(self.handle, '127.0.0.1', 0))
+            self.listen_port = server.sockets[0].getsockname()[1]
+            started.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=run, name='latency-proxy', daemon=True).start()
+        started.wait()
+        return self.listen_port
+
+    async def handle(self, client_reader, client_writer):
+        upstream_reader, upstream_writer = await asyncio.open_connection(self.host, self.port)
+        state = {'last': None}
+
+        async def pump(reader, writer, direction):
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                if direction == 'request' and state['last'] == 'response':
+                    self.round_trips += 1
+                state['last'] = direction
+                # Scheduled writes keep their order, as they share the delay.
+                self.loop.call_later(self.delay, writer.write, data)
+            self.loop.call_later(self.delay, writer.close)
+
+        await asyncio.gather(
+            pump(client_reader, upstream_writer, 'request'),
+            pump(upstream_reader, client_writer, 'response'),
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the database round trips and latency of the send code and '
+        'login requests with the psycopg 3 binding, prepared statement and '
+        'pipeline options, through a proxy adding network latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Number of timed send code and login requests per configuration.'
+        )
+        parser.add_argument(
+            '--rtt-ms',
+            type=float,
+            default=1.0,
+            help='Round-trip time added by the proxy, in milliseconds.'
+        )
+
+    @staticmethod
+    def count_statements(counter):
+        """Return an execute wrapper counting the statements in the list."""
+        def wrapper(execute, sql, params, many, context):
+            counter.append(sql)
+            return execute(sql, params, many, context)
+        return wrapper
+
+    def run_requests(self, client, proxy, phones, invite_code):
+        """Send a code to and log in each phone, returning the metrics of both requests."""
+        results = {}
+        for name, path in (('send code', '/api/v1/auth/send_code/'), ('login', '/api/v1/auth/jwt/get_by_phone/')):
+            timings, round_trips, statements = [], 0, 0
+            for phone in phones:
+                data = {'phone': phone}
+                if name == 'login':
+                    data.update(code=self.codes[phone], invited_by_code=invite_code)
+                before = proxy.round_trips
+                queries = []
+                with connection.execute_wrapper(self.count_statements(queries)):
+                    started = time.perf_counter()
+                    response = client.post(path, data, content_type='application/json')
+                    timings.append((time.perf_counter() - started) * 1e6)
+                round_trips += proxy.round_trips - before
+                statements += len(queries)
+                if response.status_code != 200:
+                    raise CommandError(f'{name} failed with {response.status_code}: {response.content[:200]}')
+                if name == 'send code':
+                    self.codes[phone] = str(response.json()['code'])
+            results[name] = {
+                'statements': statements / len(phones),
+                'round_trips': round_trips / len(phones),
+                **summarize(timings),
+            }
+        return results
+
+    def handle(self, *args, **options):
+        connection.ensure_connection()
+        if not db.is_psycopg3(connection):
+            raise CommandError('The benchmark needs PostgreSQL with psycopg 3.')
+        inviter = User.objects.exclude(invite_code='').order_by('pk').first()
+        if inviter is None:
+            raise CommandError('No user with an invite code, run seed_users first.')
+
+        settings_dict = connection.settings_dict
+        proxy = LatencyProxy(settings_dict['HOST'] or 'localhost', settings_dict['PORT'] or 5432,
+                             options['rtt_ms'] / 2000)
+        original = {key: settings_dict[key] for key in ('HOST', 'PORT', 'OPTIONS', 'CONN_MAX_AGE')}
+        count = options['requests']
+        all_phones = [f'{PHONE_PREFIX}{number:06d}' for number in range(count * len(CONFIGURATIONS))]
+        all_keys = [to_key(phone) for phone in all_phones]
+        if User.objects.filter(phone_key__in=all_keys).exists():
+            raise CommandError(f'Users with {PHONE_PREFIX} phones exist, the benchmark would delete them.')
+
+        # Keep the connection, so the round trips are those of the statements.
+        settings_dict.update(HOST='127.0.0.1', PORT=str(proxy.start()), CONN_MAX_AGE=None)
+        client = Client()
+        self.codes = {}
+        rows = []
+        try:
+            with override_settings(
+                PASSWORD_HASHERS=[f'{__name__}.FastHasher'],
+                AUTH_CODE_IN_RESPONSE=True,
+                REFERRAL_EVENTS_ENABLED=False,
+            ):
+                for index, (name, (binding, threshold, pipeline)) in enumerate(CONFIGURATIONS.items()):
+                    connection.close()
+                    settings_dict['OPTIONS'] = {**original['OPTIONS'], 'server_side_binding': binding}
+                    if threshold is not None:
+                        settings_dict['OPTIONS']['prepare_threshold'] = threshold
+                    connection.ensure_connection()
+                    phones = all_phones[index * count:(index + 1) * count]
+                    with override_settings(DB_PIPELINE=pipeline):
+                        rows.append((name, self.run_requests(client, proxy, phones, inviter.invite_code)))
+        finally:
+            connection.close()
+            settings_dict.update(original)
+            User.objects.filter(phone_key__in=all_keys).delete()
+            AuthCode.objects.filter(phone_key__in=all_keys).delete()
+
+        self.stdout.write(f'Round-trip time added: {options["rtt_ms"]} ms')
+        self.stdout.write(
+            f'{"configuration":<36}{"request":<11}{"statements":>11}{"round trips":>12}'
+            f'{"mean us":>10}{"p50 us":>10}{"p95 us":>10}'
+        )
+        for name, results in rows:
+            for request, result in results.items():
+                self.stdout.write(
+                    f'{name:<36}{request:<11}{result["statements"]:>11.1f}{result["round_trips"]:>12.1f}'
+                    f'{result["mean"]:>10.1f}{result["p50"]:>10.1f}{result["p95"]:>10.1f}'
+                )
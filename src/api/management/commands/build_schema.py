@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.schema import build_schema, is_stale
+
+
+class Command(BaseCommand):
+    help = 'Generate the OpenAPI schema served by the API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--if-stale',
+            action='store_true',
+            help='Build only if the schema is missing or its sources changed.'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Exit with an error if the schema is missing or out of date.'
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            if is_stale():
+                raise CommandError('The OpenAPI schema is out of date.')
+            self.stdout.write('The OpenAPI schema is up to date.')
+            return
+
+        if options['if_stale'] and not is_stale():
+            self.stdout.write('The OpenAPI schema is up to date.')
+            return
+
+        meta = build_schema()
+        self.stdout.write(self.style.SUCCESS(
+            f'OpenAPI schema built, fingerprint {meta["fingerprint"][:12]}.'
+        ))
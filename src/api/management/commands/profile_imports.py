@@ -0,0 +1,94 @@
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.profiling import import_parents, parse_import_time
+
+# Code run by the profiled interpreter for each target.
+TARGETS = {
+    # Every management command, e.g. migrate and collectstatic.
+    'setup': 'import django; django.setup()',
+    # A server process, which also loads the URL configuration and the views.
+    'server': (
+        'import django; django.setup(); '
+        'from django.urls import get_resolver; get_resolver().url_patterns'
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Report the modules imported at startup with `python -X importtime` '
+        'and check them against the import budget.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            choices=TARGETS,
+            default='server',
+            help='Startup to profile: django.setup() alone or with the URL configuration.'
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=5,
+            help='Number of profiled startups, the median import time is reported.'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=20,
+            help='Number of modules listed by cumulative import time.'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Exit with an error if the startup exceeds the budget in the settings.'
+        )
+
+    def profile(self, target):
+        """Return the modules imported by a new interpreter running the target."""
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', TARGETS[target]],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr[-2000:])
+        return parse_import_time(result.stderr)
+
+    def handle(self, *args, **options):
+        runs = [self.profile(options['target']) for _ in range(options['runs'])]
+        import_ms = statistics.median(sum(module[1] for module in modules) for modules in runs) / 1000
+        modules = runs[-1]
+        parents = import_parents(modules)
+
+        self.stdout.write(f'{"cumulative ms":>14}{"self ms":>9}  module (imported by)')
+        for name, self_us, cumulative_us, _ in sorted(modules, key=lambda module: -module[2])[:options['top']]:
+            parent = parents.get(name)
+            self.stdout.write(
+                f'{cumulative_us / 1000:>14.1f}{self_us / 1000:>9.1f}  {name}'
+                + (f' ({parent})' if parent else '')
+            )
+        self.stdout.write(f'{len(modules)} modules imported in {import_ms:.1f} ms (median of {len(runs)} runs)')
+
+        if not options['check']:
+            return
+        errors = []
+        if settings.IMPORT_TIME_BUDGET_MS and import_ms > settings.IMPORT_TIME_BUDGET_MS:
+            errors.append(f'import time {import_ms:.1f} ms > {settings.IMPORT_TIME_BUDGET_MS} ms')
+        if settings.IMPORT_MODULES_BUDGET and len(modules) > settings.IMPORT_MODULES_BUDGET:
+            errors.append(f'{len(modules)} modules > {settings.IMPORT_MODULES_BUDGET}')
+        imported = {module[0] for module in modules}
+        errors += [
+            f'{name} is imported by {parents.get(name) or "a top-level import"}, it should load lazily'
+            for name in settings.IMPORT_LAZY_MODULES if name in imported
+        ]
+        if errors:
+            raise CommandError('Startup over the import budget: ' + '; '.join(errors))
+        self.stdout.write('The startup is within the import budget.')
@@ -0,0 +1,77 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+
+from api.profiling import parse_import_time, summarize, time_requests
+
+PROFILES = ('default', 'lean')
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the per-request overhead and the startup import time '
+        'of the settings profiles.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default='/api/v1/users/current_user/',
+            help='Path requested to measure the request overhead.'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Number of timed requests per profile.'
+        )
+        parser.add_argument(
+            '--profiles',
+            nargs='+',
+            choices=PROFILES,
+            default=PROFILES,
+        )
+        parser.add_argument('--child', action='store_true', help='Internal.')
+
+    def handle(self, *args, **options):
+        if options['child']:
+            status, timings = time_requests(
+                WSGIHandler(), options['path'], options['requests']
+            )
+            self.stdout.write(json.dumps({'status': status, **summarize(timings)}))
+            return
+
+        rows = []
+        for profile in options['profiles']:
+            result = subprocess.run(
+                [
+                    sys.executable, '-X', 'importtime', sys.argv[0],
+                    'profile_settings', '--child',
+                    '--path', options['path'],
+                    '--requests', str(options['requests']),
+                ],
+                env={**os.environ, 'SETTINGS_PROFILE': profile},
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode:
+                raise CommandError(result.stderr[-2000:])
+            modules = parse_import_time(result.stderr)
+            requests = json.loads(result.stdout.splitlines()[-1])
+            rows.append((profile, len(modules), modules, requests))
+
+        self.stdout.write(
+            f'{"profile":<10}{"modules":>9}{"import ms":>11}'
+            f'{"status":>8}{"mean us":>10}{"p50 us":>10}{"p95 us":>10}'
+        )
+        for profile, count, modules, requests in rows:
+            import_ms = sum(module[1] for module in modules) / 1000
+            self.stdout.write(
+                f'{profile:<10}{count:>9}{import_ms:>11.1f}'
+                f'{requests["status"]:>8}{requests["mean"]:>10.1f}'
+                f'{requests["p50"]:>10.1f}{requests["p95"]:>10.1f}'
+            )
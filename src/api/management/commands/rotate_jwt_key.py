@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.auth.backends import ASYMMETRIC_ALGORITHMS
+from api.auth.keys import generate_private_key, get_keyring
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a new JWT signing key. The new key signs new tokens once it '
+        'has been published for JWT_KEYS_PUBLISH_SECONDS, while the previous '
+        'keys keep verifying the tokens issued before.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--if-missing',
+            action='store_true',
+            help='Generate a key only if the key ring is empty.'
+        )
+        parser.add_argument(
+            '--keep',
+            type=int,
+            default=None,
+            help=(
+                'Number of the newest keys to keep, older keys are removed. '
+                'Remove a key only after the tokens it signed have expired. '
+                'The key that currently signs is never removed.'
+            )
+        )
+
+    def handle(self, *args, **options):
+        algorithm = settings.JWT_ALGORITHM
+        if algorithm not in ASYMMETRIC_ALGORITHMS:
+            if options['if_missing']:
+                return
+            raise CommandError(
+                f'{algorithm} tokens are signed with SIGNING_KEY, '
+                f'set JWT_ALGORITHM to use a key ring.'
+            )
+
+        keyring = get_keyring()
+        if options['if_missing'] and keyring.keys:
+            self.stdout.write('The signing key already exists.')
+            return
+
+        kid = keyring.add(generate_private_key(algorithm))
+        self.stdout.write(self.style.SUCCESS(f'Generated {algorithm} key {kid}.'))
+
+        if options['keep'] is not None:
+            signing_kid = keyring.signing_key.kid
+            kids = sorted(keyring.keys)
+            for old_kid in kids[:-max(options['keep'], 1)]:
+                if old_kid >= signing_kid:
+                    continue
+                keyring.remove(old_kid)
+                self.stdout.write(f'Removed key {old_kid}.')
@@ -0,0 +1,16 @@
+from rest_framework.pagination import LimitOffsetPagination
+
+from users.counting import fast_count
+
+
+class EstimatedCountLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination with an estimated count for large results.
+
+    Counts above `EXACT_COUNT_THRESHOLD` are planner estimates, so the
+    `count` and the `next` link of the last pages may be approximate.
+    """
+
+    def get_count(self, queryset):
+        """Return the estimated number of items in the queryset."""
+        return fast_count(queryset)
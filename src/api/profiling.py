@@ -0,0 +1,87 @@
+import io
+import statistics
+import time
+
+IMPORT_TIME_PREFIX = 'import time:'
+
+
+def parse_import_time(output):
+    """
+    Parse the output of `python -X importtime`.
+
+    Returns the list of `(module, self_us, cumulative_us, depth)` tuples
+    in the order the modules were imported.
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith(IMPORT_TIME_PREFIX):
+            continue
+        self_us, cumulative_us, name = line[len(IMPORT_TIME_PREFIX):].split('|')
+        if not self_us.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append(
+            (name.strip(), int(self_us), int(cumulative_us), depth)
+        )
+    return modules
+
+
+def import_parents(modules):
+    """
+    Return the importing module of each module of `parse_import_time`.
+
+    Top-level imports, such as those run by a function after the startup,
+    have no parent.
+    """
+    parents = {}
+    pending = []
+    # Modules are listed once imported, after the modules they import.
+    for name, _, _, depth in modules:
+        while pending and pending[-1][1] > depth:
+            parents[pending.pop()[0]] = name
+        pending.append((name, depth))
+    return parents
+
+
+def time_requests(handler, path, count, warmup=10):
+    """
+    Time `count` GET requests passed through the WSGI handler.
+
+    Returns the status code of the last response and the per-request
+    timings in microseconds.
+    """
+    def start_response(status, headers, exc_info=None):
+        start_response.status = int(status.split()[0])
+
+    def environ():
+        return {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': '',
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(),
+            'wsgi.errors': io.StringIO(),
+        }
+
+    for _ in range(warmup):
+        b''.join(handler(environ(), start_response))
+
+    timings = []
+    for _ in range(count):
+        started = time.perf_counter()
+        b''.join(handler(environ(), start_response))
+        timings.append((time.perf_counter() - started) * 1e6)
+    return start_response.status, timings
+
+
+def summarize(timings):
+    """Return the mean, median and 95th percentile of the timings."""
+    ordered = sorted(timings)
+    return {
+        'mean': statistics.fmean(ordered),
+        'p50': ordered[len(ordered) // 2],
+        'p95': ordered[int(len(ordered) * 0.95)],
+    }
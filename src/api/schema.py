@@ -0,0 +1,161 @@
+import gzip
+import hashlib
+import json
+import os
+from importlib import import_module
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.views import View
+
+FORMATS = {
+    'yaml': 'application/vnd.oai.openapi',
+    'json': 'application/vnd.oai.openapi+json',
+}
+FINGERPRINT_FILE = 'fingerprint.json'
+
+_loaded = {}
+
+
+def schema_fingerprint():
+    """
+    Calculate the fingerprint of everything the schema is generated from.
+
+    The fingerprint covers the source of the URLconf, views and serializers
+    of the project apps and the drf-spectacular settings, so any change to
+    them invalidates a previously built schema.
+    """
+    digest = hashlib.sha256()
+    for app in settings.SCHEMA_SOURCE_APPS:
+        app_dir = Path(import_module(app).__path__[0])
+        for path in sorted(app_dir.rglob('*.py')):
+            if 'migrations' in path.parts:
+                continue
+            digest.update(str(path.relative_to(app_dir.parent)).encode())
+            digest.update(path.read_bytes())
+    digest.update(repr(sorted(settings.SPECTACULAR_SETTINGS.items())).encode())
+    return digest.hexdigest()
+
+
+def _write(path, content):
+    """Write the file atomically, so readers never see a partial schema."""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(content)
+    os.replace(tmp_path, path)
+
+
+def build_schema():
+    """
+    Generate the OpenAPI schema and store it on disk.
+
+    Each format is stored both as is and gzip-compressed, along with the
+    fingerprint of the sources and the ETag of every format.
+    """
+    from drf_spectacular.renderers import (OpenApiJsonRenderer,
+                                           OpenApiYamlRenderer)
+    from drf_spectacular.settings import spectacular_settings
+
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    renderers = {
+        'yaml': OpenApiYamlRenderer(),
+        'json': OpenApiJsonRenderer(),
+    }
+
+    os.makedirs(settings.SCHEMA_ROOT, exist_ok=True)
+    etags = {}
+    for fmt, renderer in renderers.items():
+        content = renderer.render(schema, renderer_context={})
+        path = os.path.join(settings.SCHEMA_ROOT, f'schema.{fmt}')
+        _write(path, content)
+        _write(f'{path}.gz', gzip.compress(content, mtime=0))
+        etags[fmt] = hashlib.sha256(content).hexdigest()[:32]
+
+    meta = {'fingerprint': schema_fingerprint(), 'etags': etags}
+    _write(
+        os.path.join(settings.SCHEMA_ROOT, FINGERPRINT_FILE),
+        json.dumps(meta).encode()
+    )
+    _loaded.clear()
+    return meta
+
+
+def read_meta():
+    """Return the metadata of the schema on disk or None if it is missing."""
+    try:
+        with open(os.path.join(settings.SCHEMA_ROOT, FINGERPRINT_FILE)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def is_stale():
+    """Check whether the schema on disk is missing or out of date."""
+    meta = read_meta()
+    return meta is None or meta['fingerprint'] != schema_fingerprint()
+
+
+def load_schema():
+    """
+    Load the prebuilt schema into memory.
+
+    The schema is rebuilt first if it is missing or its sources changed.
+    The check runs once per process, as the sources cannot change without
+    a restart.
+    """
+    if not _loaded:
+        meta = build_schema() if is_stale() else read_meta()
+        for fmt in FORMATS:
+            path = os.path.join(settings.SCHEMA_ROOT, f'schema.{fmt}')
+            with open(path, 'rb') as file:
+                content = file.read()
+            with open(f'{path}.gz', 'rb') as file:
+                compressed = file.read()
+            _loaded[fmt] = (meta['etags'][fmt], content, compressed)
+    return _loaded
+
+
+class CachedSchemaView(View):
+    """
+    OpenAPI schema served from the prebuilt files.
+
+    Format can be selected via content negotiation or the `format` parameter.
+
+    - YAML: application/vnd.oai.openapi
+    - JSON: application/vnd.oai.openapi+json
+    """
+
+    def get_format(self, request):
+        """Return the format requested by the client, YAML by default."""
+        fmt = request.GET.get('format')
+        if fmt in ('json', 'openapi-json'):
+            return 'json'
+        if fmt in ('yaml', 'openapi'):
+            return 'yaml'
+        if 'json' in request.headers.get('Accept', ''):
+            return 'json'
+        return 'yaml'
+
+    def get(self, request, *args, **kwargs):
+        """Return the schema, compressed if the client accepts gzip."""
+        fmt = self.get_format(request)
+        etag, content, compressed = load_schema()[fmt]
+
+        use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+        etag = f'"{etag}-gzip"' if use_gzip else f'"{etag}"'
+
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        elif use_gzip:
+            response = HttpResponse(compressed, content_type=FORMATS[fmt])
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(content, content_type=FORMATS[fmt])
+
+        response['ETag'] = etag
+        response['Cache-Control'] = f'public, max-age={settings.SCHEMA_CACHE_MAX_AGE}'
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
@@ -0,0 +1,72 @@
+from phonenumber_field.phonenumber import PhoneNumber
+from phonenumber_field.serializerfields import PhoneNumberField
+from rest_framework import serializers
+
+from users import phones
+
+
+def parse_list(value):
+    """Split the comma-separated query parameter into a list of names."""
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin limiting the fields to the requested ones.
+
+    The fields are taken from the `fields` and `expand` keyword arguments or,
+    if they are not given, from the `?fields=` and `?expand=` query parameters
+    of the request in the context. Fields listed in `Meta.expandable_fields`
+    are expensive to compute and are only included when requested with
+    `expand` (or listed in `fields`). `expandable_fields` maps each of them
+    to the model fields it needs.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None:
+            if fields is None:
+                fields = parse_list(request.query_params.get('fields'))
+            if expand is None:
+                expand = parse_list(request.query_params.get('expand'))
+
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        requested = set(self.fields) - set(expandable) if fields is None else set(fields)
+        requested |= set(expand or ())
+
+        unknown = requested - set(self.fields)
+        if unknown:
+            raise serializers.ValidationError({
+                'fields': [f'Unknown field: {name}.' for name in sorted(unknown)]
+            })
+
+        for name in set(self.fields) - requested:
+            self.fields.pop(name)
+
+    @property
+    def only_fields(self):
+        """Return the model fields needed to represent the selected fields."""
+        model_fields = {field.name for field in self.Meta.model._meta.concrete_fields}
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        names = {self.Meta.model._meta.pk.name}
+        for name, field in self.fields.items():
+            if field.source in model_fields:
+                names.add(field.source)
+            names.update(expandable.get(name, ()))
+        return names
+
+
+class CachedPhoneNumberField(PhoneNumberField):
+    """Phone number field parsing each distinct input once per process, see `users.phones`."""
+
+    def to_internal_value(self, data):
+        """Return the phone number, raising a validation error if it is invalid."""
+        if isinstance(data, PhoneNumber):
+            return super().to_internal_value(data)
+        phone = phones.parse(super(PhoneNumberField, self).to_internal_value(data), self.region)
+        if phone is None:
+            self.fail('invalid')
+        return phone
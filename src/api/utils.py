@@ -1,3 +1,4 @@
+from django.utils.module_loading import import_string
 from rest_framework.routers import DefaultRouter
 
 
@@ -7,3 +8,21 @@ class OptionalSlashRouter(DefaultRouter):
     def __init__(self):
         super().__init__()
         self.trailing_slash = '/?'
+
+
+def lazy_view(path, **initkwargs):
+    """
+    Return a view importing the class-based view at `path` on its first request.
+
+    For views of heavy modules serving few routes, such as the
+    documentation pages, so that process startup does not import them.
+    """
+    view = None
+
+    def dispatch(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(path).as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+
+    return dispatch
@@ -0,0 +1,95 @@
+from django.conf import settings
+from rest_framework import serializers
+
+from referrals import attach
+
+
+class ReferralCodesValidateSerializer(serializers.Serializer):
+    """Serializer for validating a list of invite codes."""
+
+    codes = serializers.ListField(
+        child=serializers.CharField(max_length=64, allow_blank=True),
+        allow_empty=False,
+        max_length=settings.REFERRAL_VALIDATE_MAX_CODES
+    )
+
+
+class ReferralCodeResultSerializer(serializers.Serializer):
+    """Serializer for the validity of an invite code, used in the schema."""
+
+    code = serializers.CharField()
+    valid = serializers.BooleanField()
+    user_id = serializers.IntegerField(allow_null=True)
+
+
+class ReferralAttachSerializer(serializers.Serializer):
+    """Serializer for attaching the current user to an inviter."""
+
+    invited_by_code = serializers.CharField(max_length=64)
+
+
+class ReferralAttachResultSerializer(serializers.Serializer):
+    """Serializer for the outcome of attaching, used in the schema."""
+
+    status = serializers.ChoiceField(choices=attach.STATUSES)
+    invited_by_code = serializers.CharField(
+        help_text='Referral code of the user after the request.'
+    )
+
+
+class ReferralGraphQuerySerializer(serializers.Serializer):
+    """Serializer for the query parameters of the referral graph analytics."""
+
+    top = serializers.IntegerField(
+        min_value=0, max_value=1000, default=10,
+        help_text='Number of users with the largest downlines.'
+    )
+    cycles = serializers.IntegerField(
+        min_value=0, max_value=1000, default=10,
+        help_text='Number of referral cycles listed.'
+    )
+    user_id = serializers.IntegerField(
+        required=False,
+        help_text='User whose metrics are returned.'
+    )
+    refresh = serializers.BooleanField(
+        default=False,
+        help_text='Rebuild the snapshot from the database.'
+    )
+
+
+class ReferralGraphNodeSerializer(serializers.Serializer):
+    """Serializer for the metrics of a user in the referral graph, used in the schema."""
+
+    user_id = serializers.IntegerField()
+    inviter_id = serializers.IntegerField(allow_null=True)
+    depth = serializers.IntegerField(help_text='Number of inviters above the user.')
+    invitees = serializers.IntegerField(help_text='Number of users invited directly.')
+    downline = serializers.IntegerField(help_text='Number of users invited directly or indirectly.')
+    height = serializers.IntegerField(help_text='Number of levels of invitees below the user.')
+
+
+class ReferralGraphCycleSerializer(serializers.Serializer):
+    """Serializer for a referral cycle, used in the schema."""
+
+    user_ids = serializers.ListField(child=serializers.IntegerField())
+    downline = serializers.IntegerField(help_text='Number of users invited from the cycle.')
+
+
+class ReferralGraphSerializer(serializers.Serializer):
+    """Serializer for the referral graph analytics, used in the schema."""
+
+    built_at = serializers.DateTimeField()
+    users = serializers.IntegerField()
+    invited = serializers.IntegerField()
+    roots = serializers.IntegerField(help_text='Number of users not invited by another user.')
+    max_depth = serializers.IntegerField()
+    depth_distribution = serializers.ListField(
+        child=serializers.IntegerField(),
+        help_text='Number of users at each depth, from 0.'
+    )
+    top_subtrees = ReferralGraphNodeSerializer(many=True)
+    cycle_count = serializers.IntegerField()
+    cycle_users = serializers.IntegerField()
+    cycles = ReferralGraphCycleSerializer(many=True)
+    user = ReferralGraphNodeSerializer(required=False, allow_null=True)
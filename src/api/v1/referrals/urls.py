@@ -0,0 +1,21 @@
+from django.urls import re_path
+
+from . import views
+
+urlpatterns = [
+    re_path(
+        r'^referrals/attach/?$',
+        views.ReferralAttachView.as_view(),
+        name='referrals_attach'
+    ),
+    re_path(
+        r'^referrals/graph/?$',
+        views.ReferralGraphView.as_view(),
+        name='referrals_graph'
+    ),
+    re_path(
+        r'^referrals/validate/?$',
+        views.ReferralCodesValidateView.as_view(),
+        name='referrals_validate'
+    ),
+]
@@ -0,0 +1,186 @@
+import json
+
+from django.http import StreamingHttpResponse
+from drf_spectacular.utils import extend_schema, inline_serializer
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from referrals import attach
+from users import invite_codes
+
+from .serializers import (ReferralAttachResultSerializer,
+                          ReferralAttachSerializer,
+                          ReferralCodeResultSerializer,
+                          ReferralCodesValidateSerializer,
+                          ReferralGraphQuerySerializer,
+                          ReferralGraphSerializer)
+
+# Results encoded per chunk of the streamed response
+CHUNK_SIZE = 1000
+
+
+def stream_results(codes):
+    """
+    Yield the JSON response of the validated codes in chunks.
+
+    The codes are resolved by one query whose rows are encoded as they are
+    fetched, so the response starts before all the codes are resolved.
+    """
+    yield '{"results":['
+    results = []
+    user_ids = invite_codes.find_user_ids(codes, chunk_size=CHUNK_SIZE)
+    for index, (code, user_id) in enumerate(zip(codes, user_ids)):
+        results.append(json.dumps({'code': code, 'valid': user_id is not None, 'user_id': user_id}))
+        if len(results) == CHUNK_SIZE:
+            yield (',' if index >= CHUNK_SIZE else '') + ','.join(results)
+            results = []
+    if results:
+        yield (',' if len(codes) > CHUNK_SIZE else '') + ','.join(results)
+    yield ']}'
+
+
+@extend_schema(tags=['Referrals'])
+class ReferralAttachView(APIView):
+    """API view for attaching the current user to the owner of an invite code."""
+
+    serializer_class = ReferralAttachSerializer
+
+    @extend_schema(
+        summary='Attach referral code',
+        description=(
+            'Sets the referral code of the current user, once. If the user '
+            'already has a referral code, it is kept and returned with 409.'
+        ),
+        request=ReferralAttachSerializer,
+        responses={
+            status.HTTP_200_OK: ReferralAttachResultSerializer,
+            status.HTTP_409_CONFLICT: ReferralAttachResultSerializer,
+        }
+    )
+    def post(self, request):
+        """
+        Handle POST requests for attaching the current user to an inviter.
+
+        Returns:
+        - `status`: `attached`, or `already_attached` with `409 Conflict`.
+        - `invited_by_code`: Referral code of the user after the request.
+
+        Raises:
+        - `400 Bad Request` if the serializer is not valid, the code does not
+          exist or is the user's own code.
+        """
+        serializer = self.serializer_class(data=request.data)
+
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        result = attach.attach(request.user.pk, serializer.validated_data['invited_by_code'])
+        if result.status == attach.INVALID_CODE:
+            return Response(
+                {'invited_by_code': 'Неверный реферальный код.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if result.status == attach.OWN_CODE:
+            return Response(
+                {'invited_by_code': 'Нельзя использовать свой код.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            {'status': result.status, 'invited_by_code': result.invited_by_code},
+            status=status.HTTP_200_OK if result.attached else status.HTTP_409_CONFLICT
+        )
+
+
+@extend_schema(tags=['Referrals'])
+class ReferralGraphView(APIView):
+    """API view for the referral graph analytics, for staff users."""
+
+    permission_classes = (permissions.IsAdminUser,)
+
+    @extend_schema(
+        summary='Referral graph analytics',
+        description=(
+            'Returns the depth distribution, the users with the largest '
+            'downlines and the referral cycles of the whole referral graph, '
+            'computed on a snapshot rebuilt once it is older than '
+            '`REFERRAL_GRAPH_MAX_AGE_SECONDS`.'
+        ),
+        parameters=[ReferralGraphQuerySerializer],
+        responses={status.HTTP_200_OK: ReferralGraphSerializer}
+    )
+    def get(self, request):
+        """
+        Handle GET requests for the referral graph analytics.
+
+        Raises:
+        - `400 Bad Request` if the query parameters are not valid.
+        - `404 Not Found` if `user_id` is not in the snapshot.
+        """
+        # NumPy is only imported by the processes serving the analytics.
+        from referrals import graph
+
+        serializer = ReferralGraphQuerySerializer(data=request.query_params)
+
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        query = serializer.validated_data
+        snapshot = graph.get_snapshot(max_age=0 if query['refresh'] else None)
+        data = snapshot.summary(top=query['top'], cycles=query['cycles'])
+        if 'user_id' in query:
+            position = snapshot.position(query['user_id'])
+            if position is None:
+                return Response(
+                    {'user_id': 'Пользователь не найден.'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            data['user'] = snapshot.node(position)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+@extend_schema(tags=['Referrals'])
+class ReferralCodesValidateView(APIView):
+    """API view for validating invite codes in bulk."""
+
+    serializer_class = ReferralCodesValidateSerializer
+
+    @extend_schema(
+        summary='Validate invite codes',
+        description=(
+            'Returns for each code, in the order of the request, whether it is '
+            'the invite code of a user and the id of that user. Codes are '
+            'case-insensitive.'
+        ),
+        request=ReferralCodesValidateSerializer,
+        responses={
+            status.HTTP_200_OK: inline_serializer(
+                name='referral_codes_validate',
+                fields={'results': ReferralCodeResultSerializer(many=True)}
+            )
+        }
+    )
+    def post(self, request):
+        """
+        Handle POST requests for validating a list of invite codes.
+
+        The codes are resolved by one query and the results are streamed.
+
+        Raises:
+        - `400 Bad Request` if the serializer is not valid.
+        """
+        serializer = self.serializer_class(data=request.data)
+
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return StreamingHttpResponse(
+            stream_results(serializer.validated_data['codes']),
+            content_type='application/json'
+        )
@@ -1,7 +1,9 @@
 from django.urls import include, path
 
+from api.v1.referrals import urls as urls_referrals
 from api.v1.users import urls as urls_users
 
 urlpatterns = [
     path('', include(urls_users)),
+    path('', include(urls_referrals)),
 ]
@@ -1,10 +1,25 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from drf_spectacular.utils import extend_schema_field
-from phonenumber_field.serializerfields import PhoneNumberField
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import (TokenRefreshSerializer,
+                                                  TokenVerifySerializer)
+
+from api.auth.tokens import RefreshToken, UntypedToken
+from api.serializers import CachedPhoneNumberField, SparseFieldsetMixin
+from referrals import attach
+from users import invite_codes, phones
+from users.models import ArchivedUser
 
 User = get_user_model()
 
+ATTACH_ERRORS = {
+    attach.ALREADY_ATTACHED: 'The referral code is already set.',
+    attach.INVALID_CODE: 'User with this code does not exist.',
+    attach.OWN_CODE: 'Cannot specify your own code.',
+}
+
 
 class InvitedUserSerializer(serializers.ModelSerializer):
     """Serializer for the invited user model."""
@@ -14,29 +29,40 @@ class InvitedUserSerializer(serializers.ModelSerializer):
         fields = ('id', 'phone')
 
 
-class UserSerializer(serializers.ModelSerializer):
-    """Serializer for the user model."""
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Serializer for the user model with optional sparse fieldsets."""
 
     class Meta:
         model = User
-        exclude = ('password', 'groups', 'user_permissions', 'is_superuser')
+        exclude = ('password', 'groups', 'user_permissions', 'is_superuser', 'phone_key')
 
 
 class UserDetailsSerializer(UserSerializer):
-    """Serializer for the user model with details."""
+    """
+    Serializer for the user model with details.
+
+    The list of invited users is only included with `?expand=invited`.
+    """
 
     invited = serializers.SerializerMethodField()
 
+    class Meta(UserSerializer.Meta):
+        expandable_fields = {'invited': ('invite_code',)}
+
     @extend_schema_field(InvitedUserSerializer(many=True))
     def get_invited(self, obj):
         """
         Get the list of invited users.
 
-        This method retrieves the list of users invited by the current user.
+        This method retrieves the list of users invited by the current user,
+        including the archived ones.
         """
-        invited_users = User.objects.filter(
-            invited_by_code__iexact=obj.invite_code
-        )
+        invited_users = [
+            *User.objects.filter(invited_by_code__iexact=obj.invite_code),
+            *ArchivedUser.objects.filter(
+                invited_by_code__iexact=obj.invite_code
+            ).only('id', 'phone'),
+        ]
         invited_serializer = InvitedUserSerializer(invited_users, many=True)
         return invited_serializer.data
 
@@ -60,15 +86,35 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         if value.lower() == user.invite_code.lower():
             raise serializers.ValidationError('Cannot specify your own code.')
 
-        try:
-            User.objects.get(invite_code__iexact=value)
-        except User.DoesNotExist:
+        if invite_codes.lookup(value) is None:
             raise serializers.ValidationError(
                 'User with this code does not exist.'
             )
 
         return value
 
+    def update(self, instance, validated_data):
+        """
+        Update the changed fields of the user.
+
+        The invited by code is set with `referrals.attach`, so it fails if the
+        user already has another code.
+        """
+        code = validated_data.pop('invited_by_code', None)
+        with transaction.atomic():
+            if code:
+                result = attach.attach(instance.pk, code)
+                if not result.attached and (result.invited_by_code or '').upper() != code.strip().upper():
+                    raise serializers.ValidationError(
+                        {'invited_by_code': ATTACH_ERRORS[result.status]}
+                    )
+                instance.invited_by_code = result.invited_by_code
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            if validated_data:
+                instance.save(update_fields=list(validated_data))
+        return instance
+
     def to_representation(self, instance):
         """
         Convert the instance to representation.
@@ -79,10 +125,68 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         return UserDetailsSerializer(instance, context=self.context).data
 
 
+class UserBatchSerializer(serializers.Serializer):
+    """Serializer for looking up a batch of users."""
+
+    LOOKUP_FIELDS = {
+        'ids': 'id',
+        'phones': 'phone_key',
+        'invite_codes': 'invite_code',
+    }
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        max_length=settings.USER_BATCH_MAX_SIZE
+    )
+    phones = serializers.ListField(
+        child=CachedPhoneNumberField(),
+        required=False,
+        max_length=settings.USER_BATCH_MAX_SIZE
+    )
+    invite_codes = serializers.ListField(
+        child=serializers.CharField(max_length=6),
+        required=False,
+        max_length=settings.USER_BATCH_MAX_SIZE
+    )
+    fields = serializers.ListField(
+        child=serializers.ChoiceField(
+            choices=tuple(UserSerializer().fields)
+        ),
+        required=False,
+        allow_empty=False
+    )
+
+    def validate(self, attrs):
+        """
+        Validate the lookup.
+
+        This method ensures exactly one list of keys is given and normalizes
+        the keys to the values stored in the database.
+        """
+        lookups = [name for name in self.LOOKUP_FIELDS if name in attrs]
+        if len(lookups) != 1:
+            raise serializers.ValidationError(
+                'Specify exactly one of: ids, phones, invite_codes.'
+            )
+
+        name = lookups[0]
+        if name == 'phones':
+            keys = [phones.to_key(phone) for phone in attrs[name]]
+        elif name == 'invite_codes':
+            keys = [code.upper() for code in attrs[name]]
+        else:
+            keys = attrs[name]
+
+        attrs['lookup_field'] = self.LOOKUP_FIELDS[name]
+        attrs['keys'] = list(dict.fromkeys(keys))
+        return attrs
+
+
 class PhoneSendCodeSerializer(serializers.Serializer):
     """Serializer for sending phone code."""
 
-    phone = PhoneNumberField()
+    phone = CachedPhoneNumberField()
 
     class Meta:
         fields = ('phone',)
@@ -91,6 +195,21 @@ class PhoneSendCodeSerializer(serializers.Serializer):
 class PhoneTokenSerializer(serializers.Serializer):
     """Serializer for validating phone code."""
 
-    phone = PhoneNumberField()
+    phone = CachedPhoneNumberField()
     code = serializers.IntegerField()
     invited_by_code = serializers.CharField(required=False)
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """Serializer for refreshing tokens signed with the key ring."""
+
+    token_class = RefreshToken
+
+
+class CustomTokenVerifySerializer(TokenVerifySerializer):
+    """Serializer for verifying tokens signed with the key ring."""
+
+    def validate(self, attrs):
+        """Validate the token, raising TokenError if it is invalid."""
+        UntypedToken(attrs['token'])
+        return {}
@@ -1,7 +1,7 @@
 from django.urls import include, path, re_path
-from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView
 
-from api.utils import OptionalSlashRouter
+from api.schema import CachedSchemaView
+from api.utils import OptionalSlashRouter, lazy_view
 
 from . import views
 
@@ -9,11 +9,21 @@ v10 = OptionalSlashRouter()
 v10.register('users', views.UserViewSet, basename='users')
 
 urlpatterns = [
+    re_path(
+        r'^users/current_user/events/?$',
+        views.CurrentUserEventsView.as_view(),
+        name='current_user_events'
+    ),
     re_path(
         r'^users/current_user/?$',
         views.CurrentUserView.as_view(),
         name='current_user'
     ),
+    re_path(
+        r'^users/batch/?$',
+        views.UserBatchView.as_view(),
+        name='users_batch'
+    ),
     path('', include(v10.urls)),
     re_path(
         r'^auth/send_code/?$',
@@ -37,12 +47,12 @@ urlpatterns = [
     ),
     re_path(
         r'^schema/?$',
-        SpectacularAPIView.as_view(),
+        CachedSchemaView.as_view(),
         name='schema'
     ),
     re_path(
         r'^redoc/?$',
-        SpectacularRedocView.as_view(url_name='schema'),
+        lazy_view('drf_spectacular.views.SpectacularRedocView', url_name='schema'),
         name='redoc'
     )
 ]
@@ -3,28 +3,75 @@ import random
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import check_password, make_password
+from django.db import transaction
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from django_filters.rest_framework import DjangoFilterBackend
-from drf_spectacular.utils import extend_schema, inline_serializer
+from django.views import View
+from django_filters.rest_framework import (CharFilter, DjangoFilterBackend,
+                                           FilterSet)
+from drf_spectacular.utils import (OpenApiParameter, extend_schema,
+                                   inline_serializer)
 from rest_framework import serializers, status
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.filters import SearchFilter
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
-from rest_framework_simplejwt.serializers import (TokenRefreshSerializer,
-                                                  TokenVerifySerializer)
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.authentication import \
+    JWTStatelessUserAuthentication
 from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
 
-from users.models import AuthCode
-
-from .serializers import (PhoneSendCodeSerializer, PhoneTokenSerializer,
+from api.auth.tokens import RefreshToken
+from api.idempotency import IDEMPOTENCY_KEY_PARAMETER, IdempotentMixin
+from config import db
+from referrals import attach, live
+from sms import outbox
+from users import archive, invite_codes, phones
+from users.models import ArchivedUser, AuthCode
+from users.partitioning import filter_unique
+from users.tasks import record_login
+
+from .serializers import (CustomTokenRefreshSerializer,
+                          CustomTokenVerifySerializer, PhoneSendCodeSerializer,
+                          PhoneTokenSerializer, UserBatchSerializer,
                           UserDetailsSerializer, UserSerializer,
                           UserUpdateSerializer)
 
 User = get_user_model()
 
+FIELDS_PARAMETER = OpenApiParameter(
+    'fields',
+    str,
+    description='Comma-separated list of the fields to return.'
+)
+EXPAND_PARAMETER = OpenApiParameter(
+    'expand',
+    str,
+    enum=('invited',),
+    description='Comma-separated list of the expensive fields to include.'
+)
+# Filters on unique columns, which can be routed to one partition
+UNIQUE_FILTERS = ('phone', 'email', 'invite_code')
+
+
+class UserFilter(FilterSet):
+    """Filters of the user list, the phone matching by its key."""
+
+    phone = CharFilter(method='filter_phone')
+
+    class Meta:
+        model = User
+        fields = ('email', 'first_name', 'last_name', 'phone', 'invite_code', 'invited_by_code')
+
+    def filter_phone(self, queryset, name, value):
+        """Filter the users with the phone, none if it is not a valid number."""
+        phone_key = phones.parse_key(value)
+        if phone_key is None:
+            return queryset.none()
+        return queryset.filter(phone_key=phone_key)
+
 
 @extend_schema(tags=['Users'])
 class UserViewSet(ModelViewSet):
@@ -38,8 +85,7 @@ class UserViewSet(ModelViewSet):
     filter_backends = (DjangoFilterBackend, SearchFilter)
     search_fields = ('email', 'first_name', 'last_name',
                      'phone', 'invite_code', 'invited_by_code')
-    filterset_fields = ('email', 'first_name', 'last_name',
-                        'phone', 'invite_code', 'invited_by_code')
+    filterset_class = UserFilter
     http_method_names = ('get',)
 
     def get_serializer_class(self):
@@ -53,8 +99,27 @@ class UserViewSet(ModelViewSet):
             return UserDetailsSerializer
         return UserSerializer
 
+    def get_queryset(self):
+        """
+        Return the queryset loading only the requested fields.
+
+        Columns not needed by the selected fields are deferred. Filters on
+        unique columns are routed by ID on a partitioned users table.
+        """
+        queryset = super().get_queryset()
+        for name in UNIQUE_FILTERS:
+            value = self.request.query_params.get(name, '').strip()
+            if value and name == 'phone':
+                name, value = 'phone_key', phones.parse_key(value)
+            if value:
+                queryset = filter_unique(queryset, name, value)
+        if 'fields' in self.request.query_params:
+            queryset = queryset.only(*self.get_serializer().only_fields)
+        return queryset
+
     @extend_schema(
         summary='User list',
+        parameters=[FIELDS_PARAMETER],
     )
     def list(self, request, *args, **kwargs):
         """Get a list of all users."""
@@ -62,10 +127,23 @@ class UserViewSet(ModelViewSet):
 
     @extend_schema(
         summary='User information',
+        parameters=[FIELDS_PARAMETER, EXPAND_PARAMETER],
     )
     def retrieve(self, request, *args, **kwargs):
-        """Get information about a specific user."""
-        return super().retrieve(request, *args, **kwargs)
+        """
+        Get information about a specific user.
+
+        Users missing from the users table are looked up in the archive.
+        """
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            archived_user = get_object_or_404(
+                ArchivedUser.objects.all(), pk=kwargs[lookup_url_kwarg]
+            )
+            serializer = self.get_serializer(archived_user.to_user())
+            return Response(serializer.data)
 
 
 @extend_schema(tags=['Users'])
@@ -79,6 +157,7 @@ class CurrentUserView(APIView):
     @extend_schema(
         summary='Current user',
         description='Returns the current user',
+        parameters=[FIELDS_PARAMETER, EXPAND_PARAMETER],
         responses={200: UserDetailsSerializer}
     )
     def get(self, request):
@@ -88,13 +167,17 @@ class CurrentUserView(APIView):
         Returns:
             Response: Serialized data of the current user.
         """
-        serializer = UserDetailsSerializer(request.user)
+        serializer = UserDetailsSerializer(
+            request.user,
+            context={'request': request}
+        )
         return Response(serializer.data)
 
     @extend_schema(
         summary='Current user',
         description='Changing the current user',
         request=UserUpdateSerializer,
+        parameters=[FIELDS_PARAMETER, EXPAND_PARAMETER],
         responses={200: UserDetailsSerializer}
     )
     def patch(self, request):
@@ -108,15 +191,19 @@ class CurrentUserView(APIView):
             Response: Serialized data of the updated current user.
         """
         user = request.user
+        # Built first, so an invalid `?fields=` or `?expand=` is rejected
+        # before the update is saved.
+        output = UserDetailsSerializer(user, context={'request': request})
         serializer = UserUpdateSerializer(
             user,
             data=request.data,
-            partial=True
+            partial=True,
+            context={'request': request}
         )
 
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data)
+            return Response(output.data)
 
         return Response(
             serializer.errors,
@@ -124,8 +211,132 @@ class CurrentUserView(APIView):
         )
 
 
+class CurrentUserEventsView(View):
+    """
+    Server-sent events of the current user.
+
+    Pushes a `referral.attached` event whenever someone uses the invite
+    code of the user, instead of the clients polling the current user. The
+    stream needs an ASGI server, see `referrals.live`.
+    """
+
+    async def get(self, request):
+        """
+        Stream the referral events of the current user.
+
+        Clients resuming a stream send the `Last-Event-ID` header to get the
+        events they missed first. The stream ends when the access token
+        expires, the client reconnects with a fresh one.
+
+        Raises:
+        - `401 Unauthorized` without a valid access token.
+        """
+        # The token is checked without loading the user, so an idle stream
+        # does not hold a database connection.
+        try:
+            authenticated = JWTStatelessUserAuthentication().authenticate(request)
+        except AuthenticationFailed as error:
+            detail = error.detail if isinstance(error.detail, dict) else {'detail': error.detail}
+            return JsonResponse(detail, status=status.HTTP_401_UNAUTHORIZED)
+        if authenticated is None:
+            return JsonResponse(
+                {'detail': 'Authentication credentials were not provided.'},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        user, token = authenticated
+
+        last_event_id = request.headers.get('Last-Event-ID', '')
+        response = StreamingHttpResponse(
+            live.stream(
+                user.pk,
+                last_event_id=int(last_event_id) if last_event_id.isdigit() else None,
+                until=token['exp']
+            ),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Disable the response buffering of nginx.
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+@extend_schema(tags=['Users'])
+class UserBatchView(APIView):
+    """API view for looking up a batch of users in one query."""
+
+    serializer_class = UserBatchSerializer
+
+    @extend_schema(
+        summary='User batch',
+        description=(
+            'Returns the users with the given ids, phones or invite codes in the order '
+            'of the keys, and the keys that did not match any user.'
+        ),
+        request=UserBatchSerializer,
+        responses={
+            status.HTTP_200_OK: inline_serializer(
+                name='user_batch',
+                fields={
+                    'results': UserSerializer(many=True),
+                    'missing': serializers.ListField(),
+                }
+            )
+        }
+    )
+    def post(self, request):
+        """
+        Handle POST requests for looking up a batch of users.
+
+        The keys missing from the users table are looked up in the archive.
+
+        Returns:
+        - `results`: Users in the order of the requested keys.
+        - `missing`: Keys that did not match any user.
+
+        Raises:
+        - `400 Bad Request` if the serializer is not valid.
+        """
+        serializer = self.serializer_class(data=request.data)
+
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        lookup_field = serializer.validated_data['lookup_field']
+        keys = serializer.validated_data['keys']
+        fields = serializer.validated_data.get('fields')
+
+        only_fields = UserSerializer(fields=fields).only_fields
+        users = User.objects.filter(
+            **{f'{lookup_field}__in': keys}
+        ).order_by().only(lookup_field, *only_fields)
+        users_by_key = {
+            str(getattr(user, lookup_field)): user for user in users
+        }
+        archived_keys = [key for key in keys if str(key) not in users_by_key]
+        if archived_keys:
+            archived_users = ArchivedUser.objects.filter(
+                **{f'{lookup_field}__in': archived_keys}
+            ).order_by().only(lookup_field, *only_fields)
+            users_by_key.update(
+                (str(getattr(user, lookup_field)), user) for user in archived_users
+            )
+
+        found = [users_by_key[str(key)] for key in keys if str(key) in users_by_key]
+        missing = [key for key in keys if str(key) not in users_by_key]
+        if lookup_field == 'phone_key':
+            missing = [phones.from_key(key) for key in missing]
+        user_serializer = UserSerializer(found, many=True, fields=fields)
+
+        return Response(
+            {'results': user_serializer.data, 'missing': missing},
+            status=status.HTTP_200_OK
+        )
+
+
 @extend_schema(tags=['Auth'])
-class PhoneSendCodeView(APIView):
+class PhoneSendCodeView(IdempotentMixin, APIView):
     """View to send authentication code to the users phone."""
 
     permission_classes = (AllowAny,)
@@ -134,12 +345,14 @@ class PhoneSendCodeView(APIView):
     @extend_schema(
         summary='Send the code to your phone number',
         description=(
-            'Assigns a 4-digit code to the specified phone number and returns it in the response.'
+            'Assigns a 4-digit code to the specified phone number and sends it by SMS. '
+            'The code is also returned in the response unless AUTH_CODE_IN_RESPONSE is disabled.'
         ),
+        parameters=[IDEMPOTENCY_KEY_PARAMETER],
         responses={
             status.HTTP_200_OK: inline_serializer(
                 name='code',
-                fields={'code': serializers.IntegerField()}
+                fields={'code': serializers.IntegerField(required=False)}
             )
         }
     )
@@ -147,8 +360,12 @@ class PhoneSendCodeView(APIView):
         """
         Handle POST requests for sending authentication code.
 
+        The SMS is queued in the outbox and sent by the SMS worker after
+        the response is returned.
+
         Returns:
-        - `code`: Authentication code sent to the user's phone.
+        - `code`: Authentication code sent to the user's phone, if
+          `AUTH_CODE_IN_RESPONSE` is enabled.
 
         Raises:
         - `400 Bad Request` if the serializer is not valid.
@@ -164,19 +381,23 @@ class PhoneSendCodeView(APIView):
         auth_code = random.randint(1000, 9999)
         hashed_code = make_password(str(auth_code), salt=None)
 
-        AuthCode.objects.update_or_create(
-            phone=phone,
-            defaults={
-                'code': hashed_code,
-                'created': timezone.now()
-            }
-        )
+        with transaction.atomic(), db.pipeline():
+            AuthCode.objects.update_or_create(
+                phone_key=phones.to_key(phone),
+                defaults={
+                    'phone': phone,
+                    'code': hashed_code,
+                    'created': timezone.now()
+                }
+            )
+            outbox.enqueue(phone, settings.SMS_CODE_TEMPLATE.format(code=auth_code))
 
-        return Response({'code': auth_code}, status=status.HTTP_200_OK)
+        data = {'code': auth_code} if settings.AUTH_CODE_IN_RESPONSE else {}
+        return Response(data, status=status.HTTP_200_OK)
 
 
 @extend_schema(tags=['Auth'])
-class PhoneTokenView(APIView):
+class PhoneTokenView(IdempotentMixin, APIView):
     """View to exchange authentication code for an access token."""
 
     permission_classes = (AllowAny,)
@@ -184,12 +405,18 @@ class PhoneTokenView(APIView):
 
     @extend_schema(
         summary='Getting tokens by phone number and code',
+        parameters=[IDEMPOTENCY_KEY_PARAMETER],
         responses={
             status.HTTP_200_OK: inline_serializer(
                 name='tokens',
                 fields={
                     'access': serializers.CharField(),
-                    'refresh': serializers.CharField()
+                    'refresh': serializers.CharField(),
+                    'referral': serializers.ChoiceField(
+                        choices=attach.STATUSES,
+                        required=False,
+                        help_text='Outcome of attaching `invited_by_code`, if given.'
+                    )
                 }
             )
         }
@@ -201,6 +428,8 @@ class PhoneTokenView(APIView):
         Returns:
         - `access`: Access token.
         - `refresh`: Refresh token.
+        - `referral`: With `invited_by_code`, `attached`, or `already_attached`
+          if the user already has a referral code, which is kept.
 
         Raises:
         - `400 Bad Request` if the serializer is not valid.
@@ -216,8 +445,9 @@ class PhoneTokenView(APIView):
         phone = serializer.validated_data.get('phone')
         code = serializer.validated_data.get('code')
         invited_by_code = serializer.validated_data.get('invited_by_code')
+        phone_key = phones.to_key(phone)
 
-        auth_code = AuthCode.objects.filter(phone=phone).first()
+        auth_code = AuthCode.objects.filter(phone_key=phone_key).first()
 
         if not auth_code or not check_password(code, auth_code.code):
             return Response(
@@ -232,39 +462,42 @@ class PhoneTokenView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        user_data = {'invited_by_code': None}
+        # A returning user is moved back from the archive before the checks.
+        archive.restore(phone_key)
 
         if invited_by_code:
-            user = User.objects.filter(invite_code__iexact=invited_by_code)
-            if not user.exists():
+            # Invalid codes are mostly rejected by the index without a query.
+            ref_user_id = invite_codes.lookup(invited_by_code)
+            if ref_user_id is None:
                 return Response(
                     {'invited_by_code': 'Неверный реферальный код.'},
                     status=status.HTTP_403_FORBIDDEN
                 )
-            ref_user = user.first()
-            if (
-                ref_user.phone == phone
-                and ref_user.invite_code.lower() == invited_by_code.lower()
-            ):
+            if User.objects.filter(pk=ref_user_id, phone_key=phone_key).exists():
                 return Response(
                     {'invited_by_code': 'Нельзя использовать свой код.'},
                     status=status.HTTP_403_FORBIDDEN
                 )
-            user_data['invited_by_code'] = invited_by_code
 
-        user, _ = User.objects.update_or_create(
-            phone=phone,
-            defaults=user_data
-        )
+        # Logging in never changes the user row: a referral code is only
+        # attached to a user without one.
+        with transaction.atomic(), db.pipeline() as batch:
+            user, _ = filter_unique(User.objects.all(), 'phone_key', phone_key).get_or_create(
+                phone_key=phone_key,
+                defaults={'phone': phone}
+            )
+            if invited_by_code:
+                referral = attach.attach(user.pk, invited_by_code, inviter_id=ref_user_id)
+            with batch.deferred():
+                auth_code.delete()
 
         refresh = RefreshToken.for_user(user)
-        access_token = str(refresh.access_token)
+        data = {'access': str(refresh.access_token), 'refresh': str(refresh)}
+        if invited_by_code:
+            data['referral'] = referral.status
 
-        auth_code.delete()
-        return Response(
-            {'access': access_token, 'refresh': str(refresh)},
-            status=status.HTTP_200_OK
-        )
+        record_login.defer(user.pk, timezone.now().isoformat())
+        return Response(data, status=status.HTTP_200_OK)
 
 
 @extend_schema(tags=['Auth'])
@@ -275,7 +508,7 @@ class TokenRefreshView(TokenRefreshView):
     Extends the default TokenRefreshView to customize behavior.
     """
 
-    serializer_class = TokenRefreshSerializer
+    serializer_class = CustomTokenRefreshSerializer
 
     @extend_schema(
         summary='Refresh token',
@@ -305,7 +538,7 @@ class TokenVerifyView(TokenVerifyView):
     Extends the default TokenVerifyView to customize behavior.
     """
 
-    serializer_class = TokenVerifySerializer
+    serializer_class = CustomTokenVerifySerializer
 
     @extend_schema(
         summary='Token verification',
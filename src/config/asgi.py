@@ -11,6 +11,8 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from config.middleware import EventStreamDisconnectMiddleware
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+application = EventStreamDisconnectMiddleware(get_asgi_application())
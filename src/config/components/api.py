@@ -1,17 +1,36 @@
 """API settings."""
 
+import os
+from pathlib import Path
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.auth.authentication.JWTAuthentication',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.EstimatedCountLimitOffsetPagination',
     'PAGE_SIZE': 10,
 }
 
+USER_BATCH_MAX_SIZE = int(os.getenv('USER_BATCH_MAX_SIZE', default=500))
+
+# Idempotency keys of the auth endpoints, see api.idempotency
+IDEMPOTENCY_CACHE = os.getenv('IDEMPOTENCY_CACHE', default='default')
+
+IDEMPOTENCY_WINDOW_SECONDS = int(os.getenv('IDEMPOTENCY_WINDOW_SECONDS', default=600))
+
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', default=2))
+
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv('IDEMPOTENCY_LOCK_SECONDS', default=30))
+
+# Interval between the cache polls of a waiting retry, doubled up to the maximum
+IDEMPOTENCY_POLL_SECONDS = 0.05
+
+IDEMPOTENCY_MAX_POLL_SECONDS = 1
+
 
 # Set up drf_spectacular, https://drf-spectacular.readthedocs.io/en/latest/settings.html
 SPECTACULAR_SETTINGS = {
@@ -19,4 +38,30 @@ SPECTACULAR_SETTINGS = {
     'VERSION': '1.0.0',
     'DESCRIPTION': 'API service with phone number authentication and a simple referral system.',
     'SERVE_INCLUDE_SCHEMA': False,
+    'ENUM_NAME_OVERRIDES': {
+        'ReferralStatusEnum': 'referrals.attach.STATUSES',
+    },
 }
+
+# Prebuilt schema, see `manage.py build_schema`
+SCHEMA_ROOT = os.getenv(
+    'SCHEMA_ROOT',
+    default=os.path.join(Path(__file__).resolve().parent.parent, 'schema')
+)
+
+SCHEMA_SOURCE_APPS = ('config', 'api', 'users', 'referrals')
+
+SCHEMA_CACHE_MAX_AGE = int(os.getenv('SCHEMA_CACHE_MAX_AGE', default=300))
+
+# Startup import budget, checked by `manage.py profile_imports --check`
+IMPORT_TIME_BUDGET_MS = float(os.getenv('IMPORT_TIME_BUDGET_MS', default=1000))
+
+IMPORT_MODULES_BUDGET = int(os.getenv('IMPORT_MODULES_BUDGET', default=1050))
+
+# Modules only needed by a few routes or commands, never imported at startup
+IMPORT_LAZY_MODULES = (
+    'drf_spectacular.views',
+    'drf_spectacular.generators',
+    'pkg_resources',
+    'numpy',
+)
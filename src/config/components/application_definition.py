@@ -16,6 +16,10 @@ INSTALLED_APPS = (
     'drf_spectacular',
 
     'users.apps.UsersConfig',
+    'sms.apps.SmsConfig',
+    'tasks.apps.TasksConfig',
+    'querylog.apps.QuerylogConfig',
+    'referrals.apps.ReferralsConfig',
     'api.apps.ApiConfig',
 )
 
@@ -5,16 +5,52 @@ from datetime import timedelta
 
 AUTH_USER_MODEL = 'users.User'
 
+# Users inactive for this many months are moved to the archive by
+# archive_inactive_users.
+USER_ARCHIVE_INACTIVE_MONTHS = int(os.getenv('USER_ARCHIVE_INACTIVE_MONTHS', default=12))
+
+# Date from which every login sets `last_login` (ISO 8601). Users without a
+# login recorded only count as inactive once this date is past the cutoff;
+# unset, they are only archived when deactivated.
+USER_LOGIN_TRACKED_SINCE = os.getenv('USER_LOGIN_TRACKED_SINCE') or None
+
+# Phone inputs parsed and validated once per process, see users.phones
+PHONE_PARSE_CACHE_SIZE = int(os.getenv('PHONE_PARSE_CACHE_SIZE', default=4096))
+
 AUTH_CODE_EXPIRES_MINUTES = int(os.getenv('AUTH_CODE_EXPIRES_MINUTES', default=10))
 
+# Return the auth code in the response of send_code besides sending it by SMS,
+# for development and clients not migrated yet.
+AUTH_CODE_IN_RESPONSE = os.getenv('AUTH_CODE_IN_RESPONSE', 'True') == 'True'
+
+# Store the auth codes in an UNLOGGED table: no WAL is written for the churn,
+# but the codes are lost on a crash and are not replicated to standbys.
+AUTH_CODE_UNLOGGED = os.getenv('AUTH_CODE_UNLOGGED', 'False') == 'True'
+
 REFRESH_TOKEN_LIFETIME_DAYS = int(os.getenv('REFRESH_TOKEN_LIFETIME_DAYS'))
 
 ACCESS_TOKEN_LIFETIME_MINUTES = int(os.getenv('ACCESS_TOKEN_LIFETIME_MINUTES'))
 
+# Algorithm of the tokens. Asymmetric algorithms (RS256, ES256, EdDSA...) sign
+# with the key ring stored in JWT_KEYS_DIR, see `manage.py rotate_jwt_key`.
+JWT_ALGORITHM = os.getenv('JWT_ALGORITHM', default='HS256')
+
+JWT_KEYS_DIR = os.getenv('JWT_KEYS_DIR', default=os.path.join(BASE_DIR, 'keys'))  # noqa: F821
+
+JWT_KEYS_RELOAD_SECONDS = int(os.getenv('JWT_KEYS_RELOAD_SECONDS', default=60))
+
+# A new key only signs once it has been published for this long, which must
+# exceed JWT_KEYS_RELOAD_SECONDS plus the refresh interval of the verifiers.
+JWT_KEYS_PUBLISH_SECONDS = int(os.getenv('JWT_KEYS_PUBLISH_SECONDS', default=120))
+
+JWKS_MAX_AGE = int(os.getenv('JWKS_MAX_AGE', default=300))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=ACCESS_TOKEN_LIFETIME_MINUTES),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=REFRESH_TOKEN_LIFETIME_DAYS),
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'AUTH_TOKEN_CLASSES': ('api.auth.tokens.AccessToken',),
     'TOKEN_OBTAIN_SERIALIZER': 'api.v1.users.serializers.CustomTokenObtainSerializer',
     'TOKEN_REFRESH_SERIALIZER': 'api.v1.users.serializers.CustomTokenRefreshSerializer',
+    'TOKEN_VERIFY_SERIALIZER': 'api.v1.users.serializers.CustomTokenVerifySerializer',
 }
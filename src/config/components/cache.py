@@ -0,0 +1,13 @@
+"""Cache."""
+
+import os
+
+# The local memory cache is per process: with several processes use a shared
+# backend, e.g. CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache with
+# CACHE_LOCATION=cache_table (see `manage.py createcachetable`).
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    },
+}
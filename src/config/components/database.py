@@ -3,6 +3,25 @@
 import os
 from types import MappingProxyType
 
+# psycopg 3 only: bind the query parameters on the server instead of
+# interpolating them in the client, which also allows prepared statements.
+DB_SERVER_SIDE_BINDING = os.getenv('DB_SERVER_SIDE_BINDING', 'False') == 'True'
+
+# psycopg 3 with server-side binding: executions of a query after which it
+# is prepared, empty to never prepare (the Django default). Prepared
+# statements do not work through PgBouncer in transaction mode before 1.21.
+DB_PREPARE_THRESHOLD = os.getenv('DB_PREPARE_THRESHOLD', default='')
+
+# Seconds to keep the connections open between requests, 0 to close them
+# after each request. Prepared statements only pay off on kept connections.
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', default=0))
+
+DB_OPTIONS = {}
+if DB_SERVER_SIDE_BINDING:
+    DB_OPTIONS['server_side_binding'] = True
+if DB_PREPARE_THRESHOLD:
+    DB_OPTIONS['prepare_threshold'] = int(DB_PREPARE_THRESHOLD)
+
 DATABASES = MappingProxyType(
     {
         'default': {
@@ -11,7 +30,16 @@ DATABASES = MappingProxyType(
             'USER': os.getenv('DB_USER', default='postgres'),
             'PASSWORD': os.getenv('DB_PASSWORD', default='postgres'),
             'HOST': os.getenv('DB_HOST', default='localhost'),
-            'PORT': os.getenv('DB_PORT', default='5432')
+            'PORT': os.getenv('DB_PORT', default='5432'),
+            'OPTIONS': DB_OPTIONS,
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_MAX_AGE > 0,
         }
     },
 )
+
+# psycopg 3 pipeline mode for the multi-statement requests, see config.db
+DB_PIPELINE = os.getenv('DB_PIPELINE', 'True') == 'True'
+
+# Counts of larger querysets are planner estimates, see users.counting
+EXACT_COUNT_THRESHOLD = int(os.getenv('EXACT_COUNT_THRESHOLD', default=10000))
@@ -0,0 +1,35 @@
+"""Logging."""
+
+import os
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'sms': {
+            'handlers': ['console'],
+            'level': os.getenv('SMS_LOG_LEVEL', default='INFO'),
+        },
+        'users': {
+            'handlers': ['console'],
+            'level': os.getenv('USERS_LOG_LEVEL', default='INFO'),
+        },
+        'tasks': {
+            'handlers': ['console'],
+            'level': os.getenv('TASKS_LOG_LEVEL', default='INFO'),
+        },
+        'querylog': {
+            'handlers': ['console'],
+            'level': os.getenv('QUERYLOG_LOG_LEVEL', default='INFO'),
+        },
+        'referrals': {
+            'handlers': ['console'],
+            'level': os.getenv('REFERRALS_LOG_LEVEL', default='INFO'),
+        },
+    },
+}
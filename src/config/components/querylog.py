@@ -0,0 +1,20 @@
+"""Slow query log, see the `querylog` app."""
+
+import os
+
+# Time the queries of every connection and record the slow ones.
+SLOW_QUERY_LOG_ENABLED = os.getenv('SLOW_QUERY_LOG_ENABLED', 'False') == 'True'
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', default=200))
+
+# Snapshot the plan of each slow statement with EXPLAIN (ANALYZE off), once
+# per fingerprint and flush window.
+SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'True') == 'True'
+
+# Slow queries kept in memory per process between flushes
+SLOW_QUERY_BUFFER_SIZE = int(os.getenv('SLOW_QUERY_BUFFER_SIZE', default=1000))
+
+# Fingerprints with the most total time stored per flush
+SLOW_QUERY_TOP_N = int(os.getenv('SLOW_QUERY_TOP_N', default=50))
+
+SLOW_QUERY_FLUSH_SECONDS = float(os.getenv('SLOW_QUERY_FLUSH_SECONDS', default=60))
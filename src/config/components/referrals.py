@@ -0,0 +1,73 @@
+"""Referral codes."""
+
+import os
+
+# Per-process index of the invite codes, see users.invite_codes
+INVITE_CODE_INDEX_ENABLED = os.getenv('INVITE_CODE_INDEX_ENABLED', 'True') == 'True'
+
+# Number of codes the Bloom filter is sized for, 0 for twice the current
+# number of users (at least 100000). With the false positive rate it sets the
+# memory use: about 1.2 bytes per code at 1%, 1.8 bytes at 0.1%.
+INVITE_CODE_BLOOM_CAPACITY = int(os.getenv('INVITE_CODE_BLOOM_CAPACITY', default=0))
+
+INVITE_CODE_BLOOM_FP_RATE = float(os.getenv('INVITE_CODE_BLOOM_FP_RATE', default=0.01))
+
+INVITE_CODE_LRU_SIZE = int(os.getenv('INVITE_CODE_LRU_SIZE', default=10000))
+
+INVITE_CODE_LRU_TTL = int(os.getenv('INVITE_CODE_LRU_TTL', default=300))
+
+INVITE_CODE_SYNC_SECONDS = int(os.getenv('INVITE_CODE_SYNC_SECONDS', default=5))
+
+INVITE_CODE_SYNC_OVERLAP_SECONDS = int(os.getenv('INVITE_CODE_SYNC_OVERLAP_SECONDS', default=60))
+
+INVITE_CODE_REBUILD_SECONDS = int(os.getenv('INVITE_CODE_REBUILD_SECONDS', default=3600))
+
+# Maximum number of codes per `POST /api/v1/referrals/validate` request
+REFERRAL_VALIDATE_MAX_CODES = int(os.getenv('REFERRAL_VALIDATE_MAX_CODES', default=10000))
+
+# Referral graph snapshots, see referrals.graph
+REFERRAL_GRAPH_ROOT = os.getenv(
+    'REFERRAL_GRAPH_ROOT',
+    default=os.path.join(BASE_DIR, 'graph')  # noqa: F821
+)
+
+# Age after which the staff endpoint rebuilds the snapshot
+REFERRAL_GRAPH_MAX_AGE_SECONDS = int(os.getenv('REFERRAL_GRAPH_MAX_AGE_SECONDS', default=3600))
+
+# Referral events, see referrals.events
+REFERRAL_EVENTS_ENABLED = os.getenv('REFERRAL_EVENTS_ENABLED', 'True') == 'True'
+
+# Maximum number of events per insert
+REFERRAL_EVENTS_BATCH_SIZE = int(os.getenv('REFERRAL_EVENTS_BATCH_SIZE', default=500))
+
+REFERRAL_EVENTS_FLUSH_SECONDS = float(os.getenv('REFERRAL_EVENTS_FLUSH_SECONDS', default=1))
+
+WEBHOOK_WORKER_THREADS = int(os.getenv('WEBHOOK_WORKER_THREADS', default=8))
+
+WEBHOOK_WORKER_POLL_INTERVAL = float(os.getenv('WEBHOOK_WORKER_POLL_INTERVAL', default=5))
+
+WEBHOOK_TIMEOUT = float(os.getenv('WEBHOOK_TIMEOUT', default=10))
+
+# Seconds a claimed batch is leased to a worker before it can be claimed again
+WEBHOOK_LEASE_SECONDS = int(os.getenv('WEBHOOK_LEASE_SECONDS', default=60))
+
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv('WEBHOOK_MAX_ATTEMPTS', default=8))
+
+WEBHOOK_RETRY_BACKOFF_SECONDS = float(os.getenv('WEBHOOK_RETRY_BACKOFF_SECONDS', default=10))
+
+WEBHOOK_RETRY_BACKOFF_MAX_SECONDS = float(os.getenv('WEBHOOK_RETRY_BACKOFF_MAX_SECONDS', default=3600))
+
+# Live referral notifications, see referrals.live
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', default=15))
+
+# Reconnection delay advised to the clients
+SSE_RETRY_MS = int(os.getenv('SSE_RETRY_MS', default=5000))
+
+# Maximum number of events replayed to a resuming client
+SSE_REPLAY_LIMIT = int(os.getenv('SSE_REPLAY_LIMIT', default=500))
+
+# Maximum number of messages waiting for a stream before it is closed
+SSE_QUEUE_SIZE = int(os.getenv('SSE_QUEUE_SIZE', default=100))
+
+# Seconds between checks of the broker connection without notifications
+SSE_POLL_INTERVAL = float(os.getenv('SSE_POLL_INTERVAL', default=30))
@@ -0,0 +1,31 @@
+"""SMS delivery, see the `sms` app."""
+
+import os
+
+# Dotted path of the provider class: sms.providers.ConsoleProvider writes the
+# messages to the log, sms.providers.HTTPGatewayProvider posts them to the gateway.
+SMS_PROVIDER = os.getenv('SMS_PROVIDER', default='sms.providers.ConsoleProvider')
+
+SMS_GATEWAY_URL = os.getenv('SMS_GATEWAY_URL', default='http://127.0.0.1:8025/')
+
+SMS_GATEWAY_TOKEN = os.getenv('SMS_GATEWAY_TOKEN', default='')
+
+SMS_GATEWAY_TIMEOUT = float(os.getenv('SMS_GATEWAY_TIMEOUT', default=10))
+
+# Maximum number of messages per gateway request
+SMS_BATCH_SIZE = int(os.getenv('SMS_BATCH_SIZE', default=100))
+
+SMS_WORKER_THREADS = int(os.getenv('SMS_WORKER_THREADS', default=4))
+
+SMS_WORKER_POLL_INTERVAL = float(os.getenv('SMS_WORKER_POLL_INTERVAL', default=5))
+
+# Seconds a claimed message is leased to a worker before it can be claimed again
+SMS_SEND_TIMEOUT = int(os.getenv('SMS_SEND_TIMEOUT', default=60))
+
+SMS_MAX_ATTEMPTS = int(os.getenv('SMS_MAX_ATTEMPTS', default=5))
+
+SMS_RETRY_BACKOFF_SECONDS = float(os.getenv('SMS_RETRY_BACKOFF_SECONDS', default=2))
+
+SMS_RETRY_BACKOFF_MAX_SECONDS = float(os.getenv('SMS_RETRY_BACKOFF_MAX_SECONDS', default=300))
+
+SMS_CODE_TEMPLATE = os.getenv('SMS_CODE_TEMPLATE', default='Your code: {code}')
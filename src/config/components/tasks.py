@@ -0,0 +1,29 @@
+"""Background tasks, see the `tasks` app."""
+
+import os
+
+# In-process runner: tasks deferred after the commit run on a thread pool of
+# TASKS_THREADS threads, with up to TASKS_QUEUE_SIZE more waiting. When the
+# queue is full, the `run` policy runs the task in the caller, `drop` drops it.
+TASKS_THREADS = int(os.getenv('TASKS_THREADS', default=4))
+
+TASKS_QUEUE_SIZE = int(os.getenv('TASKS_QUEUE_SIZE', default=100))
+
+TASKS_FULL_POLICY = os.getenv('TASKS_FULL_POLICY', default='run')
+
+# Seconds between the statistics logged by the in-process runner
+TASKS_STATS_INTERVAL = float(os.getenv('TASKS_STATS_INTERVAL', default=60))
+
+# Durable queue consumed by `manage.py run_worker`
+TASKS_WORKER_THREADS = int(os.getenv('TASKS_WORKER_THREADS', default=4))
+
+TASKS_WORKER_POLL_INTERVAL = float(os.getenv('TASKS_WORKER_POLL_INTERVAL', default=5))
+
+# Seconds a claimed task is leased to a worker before it can be claimed again
+TASKS_LEASE_SECONDS = int(os.getenv('TASKS_LEASE_SECONDS', default=300))
+
+TASKS_MAX_ATTEMPTS = int(os.getenv('TASKS_MAX_ATTEMPTS', default=3))
+
+TASKS_RETRY_BACKOFF_SECONDS = float(os.getenv('TASKS_RETRY_BACKOFF_SECONDS', default=5))
+
+TASKS_RETRY_BACKOFF_MAX_SECONDS = float(os.getenv('TASKS_RETRY_BACKOFF_MAX_SECONDS', default=600))
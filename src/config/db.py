@@ -0,0 +1,132 @@
+"""
+Database driver helpers.
+
+The project runs on psycopg 3, which Django prefers when it is installed,
+and still works with psycopg2. The helpers cover the driver APIs that
+differ: notifications, `COPY` and pipeline mode.
+"""
+
+import select
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+COPY_CHUNK_SIZE = 64 * 1024
+
+# Statements whose results Django never reads. In pipeline mode they are
+# sent along with the next statement instead of waiting for their result.
+RESULTLESS = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'NOTIFY')
+
+
+def is_psycopg3(connection):
+    """Check whether the connection uses psycopg 3."""
+    return connection.vendor == 'postgresql' and psycopg is not None and isinstance(
+        connection.connection, psycopg.Connection
+    )
+
+
+def listen(connection, channel):
+    """Subscribe the connection to the notification channel, return the driver connection."""
+    connection.ensure_connection()
+    with connection.cursor() as cursor:
+        cursor.execute(f'LISTEN {channel}')
+    return connection.connection
+
+
+def wait_for_notifications(connection, timeout):
+    """Return the payloads of the pending notifications, waiting up to `timeout` seconds for one."""
+    conn = connection.connection
+    if is_psycopg3(connection):
+        return [notify.payload for notify in conn.notifies(timeout=timeout, stop_after=1)]
+    if not conn.notifies:
+        select.select([conn], [], [], timeout)
+        conn.poll()
+    payloads = [notify.payload for notify in conn.notifies]
+    conn.notifies.clear()
+    return payloads
+
+
+def copy_from(cursor, sql, file):
+    """Run the `COPY ... FROM STDIN` statement with the data of the file."""
+    if not hasattr(cursor, 'copy'):
+        cursor.copy_expert(sql, file)
+        return
+    with cursor.copy(sql) as copy:
+        while True:
+            data = file.read(COPY_CHUNK_SIZE)
+            if not data:
+                break
+            copy.write(data)
+
+
+class PipelineSync:
+    """
+    Execute wrapper waiting for the results of the statements that have some.
+
+    In pipeline mode psycopg only sends the statements, and Django would
+    read a row count of -1 for updates and deletes. The wrapper syncs the
+    pipeline after every statement but the result-less ones, so errors and
+    row counts are reported where Django expects them. The errors of the
+    sync go through the connection's error wrapper as those of `execute`
+    would, so a duplicate insert raises `IntegrityError` and the race
+    recovery of `get_or_create` and `update_or_create` still applies.
+    """
+
+    def __init__(self, pipeline=None):
+        self.pipeline = pipeline
+        self.deferring = False
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        if not self.deferring and not sql.lstrip().upper().startswith(RESULTLESS):
+            with context['connection'].wrap_database_errors:
+                self.pipeline.sync()
+        return result
+
+    @contextmanager
+    def deferred(self):
+        """
+        Send the statements of the block with the next synced one.
+
+        Their errors are raised and their row counts set only then, so the
+        block must not depend on them, as with a final `delete()`.
+        """
+        self.deferring = True
+        try:
+            yield
+        finally:
+            self.deferring = False
+
+
+@contextmanager
+def pipeline(using=DEFAULT_DB_ALIAS):
+    """
+    Batch the round trips of the block with psycopg 3 pipeline mode.
+
+    Transaction control statements and notifications are sent with the
+    next statement rather than on their own, which saves about half of the
+    round trips of a short transaction with savepoints. Open the
+    transaction before the pipeline: psycopg syncs when the autocommit
+    mode changes inside one. Yields the
+    `PipelineSync` wrapper, whose `deferred()` block also sends statements
+    without waiting. Does nothing with psycopg2 or when `DB_PIPELINE` is off.
+    """
+    connection = connections[using]
+    if not settings.DB_PIPELINE or connection.vendor != 'postgresql':
+        yield PipelineSync()
+        return
+    connection.ensure_connection()
+    if not is_psycopg3(connection) or connection.connection.pgconn.pipeline_status:
+        yield PipelineSync()
+        return
+    # The deferred statements are synced when the pipeline exits.
+    with connection.wrap_database_errors, connection.connection.pipeline() as driver_pipeline:
+        wrapper = PipelineSync(driver_pipeline)
+        with connection.execute_wrapper(wrapper):
+            yield wrapper
@@ -0,0 +1,129 @@
+import asyncio
+import contextlib
+
+from django.conf import settings
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+
+class AdminMiddleware:
+    """
+    Middleware running the session-based stack only for the admin.
+
+    The middleware listed in `ADMIN_MIDDLEWARE` are chained the same way
+    Django chains `MIDDLEWARE`, but requests are passed through the chain
+    only when their path starts with `ADMIN_URL_PREFIX`. Other requests
+    go straight to the view, so the JWT-only API skips sessions, CSRF and
+    messages entirely.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.ADMIN_URL_PREFIX
+        self.view_middleware = []
+        self.template_response_middleware = []
+        self.exception_middleware = []
+
+        handler = get_response
+        for middleware_path in reversed(settings.ADMIN_MIDDLEWARE):
+            middleware = import_string(middleware_path)(handler)
+            if hasattr(middleware, 'process_view'):
+                self.view_middleware.insert(0, middleware.process_view)
+            if hasattr(middleware, 'process_template_response'):
+                self.template_response_middleware.append(
+                    middleware.process_template_response
+                )
+            if hasattr(middleware, 'process_exception'):
+                self.exception_middleware.append(middleware.process_exception)
+            handler = convert_exception_to_response(middleware)
+        self.admin_handler = handler
+
+    def is_admin(self, request):
+        """Check whether the request is addressed to the admin."""
+        return request.path_info.startswith(self.prefix)
+
+    def __call__(self, request):
+        if self.is_admin(request):
+            return self.admin_handler(request)
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Run the `process_view` hooks of the admin stack."""
+        if not self.is_admin(request):
+            return None
+        for process_view in self.view_middleware:
+            response = process_view(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        """Run the `process_template_response` hooks of the admin stack."""
+        if self.is_admin(request):
+            for process_template_response in self.template_response_middleware:
+                response = process_template_response(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        """Run the `process_exception` hooks of the admin stack."""
+        if not self.is_admin(request):
+            return None
+        for process_exception in self.exception_middleware:
+            response = process_exception(request, exception)
+            if response is not None:
+                return response
+        return None
+
+
+class EventStreamDisconnectMiddleware:
+    """
+    ASGI middleware ending the event streams of disconnected clients.
+
+    Django 4.2 does not listen for `http.disconnect` while it sends a
+    streaming response, so the generator of a `text/event-stream` response
+    would keep running, and hold its subscription, after the client left.
+    Once such a response has started, the middleware waits for the
+    disconnect and cancels the request, which closes the generator.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def is_event_stream(message):
+        """Check whether the response start message is an event stream."""
+        return any(
+            name.lower() == b'content-type' and value.startswith(b'text/event-stream')
+            for name, value in message.get('headers', ())
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        streaming = asyncio.Event()
+
+        async def watched_send(message):
+            if message['type'] == 'http.response.start' and self.is_event_stream(message):
+                streaming.set()
+            await send(message)
+
+        async def wait_for_disconnect():
+            await streaming.wait()
+            # Django has read the request body, the next message is the disconnect.
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        request = asyncio.ensure_future(self.app(scope, receive, watched_send))
+        disconnect = asyncio.ensure_future(wait_for_disconnect())
+        try:
+            await asyncio.wait((request, disconnect), return_when=asyncio.FIRST_COMPLETED)
+            if disconnect.done():
+                request.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await request
+            else:
+                await request
+        finally:
+            request.cancel()
+            disconnect.cancel()
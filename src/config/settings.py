@@ -20,10 +20,21 @@ include(
     'components/api.py',
     'components/http.py',
     'components/database.py',
+    'components/cache.py',
     'components/password_validation.py',
     'components/internationalization.py',
     'components/static_files.py',
     'components/auth.py',
+    'components/referrals.py',
+    'components/sms.py',
+    'components/tasks.py',
+    'components/querylog.py',
+    'components/logging.py',
 )
 
+SETTINGS_PROFILE = os.environ.get('SETTINGS_PROFILE', 'default')
+
+if SETTINGS_PROFILE == 'lean':
+    include('components/lean_api.py')
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -17,7 +17,10 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 
+from api.auth.views import JWKSView
+
 urlpatterns = [
+    path('.well-known/jwks.json', JWKSView.as_view(), name='jwks'),
     path('admin/', admin.site.urls),
     path('api/', include('api.urls'))
 ]
@@ -0,0 +1,152 @@
+"""
+Warm-up of a server process before it accepts requests.
+
+Django, DRF and the libraries they use build much of their state lazily,
+on the first request of each process: the URL resolver and its regexes,
+the fields of every serializer, the `phonenumbers` metadata of a region,
+the JWT signing keys and the cryptography backend, the middleware chain.
+`warm_up` does all of it once. Run by the gunicorn master before forking
+the workers (see `gunicorn.conf.py`), the workers start with the result in
+memory shared copy-on-write instead of paying for it on the first requests
+after every deploy or recycle.
+
+The warm-up requests go through the whole WSGI handler but need no
+database. The database is only used to build the invite code index, and
+the connections are closed at the end, so no socket is shared with the
+forked workers.
+"""
+
+import logging
+import time
+
+import phonenumbers
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.test.client import RequestFactory
+from django.urls import Resolver404, get_resolver, resolve
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# Paths resolved ahead of the first requests, one per route.
+PATHS = (
+    '/api/v1/auth/send_code/',
+    '/api/v1/auth/jwt/get_by_phone/',
+    '/api/v1/auth/jwt/refresh/',
+    '/api/v1/users/',
+    '/api/v1/users/1/',
+    '/api/v1/users/batch/',
+    '/api/v1/users/current_user/',
+    '/api/v1/users/current_user/events',
+    '/api/v1/referrals/validate',
+    '/api/v1/referrals/attach',
+    '/api/v1/referrals/graph',
+    '/.well-known/jwks.json',
+)
+
+# Requests run through the handler: they fail authentication or
+# validation before reaching the database.
+REQUESTS = (
+    ('get', '/api/v1/users/current_user/', {}),
+    ('post', '/api/v1/auth/send_code/', {'phone': 'warm-up'}),
+    ('post', '/api/v1/auth/jwt/get_by_phone/', {'phone': 'warm-up', 'code': 'warm-up'}),
+)
+
+
+def warm_up_urls():
+    """Compile the URL patterns and resolve the known paths."""
+    # Reading the reverse mapping populates the resolver.
+    get_resolver().reverse_dict
+    for path in PATHS:
+        try:
+            resolve(path)
+        except Resolver404:
+            logger.warning('Warm-up path %s does not resolve', path)
+
+
+def project_serializers(base=serializers.BaseSerializer):
+    """Yield the serializer classes of the project imported so far."""
+    for serializer_class in base.__subclasses__():
+        if serializer_class.__module__.startswith(('api.', 'users.', 'referrals.')):
+            yield serializer_class
+        yield from project_serializers(serializer_class)
+
+
+def warm_up_serializers():
+    """Build the fields of the project serializers, imported by the URL configuration."""
+    for serializer_class in set(project_serializers()):
+        try:
+            serializer_class().fields
+        except Exception:
+            # Serializers needing arguments are left for the first request.
+            logger.debug('Skipped warming up %s', serializer_class.__name__, exc_info=True)
+
+
+def warm_up_phones():
+    """Load the metadata of the default region and fill the parse cache with its example number."""
+    from users import phones
+
+    region = getattr(settings, 'PHONENUMBER_DEFAULT_REGION', None) or 'RU'
+    example = phonenumbers.example_number(region)
+    if example is not None:
+        phones.parse(phonenumbers.format_number(example, phonenumbers.PhoneNumberFormat.E164))
+
+
+def warm_up_tokens():
+    """Load the signing keys, then sign and verify a token."""
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    AccessToken(str(AccessToken()))
+
+
+def warm_up_requests():
+    """Run requests through the middleware, the views and the renderers."""
+    handler = WSGIHandler()
+    host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+    factory = RequestFactory(SERVER_NAME=host, HTTP_HOST=host)
+    # The expected 4xx responses are not worth a warning each.
+    request_logger = logging.getLogger('django.request')
+    level = request_logger.level
+    request_logger.setLevel(logging.ERROR)
+    try:
+        for method, path, data in REQUESTS:
+            environ = getattr(factory, method)(path, data, content_type='application/json').environ
+            handler(environ, lambda status, headers, exc_info=None: None)
+    finally:
+        request_logger.setLevel(level)
+
+
+def warm_up_invite_codes():
+    """Build the invite code index, inherited by the forked workers."""
+    from users import invite_codes
+
+    if settings.INVITE_CODE_INDEX_ENABLED:
+        invite_codes.get_index().build()
+
+
+STEPS = (
+    warm_up_urls,
+    warm_up_serializers,
+    warm_up_phones,
+    warm_up_tokens,
+    warm_up_requests,
+    warm_up_invite_codes,
+)
+
+
+def warm_up():
+    """Run the warm-up steps, logging their time; a failed step is logged and skipped."""
+    started = time.perf_counter()
+    try:
+        for step in STEPS:
+            step_started = time.perf_counter()
+            try:
+                step()
+            except Exception:
+                logger.exception('Warm-up step %s failed', step.__name__)
+                continue
+            logger.info('Warm-up step %s took %.1f ms', step.__name__, (time.perf_counter() - step_started) * 1000)
+    finally:
+        connections.close_all()
+    logger.info('Warmed up in %.1f ms', (time.perf_counter() - started) * 1000)
@@ -0,0 +1,121 @@
+"""
+Gunicorn production profile, loaded from the working directory.
+
+The application is imported and warmed up once in the master
+(`preload_app`, see `config.warmup`) and the workers are forked from it,
+so they share the imported code and the warmed-up state copy-on-write and
+serve their first requests at full speed. The master holds no database
+connection at the fork, the workers open their own.
+
+Workers are recycled gracefully once their private memory, which excludes
+the pages still shared with the master, exceeds
+`GUNICORN_MAX_WORKER_MEMORY_MB`, and optionally after
+`GUNICORN_MAX_REQUESTS` requests.
+"""
+
+import logging
+import os
+import resource
+
+logger = logging.getLogger('gunicorn.error')
+
+
+def cpu_count():
+    """Return the CPUs available to the process, within the cgroup quota."""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as file:
+            quota, period = file.read().split()
+        if quota != 'max':
+            count = min(count, max(int(quota) // int(period), 1))
+    except (OSError, ValueError):
+        pass
+    return count
+
+
+def private_memory():
+    """Return the memory of the process not shared with others, in bytes."""
+    try:
+        with open('/proc/self/smaps_rollup') as file:
+            return sum(
+                int(line.split()[1]) * 1024
+                for line in file
+                if line.startswith(('Private_Clean:', 'Private_Dirty:'))
+            )
+    except OSError:
+        # Peak resident memory, in KiB on Linux and bytes on macOS.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+workers = int(os.getenv('GUNICORN_WORKERS', 0)) or 2 * cpu_count() + 1
+
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10))
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+
+WARM_UP = os.getenv('GUNICORN_WARM_UP', 'True') == 'True'
+
+MAX_WORKER_MEMORY = int(os.getenv('GUNICORN_MAX_WORKER_MEMORY_MB', 512)) * 1024 * 1024
+
+# Requests between two memory checks of a worker.
+MEMORY_CHECK_INTERVAL = int(os.getenv('GUNICORN_MEMORY_CHECK_INTERVAL', 20))
+
+
+def warm_up():
+    from config.warmup import warm_up
+
+    warm_up()
+
+
+def on_starting(server):
+    # The preloaded application is imported before the sockets are bound.
+    if preload_app and WARM_UP:
+        warm_up()
+
+
+def post_fork(server, worker):
+    worker.served = 0
+    if not preload_app:
+        return
+    from django.db import connections
+
+    from users import invite_codes
+
+    # Drop any connection inherited from the master, the worker opens its own.
+    connections.close_all()
+    invite_codes.adopt_index()
+
+
+def post_worker_init(worker):
+    # Without preloading, each worker warms up before accepting requests.
+    if not preload_app and WARM_UP:
+        warm_up()
+
+
+def post_request(worker, req, environ, resp):
+    worker.served += 1
+    if not MAX_WORKER_MEMORY or worker.served % MEMORY_CHECK_INTERVAL:
+        return
+    memory = private_memory()
+    if memory > MAX_WORKER_MEMORY:
+        logger.info(
+            'Recycling worker %s using %d MiB after %d requests',
+            worker.pid, memory // (1024 * 1024), worker.served
+        )
+        # The worker stops accepting, finishes its requests and is replaced.
+        worker.alive = False
@@ -0,0 +1,36 @@
+from django.contrib import admin
+from django.utils.html import format_html
+
+from .models import SlowQuery
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    """Admin configuration for the SlowQuery model."""
+
+    list_display = ('call_site', 'calls', 'total_ms', 'mean_ms', 'max_ms', 'last_seen')
+    search_fields = ('call_site', 'sql')
+    exclude = ('plan',)
+    readonly_fields = (
+        'fingerprint', 'sql', 'call_site', 'params_fingerprint', 'formatted_plan',
+        'calls', 'total_ms', 'max_ms', 'first_seen', 'last_seen'
+    )
+    ordering = ('-total_ms',)
+
+    @admin.display(description='plan')
+    def formatted_plan(self, obj):
+        """Show the plan with its indentation."""
+        return format_html('<pre>{}</pre>', obj.plan)
+
+    @admin.display(description='mean time, ms')
+    def mean_ms(self, obj):
+        """Show the mean time of the query."""
+        return round(obj.mean_ms, 1)
+
+    def has_add_permission(self, request, obj=None):
+        """Slow queries are only recorded by the application."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Slow queries are recorded, not edited."""
+        return False
@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+class QuerylogConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'querylog'
+    verbose_name = 'Query log'
+
+    def ready(self):
+        from .capture import install
+
+        if settings.SLOW_QUERY_LOG_ENABLED:
+            connection_created.connect(install)
@@ -0,0 +1,247 @@
+"""
+Capture of the slow queries.
+
+With `SLOW_QUERY_LOG_ENABLED`, every database connection gets an execute
+wrapper timing its statements. Statements slower than
+`SLOW_QUERY_THRESHOLD_MS` are kept in a per-process ring buffer with their
+fingerprint (the SQL with literals and `IN` lists normalized), a hash of
+their parameters, the first stack frame in the project code that issued
+them and, once per fingerprint and flush window, their
+`EXPLAIN (ANALYZE off)` plan. The parameters themselves are not kept, as
+they hold phone numbers and codes.
+
+Every `SLOW_QUERY_FLUSH_SECONDS` the buffer is aggregated by fingerprint
+and the `SLOW_QUERY_TOP_N` fingerprints with the most total time are added
+to the `SlowQuery` table by a background task. The flush waits for the
+connection to leave its transaction, so no sample is lost to a rollback.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+WHITESPACE = re.compile(r'\s+')
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_local = threading.local()
+
+
+def normalize(sql):
+    """Return the SQL with the literals and placeholder lists replaced."""
+    sql = STRING.sub('?', sql)
+    sql = NUMBER.sub('?', sql)
+    sql = PLACEHOLDER_LIST.sub('%s, ...', sql)
+    return WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    """Return the fingerprint of the statement, equal for all its parameters."""
+    return hashlib.blake2b(normalize(sql).encode(), digest_size=8).hexdigest()
+
+
+def params_fingerprint(params):
+    """Return a hash of the parameters, to tell repeated calls apart."""
+    return hashlib.blake2b(repr(params).encode(), digest_size=8).hexdigest()
+
+
+def call_site():
+    """Return the innermost frame of the project code as `path:line in function`."""
+    source_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(source_dir) and not filename.startswith(PACKAGE_DIR):
+            return f'{os.path.relpath(filename, source_dir)}:{frame.lineno} in {frame.name}'
+    return ''
+
+
+def explain(connection, sql, params):
+    """
+    Return the plan of the statement without running it.
+
+    Only plain DML is explained. The `EXPLAIN` runs in a savepoint, so a
+    failure does not break the transaction of the caller.
+    """
+    words = sql.split(None, 1)
+    if connection.vendor != 'postgresql' or not words or words[0].upper() not in EXPLAINABLE:
+        return ''
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (ANALYZE off) {sql}', params)
+            return '\n'.join(row[0] for row in cursor.fetchall())
+    except DatabaseError as error:
+        logger.debug('EXPLAIN failed: %s', error)
+        return f'EXPLAIN failed: {error}'
+
+
+@contextmanager
+def paused():
+    """Do not time the statements of the block, like the writes of the log."""
+    busy = getattr(_local, 'busy', False)
+    _local.busy = True
+    try:
+        yield
+    finally:
+        _local.busy = busy
+
+
+@dataclass
+class Sample:
+    """Execution of a slow statement."""
+
+    fingerprint: str
+    sql: str
+    params_fingerprint: str
+    call_site: str
+    duration_ms: float
+    at: datetime
+
+
+class SlowQueryLog:
+    """
+    Execute wrapper recording the slow statements, see the module docstring.
+
+    One instance is shared by the connections of all the threads.
+    """
+
+    def __init__(self, threshold_ms, buffer_size, top_n, flush_seconds, explain=True):
+        self.threshold_ms = threshold_ms
+        self.top_n = top_n
+        self.flush_seconds = flush_seconds
+        self.explain = explain
+        self.samples = deque(maxlen=buffer_size)
+        self.plans = {}
+        self.dropped = 0
+        self.flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_local, 'busy', False):
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        connection = context['connection']
+        if duration_ms >= self.threshold_ms:
+            self.record(connection, sql, params, many, duration_ms)
+        if (
+            time.monotonic() - self.flushed_at > self.flush_seconds
+            and not connection.in_atomic_block
+        ):
+            self.flush()
+        return result
+
+    def record(self, connection, sql, params, many, duration_ms):
+        """Add the statement to the buffer, explaining it if it is new."""
+        with paused():
+            key = fingerprint(sql)
+            if self.explain and key not in self.plans and not connection.needs_rollback:
+                self.plans[key] = explain(connection, sql, params[0] if many and params else params)
+            sample = Sample(
+                fingerprint=key,
+                sql=sql,
+                params_fingerprint=params_fingerprint(params),
+                call_site=call_site(),
+                duration_ms=duration_ms,
+                at=timezone.now(),
+            )
+            with self._lock:
+                if len(self.samples) == self.samples.maxlen:
+                    self.dropped += 1
+                self.samples.append(sample)
+
+    def drain(self):
+        """
+        Empty the buffer and return its top fingerprints by total time.
+
+        Each entry holds the SQL, call site and parameters fingerprint of
+        the slowest execution.
+        """
+        with self._lock:
+            samples = list(self.samples)
+            self.samples.clear()
+            plans, self.plans = self.plans, {}
+            self.flushed_at = time.monotonic()
+
+        entries = {}
+        for sample in samples:
+            entry = entries.get(sample.fingerprint)
+            if entry is None:
+                entry = entries[sample.fingerprint] = {
+                    'fingerprint': sample.fingerprint,
+                    'plan': plans.get(sample.fingerprint, ''),
+                    'calls': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'first_seen': sample.at,
+                }
+            entry['calls'] += 1
+            entry['total_ms'] += sample.duration_ms
+            entry['last_seen'] = sample.at
+            if sample.duration_ms >= entry['max_ms']:
+                entry.update(
+                    max_ms=sample.duration_ms,
+                    sql=sample.sql,
+                    call_site=sample.call_site,
+                    params_fingerprint=sample.params_fingerprint,
+                )
+        return sorted(entries.values(), key=lambda entry: entry['total_ms'], reverse=True)[:self.top_n]
+
+    def flush(self):
+        """Store the top fingerprints in the background."""
+        from .tasks import record_slow_queries
+
+        dropped, self.dropped = self.dropped, 0
+        if dropped:
+            logger.warning('%d slow queries were dropped, the buffer is full', dropped)
+        entries = self.drain()
+        if entries:
+            record_slow_queries.defer(entries)
+
+
+_log = None
+_log_pid = None
+_log_lock = threading.Lock()
+
+
+def get_log():
+    """Return the slow query log of the current process."""
+    global _log, _log_pid
+    if _log_pid != os.getpid():
+        with _log_lock:
+            if _log_pid != os.getpid():
+                _log_pid = os.getpid()
+                _log = SlowQueryLog(
+                    threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+                    buffer_size=settings.SLOW_QUERY_BUFFER_SIZE,
+                    top_n=settings.SLOW_QUERY_TOP_N,
+                    flush_seconds=settings.SLOW_QUERY_FLUSH_SECONDS,
+                    explain=settings.SLOW_QUERY_EXPLAIN,
+                )
+    return _log
+
+
+def install(sender, connection, **kwargs):
+    """Add the slow query log to the wrappers of a new connection."""
+    log = get_log()
+    if log not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log)
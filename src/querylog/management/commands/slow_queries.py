@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+
+from querylog.models import SlowQuery
+
+ORDERINGS = {
+    'total': '-total_ms',
+    'max': '-max_ms',
+    'calls': '-calls',
+    'recent': '-last_seen',
+}
+
+
+class Command(BaseCommand):
+    help = 'Show the slow queries recorded by the slow query log.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Number of queries to show.'
+        )
+        parser.add_argument(
+            '--order',
+            choices=ORDERINGS,
+            default='total',
+            help='Order of the queries.'
+        )
+        parser.add_argument(
+            '--plan',
+            action='store_true',
+            help='Show the SQL and the plan of each query.'
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Delete the recorded queries.'
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} slow queries.'))
+            return
+
+        queries = SlowQuery.objects.order_by(ORDERINGS[options['order']])[:options['limit']]
+        for query in queries:
+            self.stdout.write(
+                f'{query.total_ms:10.0f} ms total {query.calls:8d} calls '
+                f'{query.mean_ms:8.1f} ms mean {query.max_ms:8.1f} ms max  '
+                f'{query.call_site or "?"} [{query.fingerprint}]'
+            )
+            if options['plan']:
+                self.stdout.write(f'\n{query.sql}\n\n{query.plan or "(no plan)"}\n')
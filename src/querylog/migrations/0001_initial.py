@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:04
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=32, unique=True, verbose_name='fingerprint')),
+                ('sql', models.TextField(verbose_name='SQL')),
+                ('call_site', models.CharField(blank=True, max_length=255, verbose_name='call site')),
+                ('params_fingerprint', models.CharField(blank=True, max_length=32, verbose_name='parameters fingerprint')),
+                ('plan', models.TextField(blank=True, verbose_name='plan')),
+                ('calls', models.PositiveBigIntegerField(default=0, verbose_name='calls')),
+                ('total_ms', models.FloatField(default=0, verbose_name='total time, ms')),
+                ('max_ms', models.FloatField(default=0, verbose_name='max time, ms')),
+                ('first_seen', models.DateTimeField(default=django.utils.timezone.now, verbose_name='first seen')),
+                ('last_seen', models.DateTimeField(default=django.utils.timezone.now, verbose_name='last seen')),
+            ],
+            options={
+                'verbose_name': 'slow query',
+                'verbose_name_plural': 'slow queries',
+                'ordering': ['-total_ms'],
+            },
+        ),
+    ]
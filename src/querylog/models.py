@@ -0,0 +1,66 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class SlowQuery(models.Model):
+    """Slow statements with the same fingerprint, aggregated over time."""
+
+    fingerprint = models.CharField(
+        verbose_name=_('fingerprint'),
+        max_length=32,
+        unique=True
+    )
+    sql = models.TextField(
+        verbose_name=_('SQL')
+    )
+    call_site = models.CharField(
+        verbose_name=_('call site'),
+        max_length=255,
+        blank=True
+    )
+    params_fingerprint = models.CharField(
+        verbose_name=_('parameters fingerprint'),
+        max_length=32,
+        blank=True
+    )
+    plan = models.TextField(
+        verbose_name=_('plan'),
+        blank=True
+    )
+    calls = models.PositiveBigIntegerField(
+        verbose_name=_('calls'),
+        default=0
+    )
+    total_ms = models.FloatField(
+        verbose_name=_('total time, ms'),
+        default=0
+    )
+    max_ms = models.FloatField(
+        verbose_name=_('max time, ms'),
+        default=0
+    )
+    first_seen = models.DateTimeField(
+        verbose_name=_('first seen'),
+        default=timezone.now
+    )
+    last_seen = models.DateTimeField(
+        verbose_name=_('last seen'),
+        default=timezone.now
+    )
+
+    class Meta:
+        """Metadata."""
+
+        verbose_name = _('slow query')
+        verbose_name_plural = _('slow queries')
+        ordering = ['-total_ms']
+
+    def __str__(self):
+        """Return the call site of the query, or its fingerprint."""
+        return self.call_site or self.fingerprint
+
+    @property
+    def mean_ms(self):
+        """Return the mean time of the query in milliseconds."""
+        return self.total_ms / self.calls if self.calls else 0
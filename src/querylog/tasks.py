@@ -0,0 +1,39 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from tasks.registry import task
+
+from .capture import paused
+from .models import SlowQuery
+
+
+def add_entry(entry):
+    """Add the aggregated executions to the row of their fingerprint."""
+    updates = {
+        'calls': F('calls') + entry['calls'],
+        'total_ms': F('total_ms') + entry['total_ms'],
+        'max_ms': Greatest('max_ms', Value(entry['max_ms'])),
+        'last_seen': entry['last_seen'],
+        'sql': entry['sql'],
+        'call_site': entry['call_site'][:255],
+        'params_fingerprint': entry['params_fingerprint'],
+    }
+    if entry['plan']:
+        updates['plan'] = entry['plan']
+    return SlowQuery.objects.filter(fingerprint=entry['fingerprint']).update(**updates)
+
+
+@task
+def record_slow_queries(entries):
+    """Store the slow queries aggregated by a process."""
+    with paused():
+        for entry in entries:
+            if add_entry(entry):
+                continue
+            try:
+                with transaction.atomic():
+                    SlowQuery.objects.create(**{**entry, 'call_site': entry['call_site'][:255]})
+            except IntegrityError:
+                # Created by another process in the meantime.
+                add_entry(entry)
@@ -0,0 +1,49 @@
+from django.contrib import admin
+
+from .models import ReferralEvent, WebhookDelivery, WebhookEndpoint
+
+
+@admin.register(ReferralEvent)
+class ReferralEventAdmin(admin.ModelAdmin):
+    """Admin configuration for the ReferralEvent model."""
+
+    list_display = ('id', 'type', 'invite_code', 'invitee_id', 'inviter_id', 'created_at')
+    list_filter = ('type',)
+    search_fields = ('invite_code',)
+    readonly_fields = ('type', 'invitee_id', 'inviter_id', 'invite_code', 'created_at')
+    show_full_result_count = False
+
+    def has_add_permission(self, request, obj=None):
+        """Events are only added by the application."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """The event log is append-only."""
+        return False
+
+
+@admin.register(WebhookEndpoint)
+class WebhookEndpointAdmin(admin.ModelAdmin):
+    """Admin configuration for the WebhookEndpoint model."""
+
+    list_display = ('url', 'event_types', 'is_active', 'max_concurrency', 'max_batch_size', 'created')
+    list_filter = ('is_active',)
+    search_fields = ('url',)
+
+
+@admin.register(WebhookDelivery)
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    """Admin configuration for the WebhookDelivery model."""
+
+    list_display = ('event', 'endpoint', 'status', 'attempts', 'next_attempt_at', 'delivered_at')
+    list_filter = ('status', 'endpoint')
+    list_select_related = ('event', 'endpoint')
+    readonly_fields = (
+        'endpoint', 'event', 'status', 'attempts', 'next_attempt_at',
+        'batch_id', 'delivered_at', 'last_error'
+    )
+    show_full_result_count = False
+
+    def has_add_permission(self, request, obj=None):
+        """Deliveries are only added by the application."""
+        return False
@@ -0,0 +1,151 @@
+"""
+Attaching users to their inviters.
+
+A user is attached once: the referral code is set by a conditional update
+of the `invited_by_code` column alone, which matches only while the column
+is NULL. Concurrent attempts for the same user are serialized by the row
+lock, and the ones committing second match no row and report the code
+already set, so the inviter's `invited_count` is bumped exactly once, in
+the same statement. Full saves of a user never write these columns, see
+`User.save`.
+"""
+
+from dataclasses import dataclass
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import F
+
+from users import invite_codes
+from users.models import ArchivedUser
+
+from . import events
+
+ATTACHED = 'attached'
+ALREADY_ATTACHED = 'already_attached'
+INVALID_CODE = 'invalid_code'
+OWN_CODE = 'own_code'
+
+# Outcomes of a valid code, reported by the API.
+STATUSES = (ATTACHED, ALREADY_ATTACHED)
+
+# The counters are only bumped when the invitee row was updated. The outer
+# query sees the rows as they were before the statement.
+ATTACH = """
+WITH attached AS (
+    UPDATE {users} SET invited_by_code = %(code)s
+    WHERE id = %(user_id)s AND invited_by_code IS NULL
+    RETURNING id
+), counted AS (
+    UPDATE {users} SET invited_count = invited_count + 1
+    WHERE id = %(inviter_id)s AND EXISTS (SELECT FROM attached)
+    RETURNING id
+), counted_archived AS (
+    UPDATE {archive} SET invited_count = invited_count + 1
+    WHERE id = %(inviter_id)s AND EXISTS (SELECT FROM attached)
+    RETURNING id
+)
+SELECT EXISTS (SELECT FROM attached), invited_by_code FROM {users} WHERE id = %(user_id)s
+"""
+
+# Sets the counters of all the users from their invitees, archived or not.
+RECOUNT = """
+WITH counts AS (
+    SELECT upper(invited_by_code) AS code, count(*) AS invited
+    FROM (
+        SELECT invited_by_code FROM {users}
+        UNION ALL
+        SELECT invited_by_code FROM {archive}
+    ) AS invitees
+    WHERE invited_by_code IS NOT NULL
+    GROUP BY 1
+)
+UPDATE {table} AS inviter SET invited_count = coalesce(counts.invited, 0)
+FROM {table} AS counted LEFT JOIN counts ON counts.code = upper(counted.invite_code)
+WHERE inviter.id = counted.id AND inviter.invited_count <> coalesce(counts.invited, 0)
+"""
+
+
+@dataclass
+class AttachResult:
+    """Outcome of attaching a user, with the referral code the user has afterwards."""
+
+    status: str
+    invited_by_code: str = None
+    inviter_id: int = None
+
+    @property
+    def attached(self):
+        return self.status == ATTACHED
+
+
+def _attach_postgresql(user_id, inviter_id, code):
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(ATTACH.format(
+            users=quote(get_user_model()._meta.db_table),
+            archive=quote(ArchivedUser._meta.db_table),
+        ), {'code': code, 'user_id': user_id, 'inviter_id': inviter_id})
+        attached, current_code = cursor.fetchone() or (False, None)
+    if not attached and current_code is None:
+        # Attached by a transaction that committed after the statement began.
+        current_code = get_user_model().objects.filter(pk=user_id).values_list('invited_by_code', flat=True).first()
+    return attached, current_code
+
+
+def _attach_orm(user_id, inviter_id, code):
+    User = get_user_model()
+    with transaction.atomic():
+        attached = User.objects.filter(pk=user_id, invited_by_code__isnull=True).update(invited_by_code=code)
+        if attached:
+            for model in (User, ArchivedUser):
+                model.objects.filter(pk=inviter_id).update(invited_count=F('invited_count') + 1)
+            return True, None
+    return False, User.objects.filter(pk=user_id).values_list('invited_by_code', flat=True).first()
+
+
+def attach(user_id, code, inviter_id=None):
+    """
+    Attach the user to the owner of the invite code, unless already attached.
+
+    `inviter_id`, if already looked up, saves the lookup of the code.
+    Returns an `AttachResult`; a referral event is logged when attached.
+    """
+    code = invite_codes.InviteCodeIndex.normalize(code)
+    if inviter_id is None:
+        inviter_id = invite_codes.lookup(code)
+    if inviter_id is None:
+        return AttachResult(INVALID_CODE)
+    if inviter_id == user_id:
+        return AttachResult(OWN_CODE)
+
+    if connection.vendor == 'postgresql':
+        attached, current_code = _attach_postgresql(user_id, inviter_id, code)
+    else:
+        attached, current_code = _attach_orm(user_id, inviter_id, code)
+    if not attached:
+        return AttachResult(ALREADY_ATTACHED, current_code)
+    events.referral_attached(user_id, inviter_id, code)
+    return AttachResult(ATTACHED, code, inviter_id)
+
+
+def forget_invitee(code):
+    """Decrement the invited count of the owner of the code, whose invitee was deleted."""
+    User = get_user_model()
+    for model in (User, ArchivedUser):
+        model.objects.filter(invite_code__iexact=code, invited_count__gt=0).update(
+            invited_count=F('invited_count') - 1
+        )
+
+
+def recount():
+    """Set the invited counts of all the users from their invitees."""
+    quote = connection.ops.quote_name
+    users = quote(get_user_model()._meta.db_table)
+    archive = quote(ArchivedUser._meta.db_table)
+    updated = 0
+    with connection.cursor() as cursor:
+        for table in (users, archive):
+            cursor.execute(RECOUNT.format(users=users, archive=archive, table=table))
+            updated += cursor.rowcount
+    return updated
@@ -0,0 +1,136 @@
+"""
+Referral event log.
+
+Events are handed to a per-process writer once the transaction producing
+them commits, so the request only appends them to a list. A background
+thread writes the buffered events in one `INSERT` every
+`REFERRAL_EVENTS_FLUSH_SECONDS`, or as soon as `REFERRAL_EVENTS_BATCH_SIZE`
+of them are waiting, along with their deliveries to the subscribed webhook
+endpoints, and wakes up the `run_webhook_worker` process and the live
+notifications of `referrals.live`.
+
+The buffer is flushed when the process exits normally. Events buffered by
+a process that is killed are lost.
+"""
+
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from . import live
+from .models import ReferralEvent, WebhookDelivery, WebhookEndpoint
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'webhooks'
+
+
+class EventWriter:
+    """Batching writer of the referral events, see the module docstring."""
+
+    def __init__(self, batch_size, flush_seconds):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.buffer = []
+        self.written = self.batches = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def append(self, event):
+        """Buffer the unsaved event for the next write."""
+        with self._lock:
+            self.buffer.append(event)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='referral-events', daemon=True)
+                self._thread.start()
+            if len(self.buffer) >= self.batch_size:
+                self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Writing the referral events failed')
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """Write the buffered events and their deliveries, returning their number."""
+        with self._lock:
+            events, self.buffer = self.buffer, []
+        if not events:
+            return 0
+
+        try:
+            with transaction.atomic():
+                ReferralEvent.objects.bulk_create(events)
+                deliveries = [
+                    WebhookDelivery(endpoint=endpoint, event=event)
+                    for endpoint in WebhookEndpoint.objects.filter(is_active=True)
+                    for event in events
+                    if endpoint.accepts(event.type)
+                ]
+                WebhookDelivery.objects.bulk_create(deliveries, batch_size=1000)
+                if connection.vendor == 'postgresql':
+                    with connection.cursor() as cursor:
+                        if deliveries:
+                            cursor.execute(f'NOTIFY {CHANNEL}')
+                        cursor.execute(
+                            'SELECT pg_notify(%s, %s)',
+                            [live.CHANNEL, f'{events[0].pk},{events[-1].pk}']
+                        )
+        except Exception:
+            # Keep the events for the next attempt, without the IDs of the
+            # rolled back insert.
+            for event in events:
+                event.pk = None
+            with self._lock:
+                self.buffer[:0] = events
+            raise
+
+        self.written += len(events)
+        self.batches += 1
+        return len(events)
+
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Return the event writer of the current process."""
+    global _writer, _writer_pid
+    if _writer_pid != os.getpid():
+        with _writer_lock:
+            if _writer_pid != os.getpid():
+                _writer = EventWriter(
+                    settings.REFERRAL_EVENTS_BATCH_SIZE,
+                    settings.REFERRAL_EVENTS_FLUSH_SECONDS,
+                )
+                _writer_pid = os.getpid()
+                atexit.register(_writer.flush)
+    return _writer
+
+
+def referral_attached(invitee_id, inviter_id, invite_code):
+    """Log that the user was attached to the inviter, once the transaction commits."""
+    if not settings.REFERRAL_EVENTS_ENABLED:
+        return
+    event = ReferralEvent(
+        type=ReferralEvent.ATTACHED,
+        invitee_id=invitee_id,
+        inviter_id=inviter_id,
+        invite_code=invite_code.strip().upper(),
+        created_at=timezone.now(),
+    )
+    transaction.on_commit(lambda: get_writer().append(event))
@@ -0,0 +1,422 @@
+"""
+Referral graph analytics.
+
+The referral relation of all the users, archived or not, is exported with
+one query into NumPy arrays indexed by position in the sorted user IDs:
+`parent` holds the position of each user's inviter (-1 for none) and the
+invitees of each user are stored in compressed sparse row form, the
+invitees of the user at position `i` being `children[indptr[i]:indptr[i + 1]]`.
+Depths, downline sizes and subtree heights are then computed for all the
+users at once, one vectorized step per level of the graph.
+
+Referral codes can form cycles (A invited by B, B invited by A), which only
+abuse or manual edits produce. Their members are found by pointer jumping
+over the users no root reaches, and the inviter edges closing the cycles
+are left out of `children`, so each cycle member is counted as the root of
+its own subtree.
+
+The snapshot is saved to `REFERRAL_GRAPH_ROOT` as `.npy` files and loaded
+back memory-mapped, so the processes serving the analytics share its pages
+and do not rebuild it for `REFERRAL_GRAPH_MAX_AGE_SECONDS`. Rebuilds hold a
+file lock on the directory, so processes finding an expired snapshot at the
+same time wait for one export instead of each running their own.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.utils import timezone
+
+from users.models import ArchivedUser
+
+logger = logging.getLogger(__name__)
+
+# One row per user with the ID of its inviter, 0 for none or an unknown code.
+# Archived users keep their referrals and their invitees. The inviters are
+# joined table by table, whose upper(invite_code) statistics let the planner
+# pick a hash join, instead of looking up each code in the index.
+EXPORT = """
+SELECT invitee.id::bigint AS id, coalesce(inviter.id, archived_inviter.id, 0)::bigint AS inviter_id
+FROM (
+    SELECT id, invited_by_code FROM {users}
+    UNION ALL
+    SELECT id, invited_by_code FROM {archive}
+) AS invitee
+LEFT JOIN {users} AS inviter
+    ON upper(inviter.invite_code) = upper(invitee.invited_by_code)
+LEFT JOIN {archive} AS archived_inviter
+    ON upper(archived_inviter.invite_code) = upper(invitee.invited_by_code)
+"""
+
+# The same rows packed by PostgreSQL as big-endian bigint pairs, one bytea of
+# at most 2^20 users (16 MiB) per row, read by NumPy without a Python object
+# per value.
+EXPORT_PACKED = """
+SELECT string_agg(int8send(edges.id) || int8send(edges.inviter_id), ''::bytea)
+FROM ({export}) AS edges
+GROUP BY edges.id >> 20
+"""
+
+# Rows fetched at a time from other databases.
+CHUNK_SIZE = 100000
+
+# Arrays of a snapshot, saved as <name>.npy.
+ARRAYS = ('ids', 'parent', 'indptr', 'children', 'depth', 'downline', 'height', 'cycle_members', 'cycle_labels')
+
+# File naming the current snapshot directory, replaced atomically.
+CURRENT = 'current.json'
+
+# File locked while a snapshot is rebuilt.
+LOCK = '.lock'
+
+
+def export_edges():
+    """Return the sorted user IDs and the ID of each user's inviter, 0 for none."""
+    quote = connection.ops.quote_name
+    sql = EXPORT.format(
+        users=quote(get_user_model()._meta.db_table),
+        archive=quote(ArchivedUser._meta.db_table),
+    )
+    chunks = []
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(EXPORT_PACKED.format(export=sql))
+            for packed, in cursor.fetchall():
+                chunks.append(np.frombuffer(packed, dtype='>i8').reshape(-1, 2))
+    else:
+        with connection.chunked_cursor() as cursor:
+            cursor.execute(sql)
+            while True:
+                rows = cursor.fetchmany(CHUNK_SIZE)
+                if not rows:
+                    break
+                chunks.append(np.array(rows, dtype=np.int64))
+    rows = np.concatenate(chunks).astype(np.int64) if chunks else np.empty((0, 2), dtype=np.int64)
+    rows = rows[np.argsort(rows[:, 0], kind='stable')]
+    return rows[:, 0].copy(), rows[:, 1].copy()
+
+
+def to_positions(ids, parent_ids):
+    """Return the position of each inviter in `ids`, -1 for none or unknown."""
+    positions = np.searchsorted(ids, parent_ids).astype(np.int32)
+    found = positions < len(ids)
+    found[found] = ids[positions[found]] == parent_ids[found]
+    positions[~found] = -1
+    return positions
+
+
+def to_csr(parent):
+    """Return the invitees of each position in compressed sparse row form."""
+    invited = np.flatnonzero(parent >= 0).astype(np.int32)
+    counts = np.bincount(parent[invited], minlength=len(parent))
+    indptr = np.zeros(len(parent) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    children = invited[np.argsort(parent[invited], kind='stable')]
+    return indptr, children
+
+
+def gather(indptr, children, nodes):
+    """Return the invitees of the nodes, grouped by node in order, and their number per node."""
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    offsets = np.cumsum(counts) - counts
+    positions = np.arange(int(counts.sum()), dtype=np.int64) + np.repeat(starts - offsets, counts)
+    return children[positions], counts
+
+
+def find_levels(indptr, children, roots):
+    """Return the levels of a breadth-first traversal from the roots, as (nodes, invitee counts) pairs."""
+    levels = []
+    nodes = roots
+    while len(nodes):
+        invitees, counts = gather(indptr, children, nodes)
+        levels.append((nodes, counts))
+        nodes = invitees
+    return levels
+
+
+def find_cycles(parent, reached):
+    """
+    Return the positions of the users on a cycle and the label of their cycle.
+
+    Only users not reached from a root can be on a cycle, and their inviters
+    are not reached either. Following the inviters 2^k >= n times from each
+    of them lands on a cycle, and on a cycle this map is a bijection, so the
+    landing points are exactly the cycle members. A cycle is labelled by its
+    lowest position, the minimum along 2^k steps from any of its members.
+    """
+    candidates = np.flatnonzero(~reached).astype(np.int32)
+    if not len(candidates):
+        return candidates, candidates
+    rounds = int(np.ceil(np.log2(len(candidates)))) + 1
+    jump = np.searchsorted(candidates, parent[candidates]).astype(np.int32)
+    for _ in range(rounds):
+        jump = jump[jump]
+    members = candidates[np.unique(jump)]
+
+    jump = np.searchsorted(members, parent[members]).astype(np.int32)
+    lowest = np.arange(len(members), dtype=np.int32)
+    for _ in range(int(np.ceil(np.log2(len(members)))) + 1):
+        lowest = np.minimum(lowest, lowest[jump])
+        jump = jump[jump]
+    return members, members[lowest]
+
+
+def analyze(ids, parent_ids):
+    """Build the arrays of a snapshot from the users and their inviters."""
+    parent = to_positions(ids, parent_ids)
+    indptr, children = to_csr(parent)
+    roots = np.flatnonzero(parent < 0).astype(np.int32)
+    reached = np.zeros(len(ids), dtype=bool)
+    for nodes, _ in find_levels(indptr, children, roots):
+        reached[nodes] = True
+    cycle_members, cycle_labels = find_cycles(parent, reached)
+
+    if len(cycle_members):
+        # Cut the edges closing the cycles, their members become roots.
+        forest = parent.copy()
+        forest[cycle_members] = -1
+        indptr, children = to_csr(forest)
+        roots = np.flatnonzero(forest < 0).astype(np.int32)
+
+    depth = np.zeros(len(ids), dtype=np.int32)
+    downline = np.zeros(len(ids), dtype=np.int32)
+    height = np.zeros(len(ids), dtype=np.int32)
+    levels = find_levels(indptr, children, roots)
+    for level, (nodes, _) in enumerate(levels):
+        depth[nodes] = level
+    # From the deepest level up, each level's invitees are grouped by inviter.
+    for (nodes, counts), (invitees, _) in zip(reversed(levels[:-1]), reversed(levels[1:])):
+        inviting = counts > 0
+        starts = (np.cumsum(counts) - counts)[inviting]
+        downline[nodes[inviting]] = np.add.reduceat(downline[invitees] + 1, starts)
+        height[nodes[inviting]] = np.maximum.reduceat(height[invitees], starts) + 1
+
+    return {
+        'ids': ids,
+        'parent': parent,
+        'indptr': indptr,
+        'children': children,
+        'depth': depth,
+        'downline': downline,
+        'height': height,
+        'cycle_members': cycle_members,
+        'cycle_labels': cycle_labels,
+    }
+
+
+class Snapshot:
+    """Referral graph arrays with the metrics derived from them."""
+
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @property
+    def built_at(self):
+        return timezone.datetime.fromisoformat(self.meta['built_at'])
+
+    @property
+    def age(self):
+        return (timezone.now() - self.built_at).total_seconds()
+
+    def position(self, user_id):
+        """Return the position of the user, or None if not in the snapshot."""
+        position = int(np.searchsorted(self.ids, user_id))
+        if position < len(self.ids) and self.ids[position] == user_id:
+            return position
+        return None
+
+    def node(self, position):
+        """Return the metrics of the user at the position."""
+        parent = int(self.parent[position])
+        return {
+            'user_id': int(self.ids[position]),
+            'inviter_id': int(self.ids[parent]) if parent >= 0 else None,
+            'depth': int(self.depth[position]),
+            'invitees': int(self.indptr[position + 1] - self.indptr[position]),
+            'downline': int(self.downline[position]),
+            'height': int(self.height[position]),
+        }
+
+    def top_subtrees(self, count):
+        """Return the metrics of the users with the largest downlines."""
+        count = min(count, len(self.ids))
+        if not count:
+            return []
+        top = np.argpartition(-self.downline, count - 1)[:count]
+        top = top[np.lexsort((self.ids[top], -self.downline[top]))]
+        return [self.node(position) for position in top]
+
+    def cycles(self, count):
+        """Return the largest cycles, by number of members, with the downline hanging from them."""
+        if not len(self.cycle_members):
+            return []
+        order = np.argsort(self.cycle_labels, kind='stable')
+        labels, starts, sizes = np.unique(self.cycle_labels[order], return_index=True, return_counts=True)
+        cycles = []
+        for index in np.lexsort((labels, -sizes))[:count]:
+            members = self.cycle_members[order[starts[index]:starts[index] + sizes[index]]]
+            cycles.append({
+                'user_ids': self.ids[members].tolist(),
+                'downline': int(self.downline[members].sum()),
+            })
+        return cycles
+
+    def summary(self, top=10, cycles=10):
+        """Return the whole-graph metrics."""
+        invited = int((self.parent >= 0).sum())
+        depths = np.bincount(self.depth) if len(self.depth) else np.zeros(1, dtype=np.int64)
+        return {
+            'built_at': self.meta['built_at'],
+            'users': len(self.ids),
+            'invited': invited,
+            'roots': len(self.ids) - invited,
+            'max_depth': len(depths) - 1,
+            'depth_distribution': depths.tolist(),
+            'top_subtrees': self.top_subtrees(top),
+            'cycle_count': len(np.unique(self.cycle_labels)),
+            'cycle_users': len(self.cycle_members),
+            'cycles': self.cycles(cycles),
+        }
+
+
+def build():
+    """Export the referral graph, analyze it and return the snapshot, with the time of each step."""
+    started = time.perf_counter()
+    built_at = timezone.now()
+    ids, parent_ids = export_edges()
+    exported = time.perf_counter()
+    arrays = analyze(ids, parent_ids)
+    analyzed = time.perf_counter()
+    meta = {
+        'built_at': built_at.isoformat(),
+        'users': len(ids),
+        'export_seconds': round(exported - started, 3),
+        'analyze_seconds': round(analyzed - exported, 3),
+    }
+    return Snapshot(arrays, meta)
+
+
+def save(snapshot, root=None):
+    """
+    Save the snapshot, replacing the current one of the directory.
+
+    The snapshot is written into a temporary directory renamed into place,
+    and only the snapshot it replaces is removed afterwards, so concurrent
+    saves never remove each other's files.
+    """
+    root = root or settings.REFERRAL_GRAPH_ROOT
+    os.makedirs(root, exist_ok=True)
+    name = f'snapshot-{time.time_ns()}-{os.getpid()}'
+    temp_path = os.path.join(root, f'.{name}')
+    os.makedirs(temp_path)
+    try:
+        for array in ARRAYS:
+            np.save(os.path.join(temp_path, f'{array}.npy'), getattr(snapshot, array))
+        with open(os.path.join(temp_path, 'meta.json'), 'w') as file:
+            json.dump(snapshot.meta, file)
+        os.replace(temp_path, os.path.join(root, name))
+    except BaseException:
+        shutil.rmtree(temp_path, ignore_errors=True)
+        raise
+
+    current = os.path.join(root, CURRENT)
+    try:
+        with open(current) as file:
+            previous = json.load(file).get('name')
+    except (OSError, ValueError, AttributeError):
+        previous = None
+    with open(f'{current}.{os.getpid()}', 'w') as file:
+        json.dump({'name': name}, file)
+    os.replace(f'{current}.{os.getpid()}', current)
+    # Processes still mapping the previous snapshot keep its pages until they reload.
+    if previous and previous.startswith('snapshot-') and previous != name:
+        shutil.rmtree(os.path.join(root, previous), ignore_errors=True)
+
+
+def load(root=None):
+    """Return the current snapshot of the directory, memory-mapped, or None."""
+    root = root or settings.REFERRAL_GRAPH_ROOT
+    try:
+        with open(os.path.join(root, CURRENT)) as file:
+            path = os.path.join(root, json.load(file)['name'])
+        with open(os.path.join(path, 'meta.json')) as file:
+            meta = json.load(file)
+        arrays = {
+            array: np.load(os.path.join(path, f'{array}.npy'), mmap_mode='r')
+            for array in ARRAYS
+        }
+    except (OSError, ValueError, KeyError):
+        return None
+    return Snapshot(arrays, meta)
+
+
+@contextmanager
+def lock(root=None):
+    """Hold the rebuild lock of the directory, shared by all the processes."""
+    root = root or settings.REFERRAL_GRAPH_ROOT
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, LOCK), 'a') as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def rebuild(max_age=None, root=None):
+    """
+    Build and save a snapshot under the rebuild lock, and return it.
+
+    The saved snapshot is returned instead when it was built while waiting
+    for the lock, or is at most `max_age` seconds old.
+    """
+    requested_at = timezone.now()
+    with lock(root):
+        saved = load(root)
+        if saved is not None and (
+            saved.built_at >= requested_at or (max_age is not None and saved.age <= max_age)
+        ):
+            return saved
+        snapshot = build()
+        save(snapshot, root)
+        logger.info(
+            'Built the referral graph of %d users in %.2fs',
+            snapshot.meta['users'], snapshot.meta['export_seconds'] + snapshot.meta['analyze_seconds']
+        )
+        return load(root) or snapshot
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot(max_age=None):
+    """
+    Return a snapshot at most `max_age` seconds old, building and saving it if needed.
+
+    The snapshot saved by another process is loaded when it is newer than
+    the one in memory.
+    """
+    global _snapshot
+    max_age = settings.REFERRAL_GRAPH_MAX_AGE_SECONDS if max_age is None else max_age
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.age > max_age:
+            saved = load()
+            if saved is not None and (_snapshot is None or saved.built_at > _snapshot.built_at):
+                _snapshot = saved
+        if _snapshot is None or _snapshot.age > max_age:
+            _snapshot = rebuild(max_age)
+        return _snapshot
@@ -0,0 +1,252 @@
+"""
+Live referral notifications.
+
+Each process serving `GET /api/v1/users/current_user/events` runs one
+broker thread listening to the `referral_events` channel, notified by the
+event writer with the ID range of every batch it commits. The broker reads
+the new events once and hands each one to the streams of its inviter
+through their asyncio queues, so an idle stream costs a queue and a
+suspended coroutine, without a database connection or a query of its own.
+
+Streams resuming with `Last-Event-ID` first replay the events they missed
+from the event log. A stream that falls `SSE_QUEUE_SIZE` events behind is
+closed, and the client catches up the same way when it reconnects.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, connection
+
+from config import db
+
+from .models import ReferralEvent
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'referral_events'
+
+# Number of dispatched event IDs remembered to drop the ones notified twice.
+SEEN_SIZE = 10000
+
+
+def invitee_phones(events):
+    """Return the phones of the invitees of the events by user ID."""
+    User = get_user_model()
+    ids = {event.invitee_id for event in events}
+    return {
+        pk: str(phone)
+        for pk, phone in User.objects.filter(pk__in=ids).values_list('pk', 'phone')
+    }
+
+
+def format_event(event, phones):
+    """Return the event as a server-sent event message."""
+    data = {
+        'id': event.pk,
+        'type': event.type,
+        'created_at': event.created_at.isoformat(),
+        'invite_code': event.invite_code,
+        'invitee': {'id': event.invitee_id, 'phone': phones.get(event.invitee_id)},
+    }
+    return f'id: {event.pk}\nevent: {event.type}\ndata: {json.dumps(data)}\n\n'
+
+
+class Subscription:
+    """Queue of the `(event ID, message)` pairs for one stream."""
+
+    def __init__(self, user_id, queue_size):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def put(self, message):
+        """Queue the message from the broker thread."""
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Close the lagging stream, the client resumes from the log.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class Broker:
+    """Fan-out of the new referral events to the streams, see the module docstring."""
+
+    def __init__(self, poll_interval, queue_size):
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.subscriptions = {}
+        self.last_id = None
+        self.seen = deque(maxlen=SEEN_SIZE)
+        self._seen_ids = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, user_id):
+        """Return a new subscription to the events of the inviter."""
+        subscription = Subscription(user_id, self.queue_size)
+        with self._lock:
+            self.subscriptions.setdefault(user_id, set()).add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='referral-live', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Stop delivering the events to the subscription."""
+        with self._lock:
+            subscriptions = self.subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.subscriptions.pop(subscription.user_id, None)
+
+    @property
+    def streams(self):
+        """Return the number of open streams."""
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self.subscriptions.values())
+
+    def _run(self):
+        while True:
+            try:
+                self.listen()
+            except Exception:
+                logger.exception('Listening to the referral events failed')
+                close_old_connections()
+                connection.close()
+                time.sleep(self.poll_interval)
+
+    def listen(self):
+        """Dispatch the events notified on the channel until the connection fails."""
+        db.listen(connection, CHANNEL)
+        if self.last_id is None:
+            self.last_id = ReferralEvent.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        # Catch up with the events committed while not listening.
+        self.dispatch(ReferralEvent.objects.filter(pk__gt=self.last_id))
+        while True:
+            ranges = [
+                [int(value) for value in payload.split(',')]
+                for payload in db.wait_for_notifications(connection, self.poll_interval)
+            ]
+            if ranges:
+                firsts, lasts = zip(*ranges)
+                self.dispatch(ReferralEvent.objects.filter(pk__gte=min(firsts), pk__lte=max(lasts)))
+
+    def dispatch(self, queryset):
+        """Queue the events of the queryset to the streams of their inviters."""
+        with self._lock:
+            subscribed = set(self.subscriptions)
+        events = [
+            event for event in queryset.filter(type=ReferralEvent.ATTACHED).order_by('pk')
+            if event.pk not in self._seen_ids
+        ]
+        for event in events:
+            if len(self.seen) == self.seen.maxlen:
+                self._seen_ids.discard(self.seen[0])
+            self.seen.append(event.pk)
+            self._seen_ids.add(event.pk)
+            self.last_id = max(self.last_id, event.pk)
+
+        events = [event for event in events if event.inviter_id in subscribed]
+        if not events:
+            return
+        phones = invitee_phones(events)
+        for event in events:
+            message = format_event(event, phones)
+            with self._lock:
+                subscriptions = list(self.subscriptions.get(event.inviter_id, ()))
+            for subscription in subscriptions:
+                subscription.put((event.pk, message))
+
+
+_broker = None
+_broker_pid = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the broker of the current process."""
+    global _broker, _broker_pid
+    if _broker_pid != os.getpid():
+        with _broker_lock:
+            if _broker_pid != os.getpid():
+                _broker = Broker(settings.SSE_POLL_INTERVAL, settings.SSE_QUEUE_SIZE)
+                _broker_pid = os.getpid()
+    return _broker
+
+
+def replay(user_id, last_event_id):
+    """
+    Return the messages of the events of the inviter after the given one.
+
+    Runs in the thread of the request, whose connection would otherwise
+    stay open as long as the stream, so it is closed before returning.
+    """
+    try:
+        events = list(
+            ReferralEvent.objects
+            .filter(type=ReferralEvent.ATTACHED, inviter_id=user_id, pk__gt=last_event_id)
+            .order_by('pk')[:settings.SSE_REPLAY_LIMIT]
+        )
+        phones = invitee_phones(events)
+        return [(event.pk, format_event(event, phones)) for event in events]
+    finally:
+        connection.close()
+
+
+def heartbeat_timeout(until):
+    """Return the seconds to wait for an event before a heartbeat, 0 once the stream ends."""
+    timeout = settings.SSE_HEARTBEAT_SECONDS
+    if until is not None:
+        timeout = max(min(timeout, until - time.time()), 0)
+    return timeout
+
+
+async def stream(user_id, last_event_id=None, until=None):
+    """
+    Yield the server-sent event messages of the inviter.
+
+    Starts with the events after `last_event_id`, if given, then follows
+    the new events, with a comment every `SSE_HEARTBEAT_SECONDS` so proxies
+    keep the connection open. Ends at the `until` Unix time, the expiry of
+    the access token, or when the stream falls behind.
+    """
+    broker = get_broker()
+    # Subscribe first, so no event is lost between the replay and the live events.
+    subscription = broker.subscribe(user_id)
+    try:
+        yield f'retry: {settings.SSE_RETRY_MS}\n\n'
+        replayed = set()
+        if last_event_id is not None:
+            for pk, message in await sync_to_async(replay)(user_id, last_event_id):
+                replayed.add(pk)
+                yield message
+        while True:
+            timeout = heartbeat_timeout(until)
+            if not timeout:
+                return
+            try:
+                item = await asyncio.wait_for(subscription.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield ': heartbeat\n\n'
+                continue
+            if item is None:
+                return
+            pk, message = item
+            if pk not in replayed:
+                yield message
+    finally:
+        broker.unsubscribe(subscription)
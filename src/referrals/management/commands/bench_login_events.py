@@ -0,0 +1,103 @@
+import time
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from api.profiling import summarize
+from referrals.events import get_writer
+from referrals.models import ReferralEvent
+from users.models import AuthCode, User
+from users.phones import to_key
+
+CODE = '1234'
+PHONE_PREFIX = '+7800'
+
+
+class FastHasher(PBKDF2PasswordHasher):
+    """
+    Single-iteration hasher for the benchmark.
+
+    The code hash takes most of a login with the default iterations and does
+    not depend on the events, so it would hide the difference.
+    """
+
+    iterations = 1
+
+
+FAST_HASHERS = [f'{__name__}.FastHasher']
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the latency of logins with an invite code '
+        'with and without the referral events.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--logins',
+            type=int,
+            default=500,
+            help='Number of timed logins per mode.'
+        )
+
+    def login(self, client, phone, invite_code):
+        """Log the new user in with the invite code, returning the time in microseconds."""
+        started = time.perf_counter()
+        response = client.post(
+            '/api/v1/auth/jwt/get_by_phone/',
+            {'phone': phone, 'code': CODE, 'invited_by_code': invite_code},
+            content_type='application/json',
+        )
+        elapsed = (time.perf_counter() - started) * 1e6
+        if response.status_code != 200:
+            raise CommandError(f'Login failed with {response.status_code}: {response.content[:200]}')
+        return elapsed
+
+    def handle(self, *args, **options):
+        inviter = User.objects.exclude(invite_code='').order_by('pk').first()
+        if inviter is None:
+            raise CommandError('No user with an invite code, run seed_users first.')
+
+        count = options['logins']
+        phones = {
+            enabled: [f'{PHONE_PREFIX}{int(enabled)}{number:06d}' for number in range(count)]
+            for enabled in (False, True)
+        }
+        all_phones = phones[False] + phones[True]
+        all_keys = [to_key(phone) for phone in all_phones]
+        if User.objects.filter(phone_key__in=all_keys).exists():
+            raise CommandError(f'Users with {PHONE_PREFIX} phones exist, the benchmark would delete them.')
+
+        last_event = ReferralEvent.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        client = Client()
+        timings = {False: [], True: []}
+        try:
+            with override_settings(PASSWORD_HASHERS=FAST_HASHERS):
+                password = make_password(CODE)
+                AuthCode.objects.bulk_create(
+                    AuthCode(phone=phone, phone_key=to_key(phone), code=password) for phone in all_phones
+                )
+                # The modes alternate, so warm-up and drift affect both alike.
+                for number in range(count):
+                    for enabled in (False, True):
+                        with override_settings(REFERRAL_EVENTS_ENABLED=enabled):
+                            timings[enabled].append(
+                                self.login(client, phones[enabled][number], inviter.invite_code)
+                            )
+            get_writer().flush()
+            written = ReferralEvent.objects.filter(pk__gt=last_event).count()
+        finally:
+            User.objects.filter(phone_key__in=all_keys).delete()
+            AuthCode.objects.filter(phone_key__in=all_keys).delete()
+            ReferralEvent.objects.filter(pk__gt=last_event).delete()
+
+        self.stdout.write(f'{"events":<10}{"mean us":>10}{"p50 us":>10}{"p95 us":>10}')
+        for enabled in (False, True):
+            mode = 'enabled' if enabled else 'disabled'
+            summary = summarize(timings[enabled])
+            self.stdout.write(
+                f'{mode:<10}{summary["mean"]:>10.1f}{summary["p50"]:>10.1f}{summary["p95"]:>10.1f}'
+            )
+        self.stdout.write(f'{written} events written in the background.')
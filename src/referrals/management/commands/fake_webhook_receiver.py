@@ -0,0 +1,107 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from referrals.signing import SIGNATURE_HEADER, verify
+
+
+class ReceiverHandler(BaseHTTPRequestHandler):
+    """Request handler of the fake webhook receiver."""
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        if server.secret and not verify(server.secret, body, self.headers.get(SIGNATURE_HEADER, '')):
+            with server.lock:
+                server.rejected += 1
+            self.send_error(401)
+            return
+
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.latency)
+            if random.random() < server.failure_rate:
+                self.send_error(503)
+                return
+
+            batch = json.loads(body)
+            with server.lock:
+                if batch['id'] in server.batch_ids:
+                    server.duplicates += 1
+                server.batch_ids.add(batch['id'])
+                server.batches += 1
+                server.events += len(batch['events'])
+            for event in batch['events']:
+                server.log(f'{event["type"]} {event["invite_code"]}: {event["invitee_id"]}')
+            self.send_response(204)
+            self.end_headers()
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Run a fake webhook receiver for development and load tests. '
+        'Add a webhook endpoint with its URL to send the referral events to it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8026)
+        parser.add_argument(
+            '--secret',
+            default='',
+            help='Secret of the endpoint: requests with an invalid signature get 401.'
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.1,
+            help='Seconds the receiver takes to answer a batch.'
+        )
+        parser.add_argument(
+            '--failure-rate',
+            type=float,
+            default=0,
+            help='Share of the batches failed with 503.'
+        )
+        parser.add_argument(
+            '--quiet',
+            action='store_true',
+            help='Do not print the received events.'
+        )
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer((options['host'], options['port']), ReceiverHandler)
+        server.secret = options['secret']
+        server.latency = options['latency']
+        server.failure_rate = options['failure_rate']
+        server.log = (lambda line: None) if options['quiet'] else self.stdout.write
+        server.lock = threading.Lock()
+        server.batch_ids = set()
+        server.batches = server.events = server.duplicates = server.rejected = 0
+        server.in_flight = server.max_in_flight = 0
+
+        self.stdout.write(f'Fake webhook receiver at http://{options["host"]}:{options["port"]}/')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(
+                f'Received {server.events} events in {server.batches} batches, '
+                f'{server.duplicates} duplicate batches, {server.rejected} rejected requests, '
+                f'at most {server.max_in_flight} concurrent requests.'
+            )
@@ -0,0 +1,90 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from referrals import graph
+
+
+class Command(BaseCommand):
+    help = (
+        'Export the referral graph into a snapshot of NumPy arrays and report '
+        'the depth distribution, the largest downlines and the referral cycles.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cached',
+            action='store_true',
+            help='Report the saved snapshot instead of rebuilding it.'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Number of users with the largest downlines.'
+        )
+        parser.add_argument(
+            '--cycles',
+            type=int,
+            default=10,
+            help='Number of referral cycles listed.'
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            default=[],
+            help='ID of a user whose metrics are reported, can be repeated.'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the metrics as JSON, as returned by the API.'
+        )
+
+    def handle(self, *args, **options):
+        if options['cached']:
+            snapshot = graph.load()
+            if snapshot is None:
+                raise CommandError('No saved snapshot, run the command without --cached.')
+        else:
+            snapshot = graph.rebuild()
+            self.stdout.write(
+                f'Exported {snapshot.meta["users"]} users in {snapshot.meta["export_seconds"]:.2f}s, '
+                f'analyzed in {snapshot.meta["analyze_seconds"]:.2f}s'
+            )
+
+        summary = snapshot.summary(top=options['top'], cycles=options['cycles'])
+        users = []
+        for user_id in options['user']:
+            position = snapshot.position(user_id)
+            if position is None:
+                raise CommandError(f'User {user_id} is not in the snapshot.')
+            users.append(snapshot.node(position))
+
+        if options['json']:
+            self.stdout.write(json.dumps({**summary, 'users': users}, indent=2))
+            return
+        self.stdout.write(
+            f'Snapshot of {summary["built_at"]}: {summary["users"]} users, {summary["invited"]} invited, '
+            f'{summary["roots"]} roots, maximum depth {summary["max_depth"]}'
+        )
+        self.stdout.write('Users per depth:')
+        for depth, count in enumerate(summary['depth_distribution']):
+            self.stdout.write(f'{depth:>6} {count:>10}')
+        self.stdout.write('Largest downlines:')
+        self.write_nodes(summary['top_subtrees'])
+        self.stdout.write(f'{summary["cycle_count"]} referral cycles of {summary["cycle_users"]} users')
+        for cycle in summary['cycles']:
+            self.stdout.write(f'  {cycle["user_ids"]}, downline {cycle["downline"]}')
+        if users:
+            self.stdout.write('Users:')
+            self.write_nodes(users)
+
+    def write_nodes(self, nodes):
+        self.stdout.write(f'{"user":>10} {"inviter":>10} {"depth":>6} {"invitees":>9} {"downline":>9} {"height":>6}')
+        for node in nodes:
+            self.stdout.write(
+                f'{node["user_id"]:>10} {node["inviter_id"] or "-":>10} {node["depth"]:>6} '
+                f'{node["invitees"]:>9} {node["downline"]:>9} {node["height"]:>6}'
+            )
@@ -0,0 +1,33 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from referrals.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Deliver the referral events to the webhook endpoints.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            help='Number of requests sent concurrently (WEBHOOK_WORKER_THREADS).'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            help='Seconds between polls without notifications.'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Deliver the due events and exit.'
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(threads=options['threads'], poll_interval=options['poll_interval'])
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(f'Delivering webhooks with {worker.threads} threads.')
+        worker.run(once=options['once'])
@@ -0,0 +1,130 @@
+import random
+import threading
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+
+from referrals import attach
+from users.models import User
+from users.phones import to_key
+
+PHONE_PREFIX = '+78007'
+
+
+class Command(BaseCommand):
+    help = (
+        'Attach users to random inviters from concurrent threads and check '
+        'that each user is attached once and the invited counts match.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--invitees', type=int, default=200, help='Number of users to attach.')
+        parser.add_argument('--inviters', type=int, default=10, help='Number of inviters to choose from.')
+        parser.add_argument('--attempts', type=int, default=8, help='Concurrent attempts per invitee.')
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def create_users(self, count, offset):
+        return [
+            User.objects.create(phone=f'{PHONE_PREFIX}{offset + number:06d}')
+            for number in range(count)
+        ]
+
+    def run_threads(self, tasks, threads):
+        """Run the attempts from the threads, returning their results."""
+        results = [None] * len(tasks)
+        position = iter(range(len(tasks)))
+        lock = threading.Lock()
+        start = threading.Barrier(threads)
+
+        def run():
+            start.wait()
+            try:
+                while True:
+                    with lock:
+                        index = next(position, None)
+                    if index is None:
+                        return
+                    invitee, inviter = tasks[index]
+                    results[index] = attach.attach(invitee.pk, inviter.invite_code, inviter_id=inviter.pk)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=run) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return results
+
+    def verify(self, tasks, results, invitees, inviters):
+        """Return the inconsistencies between the results and the database."""
+        errors = []
+        attached = Counter(invitee.pk for (invitee, _), result in zip(tasks, results) if result.attached)
+        twice = [pk for pk, count in attached.items() if count > 1]
+        if twice:
+            errors.append(f'{len(twice)} users attached more than once')
+        if len(attached) != len(invitees):
+            errors.append(f'{len(invitees) - len(attached)} users never attached')
+
+        winners = {
+            invitee.pk: inviter.invite_code
+            for (invitee, inviter), result in zip(tasks, results) if result.attached
+        }
+        stored = dict(User.objects.filter(pk__in=[user.pk for user in invitees]).values_list('pk', 'invited_by_code'))
+        wrong = [pk for pk, code in stored.items() if winners.get(pk) != code]
+        if wrong:
+            errors.append(f'{len(wrong)} users with another code than the attached one')
+        reported = [
+            (invitee.pk, result.invited_by_code) for (invitee, _), result in zip(tasks, results)
+            if result.status == attach.ALREADY_ATTACHED
+        ]
+        misreported = [pk for pk, code in reported if stored[pk] != code]
+        if misreported:
+            errors.append(f'{len(misreported)} rejected attempts reported another code than the stored one')
+
+        expected = Counter(winners.values())
+        counts = dict(
+            User.objects.filter(pk__in=[user.pk for user in inviters]).values_list('invite_code', 'invited_count')
+        )
+        miscounted = [code for code, count in counts.items() if count != expected.get(code, 0)]
+        if miscounted:
+            errors.append(f'{len(miscounted)} inviters with a wrong invited count')
+        return errors
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        total = options['invitees'] + options['inviters']
+        keys = [to_key(f'{PHONE_PREFIX}{number:06d}') for number in range(total)]
+        if User.objects.filter(phone_key__in=keys).exists():
+            raise CommandError(f'Users with {PHONE_PREFIX} phones exist, the stress test would delete them.')
+
+        with override_settings(REFERRAL_EVENTS_ENABLED=False):
+            try:
+                inviters = self.create_users(options['inviters'], 0)
+                invitees = self.create_users(options['invitees'], options['inviters'])
+                # The attempts for a user are adjacent, so the threads run them at once.
+                tasks = [
+                    (invitee, rng.choice(inviters))
+                    for invitee in invitees for _ in range(options['attempts'])
+                ]
+                started = time.perf_counter()
+                results = self.run_threads(tasks, options['threads'])
+                elapsed = time.perf_counter() - started
+                errors = self.verify(tasks, results, invitees, inviters)
+            finally:
+                User.objects.filter(phone_key__in=keys).delete()
+
+        statuses = Counter(result.status for result in results)
+        self.stdout.write(
+            f'{len(tasks)} attempts from {options["threads"]} threads in {elapsed:.2f}s: '
+            + ', '.join(f'{count} {status}' for status, count in sorted(statuses.items()))
+        )
+        if errors:
+            raise CommandError('; '.join(errors))
+        self.stdout.write(self.style.SUCCESS(
+            'Every user was attached once and the invited counts match.'
+        ))
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:08
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+import referrals.models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferralEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('referral.attached', 'referral attached')], max_length=32, verbose_name='type')),
+                ('invitee_id', models.BigIntegerField(verbose_name='invitee ID')),
+                ('inviter_id', models.BigIntegerField(blank=True, null=True, verbose_name='inviter ID')),
+                ('invite_code', models.CharField(max_length=6, verbose_name='invite code')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='created at')),
+            ],
+            options={
+                'verbose_name': 'referral event',
+                'verbose_name_plural': 'referral events',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WebhookEndpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(verbose_name='URL')),
+                ('secret', models.CharField(default=referrals.models.generate_secret, max_length=128, verbose_name='secret')),
+                ('event_types', models.JSONField(blank=True, default=list, help_text='Types of the events to send, all of them if empty.', verbose_name='event types')),
+                ('is_active', models.BooleanField(default=True, verbose_name='active')),
+                ('max_concurrency', models.PositiveSmallIntegerField(default=2, verbose_name='max concurrent requests')),
+                ('max_batch_size', models.PositiveSmallIntegerField(default=100, verbose_name='max events per request')),
+                ('created', models.DateTimeField(default=django.utils.timezone.now, verbose_name='created')),
+            ],
+            options={
+                'verbose_name': 'webhook endpoint',
+                'verbose_name_plural': 'webhook endpoints',
+                'ordering': ['-created'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WebhookDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('sending', 'sending'), ('delivered', 'delivered'), ('failed', 'failed')], default='pending', max_length=16, verbose_name='status')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='attempts')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='next attempt at')),
+                ('batch_id', models.UUIDField(blank=True, null=True, verbose_name='batch ID')),
+                ('delivered_at', models.DateTimeField(blank=True, null=True, verbose_name='delivered at')),
+                ('last_error', models.TextField(blank=True, verbose_name='last error')),
+                ('endpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='referrals.webhookendpoint', verbose_name='endpoint')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='referrals.referralevent', verbose_name='event')),
+            ],
+            options={
+                'verbose_name': 'webhook delivery',
+                'verbose_name_plural': 'webhook deliveries',
+                'ordering': ['-id'],
+                'indexes': [models.Index(condition=models.Q(('status__in', ('pending', 'sending'))), fields=['endpoint', 'next_attempt_at'], name='referrals_delivery_due_idx')],
+            },
+        ),
+    ]
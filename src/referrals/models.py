@@ -0,0 +1,194 @@
+import secrets
+
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+def generate_secret():
+    """Return a new random secret for signing the webhooks."""
+    return secrets.token_hex(32)
+
+
+class ReferralEvent(models.Model):
+    """
+    Entry of the append-only referral event log.
+
+    The users are referenced by ID rather than by foreign key, so the log
+    outlives archived and deleted users.
+    """
+
+    ATTACHED = 'referral.attached'
+    TYPES = (
+        (ATTACHED, _('referral attached')),
+    )
+
+    type = models.CharField(
+        verbose_name=_('type'),
+        max_length=32,
+        choices=TYPES
+    )
+    invitee_id = models.BigIntegerField(
+        verbose_name=_('invitee ID')
+    )
+    inviter_id = models.BigIntegerField(
+        verbose_name=_('inviter ID'),
+        blank=True,
+        null=True
+    )
+    invite_code = models.CharField(
+        verbose_name=_('invite code'),
+        max_length=6
+    )
+    created_at = models.DateTimeField(
+        verbose_name=_('created at'),
+        default=timezone.now
+    )
+
+    class Meta:
+        """Metadata."""
+
+        verbose_name = _('referral event')
+        verbose_name_plural = _('referral events')
+        ordering = ['-id']
+
+    def __str__(self):
+        """Return the type and the invite code of the event."""
+        return f'{self.type} {self.invite_code}'
+
+    def payload(self):
+        """Return the event as sent to the webhooks."""
+        return {
+            'id': self.pk,
+            'type': self.type,
+            'created_at': self.created_at.isoformat(),
+            'invitee_id': self.invitee_id,
+            'inviter_id': self.inviter_id,
+            'invite_code': self.invite_code,
+        }
+
+
+class WebhookEndpoint(models.Model):
+    """Partner endpoint subscribed to the referral events."""
+
+    url = models.URLField(
+        verbose_name=_('URL')
+    )
+    secret = models.CharField(
+        verbose_name=_('secret'),
+        max_length=128,
+        default=generate_secret
+    )
+    event_types = models.JSONField(
+        verbose_name=_('event types'),
+        default=list,
+        blank=True,
+        help_text=_('Types of the events to send, all of them if empty.')
+    )
+    is_active = models.BooleanField(
+        verbose_name=_('active'),
+        default=True
+    )
+    max_concurrency = models.PositiveSmallIntegerField(
+        verbose_name=_('max concurrent requests'),
+        default=2
+    )
+    max_batch_size = models.PositiveSmallIntegerField(
+        verbose_name=_('max events per request'),
+        default=100
+    )
+    created = models.DateTimeField(
+        verbose_name=_('created'),
+        default=timezone.now
+    )
+
+    class Meta:
+        """Metadata."""
+
+        verbose_name = _('webhook endpoint')
+        verbose_name_plural = _('webhook endpoints')
+        ordering = ['-created']
+
+    def __str__(self):
+        """Return the URL of the endpoint."""
+        return self.url
+
+    def accepts(self, event_type):
+        """Check whether the endpoint is subscribed to the event type."""
+        return not self.event_types or event_type in self.event_types
+
+
+class WebhookDelivery(models.Model):
+    """Event waiting to be delivered to an endpoint, or already delivered."""
+
+    PENDING = 'pending'
+    SENDING = 'sending'
+    DELIVERED = 'delivered'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, _('pending')),
+        (SENDING, _('sending')),
+        (DELIVERED, _('delivered')),
+        (FAILED, _('failed')),
+    )
+
+    endpoint = models.ForeignKey(
+        WebhookEndpoint,
+        verbose_name=_('endpoint'),
+        on_delete=models.CASCADE,
+        related_name='deliveries'
+    )
+    event = models.ForeignKey(
+        ReferralEvent,
+        verbose_name=_('event'),
+        on_delete=models.CASCADE,
+        related_name='deliveries'
+    )
+    status = models.CharField(
+        verbose_name=_('status'),
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name=_('attempts'),
+        default=0
+    )
+    next_attempt_at = models.DateTimeField(
+        verbose_name=_('next attempt at'),
+        default=timezone.now
+    )
+    batch_id = models.UUIDField(
+        verbose_name=_('batch ID'),
+        blank=True,
+        null=True
+    )
+    delivered_at = models.DateTimeField(
+        verbose_name=_('delivered at'),
+        blank=True,
+        null=True
+    )
+    last_error = models.TextField(
+        verbose_name=_('last error'),
+        blank=True
+    )
+
+    class Meta:
+        """Metadata."""
+
+        verbose_name = _('webhook delivery')
+        verbose_name_plural = _('webhook deliveries')
+        ordering = ['-id']
+        indexes = [
+            # Only the deliveries still to be made are indexed.
+            models.Index(
+                fields=['endpoint', 'next_attempt_at'],
+                condition=Q(status__in=('pending', 'sending')),
+                name='referrals_delivery_due_idx'
+            ),
+        ]
+
+    def __str__(self):
+        """Return the event and the status of the delivery."""
+        return f'{self.event_id} ({self.status})'
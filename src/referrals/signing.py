@@ -0,0 +1,42 @@
+"""
+Signatures of the webhook requests.
+
+Every request carries the header
+
+    X-Webhook-Signature: t=<unix time>,v1=<hex HMAC-SHA256>
+
+where the HMAC is computed with the endpoint secret over `<unix time>.`
+followed by the raw request body. Receivers recompute it, compare it in
+constant time and reject timestamps older than a few minutes, so a
+captured request cannot be replayed later.
+"""
+
+import hashlib
+import hmac
+import time
+
+SIGNATURE_HEADER = 'X-Webhook-Signature'
+
+
+def signature(secret, timestamp, body):
+    """Return the hex HMAC of the timestamped body."""
+    message = f'{timestamp}.'.encode() + body
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def sign(secret, body, timestamp=None):
+    """Return the signature header value for the body."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    return f't={timestamp},v1={signature(secret, timestamp, body)}'
+
+
+def verify(secret, body, header, tolerance=300):
+    """Check the signature header of the body, rejecting stale timestamps."""
+    try:
+        parts = dict(part.split('=', 1) for part in header.split(','))
+        timestamp = int(parts['t'])
+    except (KeyError, ValueError):
+        return False
+    if abs(time.time() - timestamp) > tolerance:
+        return False
+    return hmac.compare_digest(parts.get('v1', ''), signature(secret, timestamp, body))
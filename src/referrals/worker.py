@@ -0,0 +1,242 @@
+import json
+import logging
+import random
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from config import db
+
+from .events import CHANNEL
+from .models import WebhookDelivery, WebhookEndpoint
+from .signing import SIGNATURE_HEADER, sign
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts):
+    """Return the delay before the next attempt, exponential with jitter."""
+    delay = min(
+        settings.WEBHOOK_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1),
+        settings.WEBHOOK_RETRY_BACKOFF_MAX_SECONDS
+    )
+    return timezone.timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+@dataclass
+class Batch:
+    """Deliveries sent to an endpoint in one request."""
+
+    id: uuid.UUID
+    endpoint: WebhookEndpoint
+    deliveries: list
+
+
+@dataclass
+class DeliveryResult:
+    """Outcome of sending a batch."""
+
+    ok: bool
+    error: str = ''
+    retryable: bool = False
+
+
+def send(batch, timeout):
+    """
+    POST the events of the batch to the endpoint.
+
+    The body is `{"id": <batch ID>, "events": [...]}`, signed as described
+    in `referrals.signing`. The batch ID is repeated in the `X-Webhook-Id`
+    header and stays the same across retries, so receivers can drop
+    duplicates. Must not raise: errors are reported as failed results.
+    """
+    body = json.dumps({
+        'id': str(batch.id),
+        'events': [delivery.event.payload() for delivery in batch.deliveries],
+    }).encode()
+    request = urllib.request.Request(
+        batch.endpoint.url,
+        data=body,
+        headers={
+            'Content-Type': 'application/json',
+            'X-Webhook-Id': str(batch.id),
+            SIGNATURE_HEADER: sign(batch.endpoint.secret, body),
+        },
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout):
+            return DeliveryResult(ok=True)
+    except urllib.error.HTTPError as error:
+        # Client errors other than timeouts and throttling will not go away.
+        retryable = error.code >= 500 or error.code in (408, 429)
+        return DeliveryResult(ok=False, error=f'HTTP {error.code}', retryable=retryable)
+    except (OSError, ValueError) as error:
+        return DeliveryResult(ok=False, error=str(error) or error.__class__.__name__, retryable=True)
+
+
+class Worker:
+    """
+    Webhook worker delivering the referral events to the endpoints.
+
+    Deliveries are claimed per endpoint in short transactions that lock the
+    endpoint row with `SKIP LOCKED`, so several workers can run side by
+    side without exceeding the `max_concurrency` of an endpoint: batches of
+    up to `max_batch_size` events are claimed only while the endpoint has
+    fewer batches in flight. A claimed batch is leased for
+    `WEBHOOK_LEASE_SECONDS`: if the worker dies before recording the
+    outcome, the deliveries are claimed again once the lease expires. The
+    batches are sent by a thread pool and their outcomes recorded by the
+    main thread, so the pool does not hold database connections.
+    """
+
+    def __init__(self, threads=None, poll_interval=None, timeout=None):
+        self.threads = threads or settings.WEBHOOK_WORKER_THREADS
+        self.poll_interval = poll_interval or settings.WEBHOOK_WORKER_POLL_INTERVAL
+        self.timeout = timeout or settings.WEBHOOK_TIMEOUT
+        self.running = True
+        self._listening_to = None
+
+    def claim_endpoint(self, endpoint, now, limit):
+        """Lease up to `limit` batches of due deliveries of the locked endpoint."""
+        in_flight = (
+            WebhookDelivery.objects
+            .filter(endpoint=endpoint, status=WebhookDelivery.SENDING, next_attempt_at__gt=now)
+            .values('batch_id').distinct().count()
+        )
+        free = min(endpoint.max_concurrency - in_flight, limit)
+        if free <= 0:
+            return []
+
+        # Batches sent before are retried whole under their ID, so receivers
+        # can drop the ones they already processed.
+        due = WebhookDelivery.objects.filter(
+            endpoint=endpoint,
+            status__in=(WebhookDelivery.PENDING, WebhookDelivery.SENDING),
+        )
+        retried_ids = list(
+            due.filter(batch_id__isnull=False, next_attempt_at__lte=now)
+            .values_list('batch_id', flat=True)
+            .annotate(due_at=Min('next_attempt_at'))
+            .order_by('due_at')[:free]
+        )
+        retried = {batch_id: [] for batch_id in retried_ids}
+        for delivery in due.filter(batch_id__in=retried_ids).select_related('event').order_by('id'):
+            retried[delivery.batch_id].append(delivery)
+        batches = [Batch(batch_id, endpoint, deliveries) for batch_id, deliveries in retried.items()]
+
+        size = endpoint.max_batch_size
+        fresh = list(
+            due.filter(batch_id__isnull=True, next_attempt_at__lte=now)
+            .select_related('event')
+            .order_by('next_attempt_at', 'id')[:(free - len(batches)) * size]
+        )
+        batches += [
+            Batch(uuid.uuid4(), endpoint, fresh[i:i + size])
+            for i in range(0, len(fresh), size)
+        ]
+        lease_until = now + timezone.timedelta(seconds=settings.WEBHOOK_LEASE_SECONDS)
+        for batch in batches:
+            WebhookDelivery.objects.filter(
+                pk__in=[delivery.pk for delivery in batch.deliveries]
+            ).update(
+                status=WebhookDelivery.SENDING,
+                batch_id=batch.id,
+                next_attempt_at=lease_until
+            )
+        return batches
+
+    def claim(self):
+        """Lease the due deliveries to this worker and return them in batches."""
+        now = timezone.now()
+        batches = []
+        with transaction.atomic():
+            endpoints = WebhookEndpoint.objects.filter(is_active=True).select_for_update(skip_locked=True)
+            for endpoint in endpoints:
+                if len(batches) >= self.threads:
+                    break
+                batches += self.claim_endpoint(endpoint, now, self.threads - len(batches))
+        return batches
+
+    def record(self, batch, result):
+        """Store the outcome of sending the batch."""
+        now = timezone.now()
+        # The deliveries of a batch are retried together, at the same time.
+        next_attempt_at = now + retry_delay(max(delivery.attempts for delivery in batch.deliveries) + 1)
+        for delivery in batch.deliveries:
+            delivery.attempts += 1
+            if result.ok:
+                delivery.status = WebhookDelivery.DELIVERED
+                delivery.delivered_at = now
+                delivery.last_error = ''
+            elif result.retryable and delivery.attempts < settings.WEBHOOK_MAX_ATTEMPTS:
+                delivery.status = WebhookDelivery.PENDING
+                delivery.next_attempt_at = next_attempt_at
+                delivery.last_error = result.error
+            else:
+                delivery.status = WebhookDelivery.FAILED
+                delivery.last_error = result.error
+        WebhookDelivery.objects.bulk_update(batch.deliveries, (
+            'status', 'attempts', 'next_attempt_at', 'delivered_at', 'last_error'
+        ))
+
+    def process(self, executor):
+        """Send one round of due batches, returning their number."""
+        batches = self.claim()
+        futures = [(batch, executor.submit(send, batch, self.timeout)) for batch in batches]
+        delivered = 0
+        for batch, future in futures:
+            result = future.result()
+            self.record(batch, result)
+            if result.ok:
+                delivered += len(batch.deliveries)
+            else:
+                logger.warning(
+                    'Delivering %d events to %s failed: %s',
+                    len(batch.deliveries), batch.endpoint.url, result.error
+                )
+        if delivered:
+            logger.info('Delivered %d events in %d requests', delivered, len(batches))
+        return len(batches)
+
+    def listen(self):
+        """Subscribe to the event writer notifications on the current connection."""
+        if connection.vendor != 'postgresql':
+            return None
+        connection.ensure_connection()
+        if self._listening_to is not connection.connection:
+            self._listening_to = db.listen(connection, CHANNEL)
+        return connection.connection
+
+    def wait(self):
+        """Wait for new events or the poll interval."""
+        if self.listen() is None:
+            time.sleep(self.poll_interval)
+            return
+        db.wait_for_notifications(connection, self.poll_interval)
+
+    def run(self, once=False):
+        """Deliver the due events until stopped."""
+        with ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='webhooks') as executor:
+            while self.running:
+                self.listen()
+                claimed = self.process(executor)
+                # Keep draining while full rounds are claimed.
+                if claimed >= self.threads:
+                    continue
+                if once:
+                    if claimed:
+                        continue
+                    break
+                self.wait()
+
+    def stop(self, *args):
+        """Stop after the current round."""
+        self.running = False
@@ -0,0 +1,22 @@
+from django.contrib import admin
+
+from .models import OutboundMessage
+
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    """Admin configuration for the OutboundMessage model."""
+
+    list_display = ('phone', 'status', 'attempts', 'created', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('phone', 'provider_message_id')
+    exclude = ('body',)
+    readonly_fields = (
+        'phone', 'status', 'attempts', 'next_attempt_at', 'created',
+        'sent_at', 'provider_message_id', 'last_error'
+    )
+    show_full_result_count = False
+
+    def has_add_permission(self, request, obj=None):
+        """Messages are only added by the application."""
+        return False
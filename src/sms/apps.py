@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class SmsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'sms'
+    verbose_name = 'SMS'
@@ -0,0 +1,95 @@
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+class GatewayHandler(BaseHTTPRequestHandler):
+    """Request handler of the fake SMS gateway."""
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        messages = json.loads(self.rfile.read(length)).get('messages', [])
+        time.sleep(server.latency)
+
+        if random.random() < server.failure_rate:
+            self.send_error(503)
+            return
+
+        results = []
+        for message in messages:
+            if random.random() < server.reject_rate:
+                results.append({'id': message['id'], 'status': 'rejected', 'error': 'Rejected by the fake gateway.'})
+            else:
+                results.append({'id': message['id'], 'status': 'accepted', 'message_id': uuid.uuid4().hex})
+                server.log(f'{message["to"]}: {message["text"]}')
+        with server.lock:
+            server.batches += 1
+            server.messages += len(messages)
+
+        content = json.dumps({'results': results}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Run a fake SMS gateway for development and load tests. '
+        'Point SMS_GATEWAY_URL at it with SMS_PROVIDER=sms.providers.HTTPGatewayProvider.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8025)
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.2,
+            help='Seconds the gateway takes to answer a batch.'
+        )
+        parser.add_argument(
+            '--failure-rate',
+            type=float,
+            default=0,
+            help='Share of the batches failed with 503.'
+        )
+        parser.add_argument(
+            '--reject-rate',
+            type=float,
+            default=0,
+            help='Share of the messages rejected.'
+        )
+        parser.add_argument(
+            '--quiet',
+            action='store_true',
+            help='Do not print the received messages.'
+        )
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer((options['host'], options['port']), GatewayHandler)
+        server.latency = options['latency']
+        server.failure_rate = options['failure_rate']
+        server.reject_rate = options['reject_rate']
+        server.log = (lambda line: None) if options['quiet'] else self.stdout.write
+        server.lock = threading.Lock()
+        server.batches = server.messages = 0
+
+        self.stdout.write(f'Fake SMS gateway at http://{options["host"]}:{options["port"]}/')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f'Received {server.messages} messages in {server.batches} batches.')
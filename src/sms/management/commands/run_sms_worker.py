@@ -0,0 +1,36 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from sms.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Send the messages of the SMS outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            help='Number of batches sent concurrently (SMS_WORKER_THREADS).'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            help='Seconds between outbox polls without notifications.'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Send the due messages and exit.'
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(threads=options['threads'], poll_interval=options['poll_interval'])
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(
+            f'Sending SMS with {worker.provider.__class__.__name__}, '
+            f'{worker.threads} threads, batches of {worker.provider.max_batch_size}.'
+        )
+        worker.run(once=options['once'])
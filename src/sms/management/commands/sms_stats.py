@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from sms.stats import delivery_stats
+
+
+class Command(BaseCommand):
+    help = 'Show the SMS delivery statistics.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minutes',
+            type=int,
+            default=60,
+            help='Period of the statistics, in minutes.'
+        )
+
+    def handle(self, *args, **options):
+        stats = delivery_stats(timezone.now() - timezone.timedelta(minutes=options['minutes']))
+        for status, count in sorted(stats['statuses'].items()):
+            self.stdout.write(f'{status}: {count}')
+        self.stdout.write(f'due backlog: {stats["backlog"]}')
+
+        latency = stats['latency']
+        if not latency['sent']:
+            return
+        self.stdout.write(
+            'delivery latency: p50 {p50:.3f}s, p95 {p95:.3f}s, p99 {p99:.3f}s, '
+            'max {max:.3f}s, {attempts:.2f} attempts on average'.format(**latency)
+        )
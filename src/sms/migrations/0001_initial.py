@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:30
+
+import django.utils.timezone
+import phonenumber_field.modelfields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone', phonenumber_field.modelfields.PhoneNumberField(max_length=12, region=None, verbose_name='phone')),
+                ('body', models.TextField(verbose_name='body')),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('sending', 'sending'), ('sent', 'sent'), ('failed', 'failed')], default='pending', max_length=16, verbose_name='status')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='attempts')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='next attempt at')),
+                ('created', models.DateTimeField(default=django.utils.timezone.now, verbose_name='created')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='sent at')),
+                ('provider_message_id', models.CharField(blank=True, max_length=64, verbose_name='provider message ID')),
+                ('last_error', models.TextField(blank=True, verbose_name='last error')),
+            ],
+            options={
+                'verbose_name': 'outbound message',
+                'verbose_name_plural': 'outbound messages',
+                'ordering': ['-created'],
+                'indexes': [models.Index(condition=models.Q(('status__in', ('pending', 'sending'))), fields=['next_attempt_at'], name='sms_outbox_due_idx'), models.Index(fields=['-created'], name='sms_outbox_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,84 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from phonenumber_field.modelfields import PhoneNumberField
+
+
+class OutboundMessage(models.Model):
+    """SMS waiting in the outbox or already delivered to the provider."""
+
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, _('pending')),
+        (SENDING, _('sending')),
+        (SENT, _('sent')),
+        (FAILED, _('failed')),
+    )
+
+    phone = PhoneNumberField(
+        verbose_name=_('phone'),
+        max_length=12
+    )
+    body = models.TextField(
+        verbose_name=_('body')
+    )
+    status = models.CharField(
+        verbose_name=_('status'),
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name=_('attempts'),
+        default=0
+    )
+    next_attempt_at = models.DateTimeField(
+        verbose_name=_('next attempt at'),
+        default=timezone.now
+    )
+    created = models.DateTimeField(
+        verbose_name=_('created'),
+        default=timezone.now
+    )
+    sent_at = models.DateTimeField(
+        verbose_name=_('sent at'),
+        blank=True,
+        null=True
+    )
+    provider_message_id = models.CharField(
+        verbose_name=_('provider message ID'),
+        max_length=64,
+        blank=True
+    )
+    last_error = models.TextField(
+        verbose_name=_('last error'),
+        blank=True
+    )
+
+    class Meta:
+        """Metadata."""
+
+        verbose_name = _('outbound message')
+        verbose_name_plural = _('outbound messages')
+        ordering = ['-created']
+        indexes = [
+            # Only the messages still to be sent are indexed, so the index
+            # stays small however long the delivery history gets.
+            models.Index(
+                fields=['next_attempt_at'],
+                condition=Q(status__in=('pending', 'sending')),
+                name='sms_outbox_due_idx'
+            ),
+            models.Index(
+                fields=['-created'],
+                name='sms_outbox_created_idx'
+            ),
+        ]
+
+    def __str__(self):
+        """Return the recipient and the status of the message."""
+        return f'{self.phone} ({self.status})'
@@ -0,0 +1,22 @@
+from django.db import connection, transaction
+
+from .models import OutboundMessage
+
+CHANNEL = 'sms_outbox'
+
+
+def enqueue(phone, body):
+    """
+    Add the message to the outbox.
+
+    The message is sent by the `run_sms_worker` process once the current
+    transaction commits, so the request never waits for the provider. On
+    PostgreSQL the worker is woken up right away by a notification, which
+    is delivered on commit as well.
+    """
+    with transaction.atomic():
+        message = OutboundMessage.objects.create(phone=phone, body=body)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'NOTIFY {CHANNEL}')
+    return message
@@ -0,0 +1,131 @@
+"""
+SMS providers.
+
+A provider delivers a batch of messages in one call and reports the outcome
+of each of them. `HTTPGatewayProvider` speaks the JSON protocol of the SMS
+gateway:
+
+    POST <SMS_GATEWAY_URL>
+    Authorization: Bearer <SMS_GATEWAY_TOKEN>
+
+    {"messages": [{"id": "42", "to": "+79608543017", "text": "..."}]}
+
+    200 OK
+    {"results": [{"id": "42", "status": "accepted", "message_id": "..."},
+                 {"id": "43", "status": "rejected", "error": "..."}]}
+
+Rejected messages are not retried, while network errors and 5xx/429
+responses fail the whole batch with a retryable error.
+"""
+
+import json
+import sys
+import threading
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+@dataclass
+class SendResult:
+    """Outcome of sending one message."""
+
+    ok: bool
+    message_id: str = ''
+    error: str = ''
+    retryable: bool = False
+
+
+class BaseProvider:
+    """Base class of the SMS providers."""
+
+    max_batch_size = 1
+
+    def send_batch(self, messages):
+        """
+        Send the messages, returning a `SendResult` for each of them.
+
+        Must not raise: errors are reported as failed results.
+        """
+        raise NotImplementedError
+
+
+class ConsoleProvider(BaseProvider):
+    """Provider writing the messages to the console, for development."""
+
+    max_batch_size = 100
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.lock = threading.Lock()
+
+    def send_batch(self, messages):
+        with self.lock:
+            for message in messages:
+                self.stream.write(f'SMS to {message.phone}: {message.body}\n')
+            self.stream.flush()
+        return [SendResult(ok=True) for _ in messages]
+
+
+class HTTPGatewayProvider(BaseProvider):
+    """Provider posting batches of messages to the HTTP SMS gateway."""
+
+    RETRYABLE_STATUSES = (408, 429)
+
+    def __init__(self, url=None, token=None, timeout=None, max_batch_size=None):
+        self.url = url or settings.SMS_GATEWAY_URL
+        self.token = token or settings.SMS_GATEWAY_TOKEN
+        self.timeout = timeout or settings.SMS_GATEWAY_TIMEOUT
+        self.max_batch_size = max_batch_size or settings.SMS_BATCH_SIZE
+
+    def build_request(self, messages):
+        """Return the gateway request for the messages."""
+        payload = {
+            'messages': [
+                {'id': str(message.pk), 'to': str(message.phone), 'text': message.body}
+                for message in messages
+            ]
+        }
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        return urllib.request.Request(
+            self.url, data=json.dumps(payload).encode(), headers=headers, method='POST'
+        )
+
+    def send_batch(self, messages):
+        try:
+            with urllib.request.urlopen(self.build_request(messages), timeout=self.timeout) as response:
+                results = json.load(response).get('results', [])
+        except urllib.error.HTTPError as error:
+            retryable = error.code >= 500 or error.code in self.RETRYABLE_STATUSES
+            return self.fail(messages, f'HTTP {error.code}', retryable)
+        except (OSError, ValueError) as error:
+            return self.fail(messages, str(error) or error.__class__.__name__, True)
+
+        by_id = {result.get('id'): result for result in results}
+        return [self.parse_result(by_id.get(str(message.pk))) for message in messages]
+
+    @staticmethod
+    def parse_result(result):
+        """Convert the gateway result of one message."""
+        if result is None:
+            return SendResult(ok=False, error='Missing from the gateway response.', retryable=True)
+        if result.get('status') == 'accepted':
+            return SendResult(ok=True, message_id=str(result.get('message_id', '')))
+        return SendResult(ok=False, error=str(result.get('error', 'Rejected.')))
+
+    @staticmethod
+    def fail(messages, error, retryable):
+        """Return the same failed result for all the messages."""
+        return [SendResult(ok=False, error=error, retryable=retryable) for _ in messages]
+
+
+@lru_cache(maxsize=None)
+def get_provider():
+    """Return the provider configured in the settings."""
+    return import_string(settings.SMS_PROVIDER)()
@@ -0,0 +1,54 @@
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import OutboundMessage
+
+LATENCY_QUERY = """
+SELECT
+    count(*),
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY latency),
+    percentile_cont(0.95) WITHIN GROUP (ORDER BY latency),
+    percentile_cont(0.99) WITHIN GROUP (ORDER BY latency),
+    max(latency),
+    avg(attempts)
+FROM (
+    SELECT extract(epoch FROM sent_at - created) AS latency, attempts
+    FROM {table}
+    WHERE status = %s AND created >= %s
+) AS sent
+"""
+
+
+def delivery_stats(since):
+    """
+    Return the delivery statistics of the messages created since the time.
+
+    The latency is the time from enqueueing a message to its acceptance by
+    the provider, in seconds.
+    """
+    queryset = OutboundMessage.objects.filter(created__gte=since)
+    stats = {
+        'statuses': dict(
+            queryset.order_by().values_list('status').annotate(Count('pk'))
+        ),
+        'backlog': OutboundMessage.objects.filter(
+            status__in=(OutboundMessage.PENDING, OutboundMessage.SENDING),
+            next_attempt_at__lte=timezone.now()
+        ).count(),
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(
+            LATENCY_QUERY.format(table=connection.ops.quote_name(OutboundMessage._meta.db_table)),
+            [OutboundMessage.SENT, since]
+        )
+        count, p50, p95, p99, maximum, attempts = cursor.fetchone()
+    stats['latency'] = {
+        'sent': count,
+        'p50': p50,
+        'p95': p95,
+        'p99': p99,
+        'max': maximum,
+        'attempts': attempts,
+    }
+    return stats
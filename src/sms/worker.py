@@ -0,0 +1,162 @@
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from config import db
+
+from .models import OutboundMessage
+from .outbox import CHANNEL
+from .providers import SendResult, get_provider
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts):
+    """Return the delay before the next attempt, exponential with jitter."""
+    delay = min(
+        settings.SMS_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1),
+        settings.SMS_RETRY_BACKOFF_MAX_SECONDS
+    )
+    return timezone.timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+class Worker:
+    """
+    Outbox worker sending the due messages through the provider.
+
+    Messages are claimed in one short transaction with `SKIP LOCKED`, so
+    several workers can run side by side. A claimed message is leased for
+    `SMS_SEND_TIMEOUT` seconds: if the worker dies before recording the
+    outcome, the message is claimed again once the lease expires. The
+    claimed messages are split into batches of the provider's
+    `max_batch_size`, which are sent concurrently by a thread pool. The
+    threads only talk to the provider: the outcomes are recorded by the
+    main thread, so the pool does not hold database connections.
+    """
+
+    def __init__(self, provider=None, threads=None, poll_interval=None):
+        self.provider = provider or get_provider()
+        self.threads = threads or settings.SMS_WORKER_THREADS
+        self.poll_interval = poll_interval or settings.SMS_WORKER_POLL_INTERVAL
+        self.running = True
+        self._listening_to = None
+
+    @property
+    def claim_size(self):
+        """Return the number of messages claimed at once."""
+        return self.threads * self.provider.max_batch_size
+
+    def claim(self):
+        """Lease the due messages to this worker and return them."""
+        now = timezone.now()
+        with transaction.atomic():
+            messages = list(
+                OutboundMessage.objects
+                .filter(
+                    status__in=(OutboundMessage.PENDING, OutboundMessage.SENDING),
+                    next_attempt_at__lte=now
+                )
+                .order_by('next_attempt_at')
+                .select_for_update(skip_locked=True)[:self.claim_size]
+            )
+            if messages:
+                OutboundMessage.objects.filter(
+                    pk__in=[message.pk for message in messages]
+                ).update(
+                    status=OutboundMessage.SENDING,
+                    next_attempt_at=now + timezone.timedelta(seconds=settings.SMS_SEND_TIMEOUT)
+                )
+        return messages
+
+    def record(self, message, result):
+        """Store the outcome of sending the message."""
+        now = timezone.now()
+        message.attempts += 1
+        if result.ok:
+            message.status = OutboundMessage.SENT
+            message.sent_at = now
+            message.provider_message_id = result.message_id
+            message.last_error = ''
+        elif result.retryable and message.attempts < settings.SMS_MAX_ATTEMPTS:
+            message.status = OutboundMessage.PENDING
+            message.next_attempt_at = now + retry_delay(message.attempts)
+            message.last_error = result.error
+        else:
+            message.status = OutboundMessage.FAILED
+            message.last_error = result.error
+        if message.status != OutboundMessage.PENDING:
+            # The body holds the auth code: do not keep it once it is useless.
+            message.body = ''
+        return message
+
+    def process(self, executor):
+        """Send one round of due messages, returning their number."""
+        messages = self.claim()
+        if not messages:
+            return 0
+
+        size = self.provider.max_batch_size
+        batches = [messages[i:i + size] for i in range(0, len(messages), size)]
+        futures = [
+            (batch, executor.submit(self.provider.send_batch, batch))
+            for batch in batches
+        ]
+        for batch, future in futures:
+            try:
+                results = future.result()
+            except Exception as error:
+                logger.exception('SMS provider failed')
+                failure = SendResult(ok=False, error=str(error) or error.__class__.__name__, retryable=True)
+                results = [failure] * len(batch)
+            for message, result in zip(batch, results):
+                self.record(message, result)
+            OutboundMessage.objects.bulk_update(batch, (
+                'status', 'attempts', 'next_attempt_at', 'sent_at',
+                'provider_message_id', 'last_error', 'body'
+            ))
+
+        sent = [message for message in messages if message.status == OutboundMessage.SENT]
+        if sent:
+            latencies = sorted((message.sent_at - message.created).total_seconds() for message in sent)
+            logger.info(
+                'Sent %d of %d messages, latency median %.3fs, max %.3fs',
+                len(sent), len(messages), latencies[len(latencies) // 2], latencies[-1]
+            )
+        return len(messages)
+
+    def listen(self):
+        """Subscribe to the outbox notifications on the current connection."""
+        if connection.vendor != 'postgresql':
+            return None
+        connection.ensure_connection()
+        if self._listening_to is not connection.connection:
+            self._listening_to = db.listen(connection, CHANNEL)
+        return connection.connection
+
+    def wait(self):
+        """Wait for a new message or the poll interval."""
+        if self.listen() is None:
+            time.sleep(self.poll_interval)
+            return
+        db.wait_for_notifications(connection, self.poll_interval)
+
+    def run(self, once=False):
+        """Send the due messages until stopped."""
+        with ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='sms') as executor:
+            while self.running:
+                self.listen()
+                # Keep draining while full rounds are claimed.
+                if self.process(executor) >= self.claim_size:
+                    continue
+                if once:
+                    break
+                self.wait()
+
+    def stop(self, *args):
+        """Stop after the current round."""
+        self.running = False
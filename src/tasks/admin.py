@@ -0,0 +1,20 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """Admin configuration for the Task model."""
+
+    list_display = ('name', 'status', 'attempts', 'created', 'finished_at')
+    list_filter = ('status', 'name')
+    readonly_fields = (
+        'name', 'args', 'kwargs', 'status', 'attempts', 'run_after',
+        'created', 'started_at', 'finished_at', 'last_error'
+    )
+    show_full_result_count = False
+
+    def has_add_permission(self, request, obj=None):
+        """Tasks are only added by the application."""
+        return False
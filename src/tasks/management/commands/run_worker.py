@@ -0,0 +1,33 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from tasks.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run the tasks of the durable task queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            help='Number of tasks run concurrently (TASKS_WORKER_THREADS).'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            help='Seconds between queue polls without notifications.'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run the due tasks and exit.'
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(threads=options['threads'], poll_interval=options['poll_interval'])
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(f'Running tasks with {worker.threads} threads.')
+        worker.run(once=options['once'])
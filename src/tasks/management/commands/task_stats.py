@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tasks.stats import queue_stats
+
+
+class Command(BaseCommand):
+    help = 'Show the statistics of the durable task queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minutes',
+            type=int,
+            default=60,
+            help='Period of the latency statistics, in minutes.'
+        )
+
+    def handle(self, *args, **options):
+        stats = queue_stats(timezone.now() - timezone.timedelta(minutes=options['minutes']))
+        self.stdout.write(f'due: {stats["due"]}')
+        if stats['oldest_due_age'] is not None:
+            self.stdout.write(f'oldest due task: {stats["oldest_due_age"]:.1f}s')
+        for name, count in sorted(stats['depth'].items()):
+            self.stdout.write(f'pending {name}: {count}')
+        for status, count in sorted(stats['statuses'].items()):
+            self.stdout.write(f'{status}: {count}')
+        for name, latency in stats['latency'].items():
+            self.stdout.write(
+                '{name}: {done} done, wait p50 {wait_p50:.3f}s p95 {wait_p95:.3f}s, '
+                'run p50 {run_p50:.3f}s p95 {run_p95:.3f}s'.format(name=name, **latency)
+            )
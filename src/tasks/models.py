@@ -0,0 +1,89 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class Task(models.Model):
+    """Durable task waiting for the `run_worker` consumer."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, _('pending')),
+        (RUNNING, _('running')),
+        (DONE, _('done')),
+        (FAILED, _('failed')),
+    )
+
+    name = models.CharField(
+        verbose_name=_('name'),
+        max_length=255
+    )
+    args = models.JSONField(
+        verbose_name=_('arguments'),
+        default=list,
+        encoder=DjangoJSONEncoder
+    )
+    kwargs = models.JSONField(
+        verbose_name=_('keyword arguments'),
+        default=dict,
+        encoder=DjangoJSONEncoder
+    )
+    status = models.CharField(
+        verbose_name=_('status'),
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name=_('attempts'),
+        default=0
+    )
+    run_after = models.DateTimeField(
+        verbose_name=_('run after'),
+        default=timezone.now
+    )
+    created = models.DateTimeField(
+        verbose_name=_('created'),
+        default=timezone.now
+    )
+    started_at = models.DateTimeField(
+        verbose_name=_('started at'),
+        blank=True,
+        null=True
+    )
+    finished_at = models.DateTimeField(
+        verbose_name=_('finished at'),
+        blank=True,
+        null=True
+    )
+    last_error = models.TextField(
+        verbose_name=_('last error'),
+        blank=True
+    )
+
+    class Meta:
+        """Metadata."""
+
+        verbose_name = _('task')
+        verbose_name_plural = _('tasks')
+        ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['run_after'],
+                condition=Q(status__in=('pending', 'running')),
+                name='tasks_task_due_idx'
+            ),
+            models.Index(
+                fields=['-created'],
+                name='tasks_task_created_idx'
+            ),
+        ]
+
+    def __str__(self):
+        """Return the name and the status of the task."""
+        return f'{self.name} ({self.status})'
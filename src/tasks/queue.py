@@ -0,0 +1,27 @@
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Task
+
+CHANNEL = 'tasks'
+
+
+def enqueue(name, args=(), kwargs=None, delay=None):
+    """
+    Add the task to the durable queue.
+
+    The task is run by the `run_worker` consumer once the current
+    transaction commits. On PostgreSQL the consumer is woken up right away
+    by a notification, which is delivered on commit as well.
+    """
+    run_after = timezone.now()
+    if delay:
+        run_after += timezone.timedelta(seconds=delay)
+    with transaction.atomic():
+        task = Task.objects.create(
+            name=name, args=list(args), kwargs=kwargs or {}, run_after=run_after
+        )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'NOTIFY {CHANNEL}')
+    return task
@@ -0,0 +1,68 @@
+from functools import update_wrapper
+from importlib import import_module
+
+from django.db import transaction
+
+_registry = {}
+
+
+class TaskFunction:
+    """
+    Function registered as a task.
+
+    Calling it runs the function right away, while `defer()` runs it in the
+    background once the current transaction commits: on the in-process
+    thread pool, or for durable tasks, from the database queue consumed by
+    `run_worker`. Arguments of durable tasks must be JSON-serializable.
+    """
+
+    def __init__(self, func, durable=False):
+        update_wrapper(self, func)
+        self.func = func
+        self.durable = durable
+        self.name = f'{func.__module__}.{func.__name__}'
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def defer(self, *args, **kwargs):
+        """Run the task in the background after the transaction commits."""
+        if self.durable:
+            from .queue import enqueue
+
+            # The row is written in the current transaction, so the task is
+            # queued if and only if the transaction commits.
+            return enqueue(self.name, args, kwargs)
+
+        from .runner import get_runner
+
+        transaction.on_commit(
+            lambda: get_runner().submit(self.name, self.func, args, kwargs)
+        )
+        return None
+
+
+def task(func=None, *, durable=False):
+    """
+    Register the function as a task.
+
+    Can be used as `@task` or `@task(durable=True)`.
+    """
+    def decorator(func):
+        task_function = TaskFunction(func, durable=durable)
+        _registry[task_function.name] = task_function
+        return task_function
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def get_task(name):
+    """Return the task registered under the name, importing its module."""
+    if name not in _registry:
+        import_module(name.rpartition('.')[0])
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f'Task {name!r} is not registered.') from None
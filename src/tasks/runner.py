@@ -0,0 +1,161 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values, fraction):
+    """Return the percentile of the sorted values."""
+    if not values:
+        return None
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class RunnerStats:
+    """Counters and recent latencies of the in-process tasks."""
+
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.submitted = self.completed = self.failed = 0
+        self.caller_runs = self.dropped = 0
+        self.waits = deque(maxlen=window)
+        self.durations = deque(maxlen=window)
+
+    def record(self, wait, duration, ok):
+        """Record a finished task."""
+        with self.lock:
+            self.waits.append(wait)
+            self.durations.append(duration)
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def snapshot(self):
+        """Return the current statistics."""
+        with self.lock:
+            waits, durations = sorted(self.waits), sorted(self.durations)
+            return {
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'caller_runs': self.caller_runs,
+                'dropped': self.dropped,
+                'wait_p50': percentile(waits, 0.5),
+                'wait_p95': percentile(waits, 0.95),
+                'run_p50': percentile(durations, 0.5),
+                'run_p95': percentile(durations, 0.95),
+            }
+
+
+class ThreadRunner:
+    """
+    Bounded thread pool running the in-process tasks.
+
+    At most `threads` tasks run at once and `queue_size` more wait for a
+    thread. When the queue is full the runner applies backpressure: with the
+    `run` policy the task runs in the submitting thread, which slows down
+    the request producing the work, with `drop` it is discarded.
+    """
+
+    def __init__(self, threads, queue_size, full_policy='run', stats_interval=60):
+        self.threads = threads
+        self.queue_size = queue_size
+        self.full_policy = full_policy
+        self.stats_interval = stats_interval
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='tasks')
+        self.slots = threading.BoundedSemaphore(threads + queue_size)
+        self.pending = 0
+        self.stats = RunnerStats()
+        self._logged_at = time.monotonic()
+
+    @property
+    def depth(self):
+        """Return the number of tasks queued or running."""
+        return self.pending
+
+    def submit(self, name, func, args, kwargs):
+        """Run the task on the pool, or apply the full queue policy."""
+        with self.stats.lock:
+            self.stats.submitted += 1
+        if not self.slots.acquire(blocking=False):
+            if self.full_policy == 'drop':
+                with self.stats.lock:
+                    self.stats.dropped += 1
+                logger.warning('Task queue is full, dropped %s', name)
+                return
+            with self.stats.lock:
+                self.stats.caller_runs += 1
+            self.execute(name, func, args, kwargs, time.monotonic())
+            self.log_stats()
+            return
+
+        with self.stats.lock:
+            self.pending += 1
+        self.executor.submit(self._run, name, func, args, kwargs, time.monotonic())
+
+    def _run(self, name, func, args, kwargs, submitted_at):
+        close_old_connections()
+        try:
+            self.execute(name, func, args, kwargs, submitted_at)
+        finally:
+            close_old_connections()
+            with self.stats.lock:
+                self.pending -= 1
+            self.slots.release()
+        self.log_stats()
+
+    def execute(self, name, func, args, kwargs, submitted_at):
+        """Run the task, recording its latency."""
+        started_at = time.monotonic()
+        ok = True
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            ok = False
+            logger.exception('Task %s failed', name)
+        self.stats.record(started_at - submitted_at, time.monotonic() - started_at, ok)
+
+    def log_stats(self):
+        """Log the statistics at most once per `stats_interval`."""
+        now = time.monotonic()
+        if now - self._logged_at < self.stats_interval:
+            return
+        self._logged_at = now
+        stats = self.stats.snapshot()
+        logger.info(
+            'Tasks: depth %d, submitted %d, completed %d, failed %d, ran by caller %d, dropped %d, '
+            'wait p50 %.3fs p95 %.3fs, run p50 %.3fs p95 %.3fs',
+            self.depth, stats['submitted'], stats['completed'], stats['failed'],
+            stats['caller_runs'], stats['dropped'], stats['wait_p50'], stats['wait_p95'],
+            stats['run_p50'], stats['run_p95']
+        )
+
+
+_runner = None
+_runner_pid = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    """Return the runner of the current process, created on first use."""
+    global _runner, _runner_pid
+    # Thread pools do not survive a fork: each worker process gets its own.
+    if _runner_pid != os.getpid():
+        with _runner_lock:
+            if _runner_pid != os.getpid():
+                _runner = ThreadRunner(
+                    settings.TASKS_THREADS,
+                    settings.TASKS_QUEUE_SIZE,
+                    settings.TASKS_FULL_POLICY,
+                    settings.TASKS_STATS_INTERVAL,
+                )
+                _runner_pid = os.getpid()
+    return _runner
@@ -0,0 +1,55 @@
+from django.db import connection
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import Task
+
+LATENCY_QUERY = """
+SELECT
+    name,
+    count(*),
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY extract(epoch FROM started_at - created)),
+    percentile_cont(0.95) WITHIN GROUP (ORDER BY extract(epoch FROM started_at - created)),
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY extract(epoch FROM finished_at - started_at)),
+    percentile_cont(0.95) WITHIN GROUP (ORDER BY extract(epoch FROM finished_at - started_at))
+FROM {table}
+WHERE status = %s AND created >= %s
+GROUP BY name
+ORDER BY name
+"""
+
+
+def queue_stats(since):
+    """
+    Return the statistics of the durable queue.
+
+    The depth and the age of the oldest due task describe the current
+    backlog, the latencies the tasks created since the given time: the wait
+    from enqueueing to the last start and the run time, in seconds.
+    """
+    now = timezone.now()
+    due = Task.objects.filter(status__in=(Task.PENDING, Task.RUNNING), run_after__lte=now)
+    oldest = due.aggregate(oldest=Min('created'))['oldest']
+    stats = {
+        'depth': dict(
+            Task.objects.filter(status=Task.PENDING).order_by()
+            .values_list('name').annotate(Count('pk'))
+        ),
+        'due': due.count(),
+        'oldest_due_age': (now - oldest).total_seconds() if oldest else None,
+        'statuses': dict(
+            Task.objects.filter(created__gte=since).order_by()
+            .values_list('status').annotate(Count('pk'))
+        ),
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(
+            LATENCY_QUERY.format(table=connection.ops.quote_name(Task._meta.db_table)),
+            [Task.DONE, since]
+        )
+        stats['latency'] = {
+            name: {'done': count, 'wait_p50': wait_p50, 'wait_p95': wait_p95,
+                   'run_p50': run_p50, 'run_p95': run_p95}
+            for name, count, wait_p50, wait_p95, run_p50, run_p95 in cursor.fetchall()
+        }
+    return stats
@@ -0,0 +1,138 @@
+import logging
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from config import db
+
+from .models import Task
+from .queue import CHANNEL
+from .registry import get_task
+
+logger = logging.getLogger(__name__)
+
+# Seconds between the checks for new tasks while others are running
+BUSY_TICK = 0.5
+
+
+def retry_delay(attempts):
+    """Return the delay before the next attempt, exponential with jitter."""
+    delay = min(
+        settings.TASKS_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1),
+        settings.TASKS_RETRY_BACKOFF_MAX_SECONDS
+    )
+    return timezone.timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+class Worker:
+    """
+    Consumer of the durable task queue.
+
+    Tasks are claimed with `SKIP LOCKED`, so several workers can run side
+    by side, and leased for `TASKS_LEASE_SECONDS`: a task whose worker died
+    is claimed again once the lease expires. The worker keeps up to
+    `threads` tasks running and claims new ones as soon as a thread is
+    free, so a slow task does not hold back the others. Failed tasks are
+    retried with exponential backoff up to `TASKS_MAX_ATTEMPTS` times.
+    """
+
+    def __init__(self, threads=None, poll_interval=None):
+        self.threads = threads or settings.TASKS_WORKER_THREADS
+        self.poll_interval = poll_interval or settings.TASKS_WORKER_POLL_INTERVAL
+        self.running = True
+        self._listening_to = None
+
+    def claim(self, limit):
+        """Lease up to `limit` due tasks to this worker and return them."""
+        now = timezone.now()
+        with transaction.atomic():
+            tasks = list(
+                Task.objects
+                .filter(status__in=(Task.PENDING, Task.RUNNING), run_after__lte=now)
+                .order_by('run_after')
+                .select_for_update(skip_locked=True)[:limit]
+            )
+            if tasks:
+                Task.objects.filter(pk__in=[task.pk for task in tasks]).update(
+                    status=Task.RUNNING,
+                    started_at=now,
+                    run_after=now + timezone.timedelta(seconds=settings.TASKS_LEASE_SECONDS)
+                )
+        return tasks
+
+    @staticmethod
+    def execute(task):
+        """Run the task in a pool thread, returning the error if it failed."""
+        close_old_connections()
+        try:
+            get_task(task.name)(*task.args, **task.kwargs)
+        except Exception as error:
+            logger.exception('Task %s (%s) failed', task.name, task.pk)
+            return str(error) or error.__class__.__name__
+        finally:
+            close_old_connections()
+        return None
+
+    def record(self, task, error):
+        """Store the outcome of the task."""
+        now = timezone.now()
+        task.attempts += 1
+        task.last_error = error or ''
+        if error is None:
+            task.status = Task.DONE
+            task.finished_at = now
+        elif task.attempts < settings.TASKS_MAX_ATTEMPTS:
+            task.status = Task.PENDING
+            task.run_after = now + retry_delay(task.attempts)
+        else:
+            task.status = Task.FAILED
+            task.finished_at = now
+        Task.objects.filter(pk=task.pk).update(
+            status=task.status,
+            attempts=task.attempts,
+            run_after=task.run_after,
+            finished_at=task.finished_at,
+            last_error=task.last_error
+        )
+
+    def listen(self):
+        """Subscribe to the queue notifications on the current connection."""
+        if connection.vendor != 'postgresql':
+            return None
+        connection.ensure_connection()
+        if self._listening_to is not connection.connection:
+            self._listening_to = db.listen(connection, CHANNEL)
+        return connection.connection
+
+    def wait_for_notification(self):
+        """Wait for a new task or the poll interval."""
+        if self.listen() is None:
+            time.sleep(self.poll_interval)
+            return
+        db.wait_for_notifications(connection, self.poll_interval)
+
+    def run(self, once=False):
+        """Run the due tasks until stopped, then finish the running ones."""
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='worker') as executor:
+            while self.running or in_flight:
+                free = self.threads - len(in_flight)
+                if self.running and free:
+                    for task in self.claim(free):
+                        in_flight[executor.submit(self.execute, task)] = task
+                if not in_flight:
+                    if once:
+                        break
+                    self.wait_for_notification()
+                    continue
+                done, _ = wait(in_flight, timeout=BUSY_TICK, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.record(in_flight.pop(future), future.result())
+
+    def stop(self, *args):
+        """Stop claiming tasks, finishing the running ones."""
+        self.running = False
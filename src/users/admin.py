@@ -3,7 +3,10 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.forms import UserChangeForm, UserCreationForm
 
-from .models import AuthCode, User
+from referrals import attach
+
+from .counting import EstimatedCountPaginator
+from .models import ArchivedUser, AuthCode, User
 
 
 class CustomUserChangeForm(UserChangeForm):
@@ -47,14 +50,17 @@ class CustomUserAdmin(BaseUserAdmin):
 
     form = CustomUserChangeForm
     add_form = CustomUserCreationForm
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     list_display = ('email', 'phone', 'invite_code', 'date_joined')
+    search_fields = ('email', 'phone', 'invite_code', 'first_name', 'last_name')
     ordering = ('date_joined',)
     fieldsets = (
         (
             ('Basic Information'),
             {'fields': ('email', 'phone', 'invite_code', 'invited_by_code',
-                        'first_name', 'last_name', 'password')}
+                        'invited_count', 'first_name', 'last_name', 'password')}
         ),
         (
             ('Roles and Permissions'),
@@ -71,6 +77,21 @@ class CustomUserAdmin(BaseUserAdmin):
     ), }), )
     readonly_fields = ('invite_code',)
 
+    def get_readonly_fields(self, request, obj=None):
+        """Make the referral read-only once the user exists, it is set by `referrals.attach`."""
+        if obj is None:
+            return self.readonly_fields
+        return (*self.readonly_fields, 'invited_by_code', 'invited_count')
+
+    def save_model(self, request, obj, form, change):
+        """Save the user, attaching a new one to the owner of its referral code."""
+        code = None
+        if not change:
+            code, obj.invited_by_code = obj.invited_by_code, None
+        super().save_model(request, obj, form, change)
+        if code:
+            attach.attach(obj.pk, code)
+
 
 @admin.register(AuthCode)
 class AuthCodeAdmin(admin.ModelAdmin):
@@ -106,3 +127,23 @@ class AuthCodeAdmin(admin.ModelAdmin):
             bool: True if the user has permission to change AuthCode instances, False otherwise.
         """
         return False
+
+
+@admin.register(ArchivedUser)
+class ArchivedUserAdmin(admin.ModelAdmin):
+    """Read-only admin configuration for the ArchivedUser model."""
+
+    list_display = ('phone', 'invite_code', 'invited_by_code', 'last_login', 'archived_at')
+    search_fields = ('=phone', '=invite_code')
+    exclude = ('password',)
+    ordering = ('-archived_at',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request, obj=None):
+        """Archived users are only created by archive_inactive_users."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Archived users are restored by logging in, not edited."""
+        return False
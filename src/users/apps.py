@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_migrate, post_save
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        from .models import User
+        from .signals import (add_invite_code, apply_auth_code_storage,
+                              discard_invite_code, forget_invitee)
+
+        post_migrate.connect(apply_auth_code_storage, sender=self)
+        post_save.connect(add_invite_code, sender=User)
+        post_delete.connect(discard_invite_code, sender=User)
+        post_delete.connect(forget_invitee, sender=User)
@@ -0,0 +1,142 @@
+"""
+Cold storage of inactive users.
+
+`manage.py archive_inactive_users` moves the users who are deactivated or
+have not logged in for months from the users table to `users_archive`, so
+the indexes of the users table, used by every lookup, search and list
+page, only cover the users who still use the service.
+
+Archived users keep their ID, invite code and referral. Their codes stay
+valid and their invitees are still listed, so the referral counts do not
+change. A user logging in again, or authenticating with a token issued
+before the move, is moved back by `restore`, and the profile and batch
+lookups fall back to the archive on a miss.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from .models import ArchivedUser
+
+ARCHIVE_BATCH = """
+WITH batch AS (
+    SELECT id FROM {table}
+    WHERE id > %(last_id)s
+    ORDER BY id
+    LIMIT %(batch_size)s
+), moved AS (
+    DELETE FROM {table} AS u
+    USING batch
+    WHERE u.id = batch.id
+      AND NOT u.is_staff AND NOT u.is_superuser
+      AND (
+          NOT u.is_active
+          OR u.last_login < %(cutoff)s
+          OR (u.last_login IS NULL AND u.date_joined < %(cutoff)s AND %(tracked_since)s::timestamptz < %(cutoff)s)
+      )
+      {unreferenced}
+    RETURNING {moved_columns}
+), archived AS (
+    INSERT INTO {archive} ({columns}, archived_at)
+    SELECT {columns}, now() FROM moved
+    RETURNING id
+)
+SELECT (SELECT max(id) FROM batch), (SELECT count(*) FROM archived)
+"""
+
+RESTORE = """
+WITH moved AS (
+    DELETE FROM {archive} WHERE {key} = %s
+    RETURNING {columns}
+)
+INSERT INTO {table} ({columns})
+SELECT {restored_columns} FROM moved
+RETURNING id
+"""
+
+
+def quote(name):
+    """Quote the identifier."""
+    return connection.ops.quote_name(name)
+
+
+def user_columns():
+    """Return the columns of the users table, which the archive repeats."""
+    return [field.column for field in get_user_model()._meta.concrete_fields]
+
+
+def references():
+    """
+    Return the tables and columns referencing the users table.
+
+    Users referenced by other rows (groups, permissions, admin log entries)
+    are never archived, as the foreign keys would prevent the move.
+    """
+    User = get_user_model()
+    return [
+        (relation.related_model._meta.db_table, relation.field.column)
+        for relation in User._meta.get_fields(include_hidden=True)
+        if (relation.one_to_many or relation.one_to_one) and relation.auto_created and not relation.concrete
+    ]
+
+
+def archive_batch(cursor, last_id, batch_size, cutoff, tracked_since=None):
+    """
+    Move the inactive users among the next batch of IDs to the archive.
+
+    Users without a recorded login are inactive only if logins were tracked
+    since before the cutoff, `tracked_since`: otherwise they may well have
+    logged in before the tracking, and still hold valid tokens.
+
+    Return the last ID of the batch, None when the table is exhausted, and
+    the number of users moved.
+    """
+    columns = user_columns()
+    unreferenced = '\n      '.join(
+        f'AND NOT EXISTS (SELECT 1 FROM {quote(table)} WHERE {quote(column)} = u.id)'
+        for table, column in references()
+    )
+    cursor.execute(ARCHIVE_BATCH.format(
+        table=quote(get_user_model()._meta.db_table),
+        archive=quote(ArchivedUser._meta.db_table),
+        columns=', '.join(quote(column) for column in columns),
+        moved_columns=', '.join(f'u.{quote(column)}' for column in columns),
+        unreferenced=unreferenced,
+    ), {'last_id': last_id, 'batch_size': batch_size, 'cutoff': cutoff, 'tracked_since': tracked_since})
+    return cursor.fetchone()
+
+
+def _restore(key, value):
+    User = get_user_model()
+    table = quote(User._meta.db_table)
+    columns = user_columns()
+    restored_columns = [
+        f'CASE WHEN EXISTS (SELECT 1 FROM {table} WHERE email = moved.email) '
+        f'THEN NULL ELSE moved.email END' if column == 'email' else f'moved.{quote(column)}'
+        for column in columns
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(RESTORE.format(
+            table=table,
+            archive=quote(ArchivedUser._meta.db_table),
+            key=quote(key),
+            columns=', '.join(quote(column) for column in columns),
+            restored_columns=', '.join(restored_columns),
+        ), [value])
+        row = cursor.fetchone()
+    return row and row[0]
+
+
+def restore(phone_key):
+    """
+    Move the archived user with the phone key back to the users table.
+
+    Return the ID of the restored user or None if the phone is not in the
+    archive. An email taken by another user in the meantime is dropped.
+    """
+    return _restore('phone_key', phone_key)
+
+
+def restore_id(user_id):
+    """Move the archived user with the ID back to the users table, as `restore` does."""
+    return _restore('id', user_id)
@@ -0,0 +1,84 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    """
+    Return the planner's estimate of the number of rows in the queryset.
+
+    Unfiltered querysets are estimated from `pg_class.reltuples` (summed over
+    the partitions of a partitioned table), filtered ones from the row
+    estimate of their `EXPLAIN` plan. Returns None if the database is not
+    PostgreSQL or the table has never been analyzed.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    query = queryset.query
+    with connection.cursor() as cursor:
+        if not query.where and not query.distinct and not query.combinator:
+            # A partitioned table has no rows itself: sum its partitions.
+            table = connection.ops.quote_name(queryset.model._meta.db_table)
+            cursor.execute(
+                """
+                SELECT sum(reltuples), min(reltuples)
+                FROM pg_class
+                WHERE (oid = %s::regclass AND relkind <> 'p')
+                   OR oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass)
+                """,
+                [table, table]
+            )
+            total, minimum = cursor.fetchone()
+            if total is None or minimum < 0:
+                return None
+            return int(total)
+
+        try:
+            sql, params = queryset.order_by().query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def fast_count(queryset, threshold=None):
+    """
+    Count the queryset, estimating the count of large results.
+
+    Results estimated below the threshold, `EXACT_COUNT_THRESHOLD` by
+    default, are counted exactly. The estimate of a filtered queryset can be
+    far off, so it is checked with a count capped at the threshold, which
+    stops as soon as the threshold is reached and is exact below it.
+    """
+    if threshold is None:
+        threshold = settings.EXACT_COUNT_THRESHOLD
+    estimate = estimate_count(queryset)
+    if estimate is None or estimate < threshold:
+        return queryset.count()
+    if not queryset.query.where:
+        return estimate
+
+    capped_count = queryset.order_by()[:threshold].count()
+    if capped_count < threshold:
+        return capped_count
+    return max(estimate, threshold)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator counting the objects with `fast_count`."""
+
+    @cached_property
+    def count(self):
+        """Return the estimated total number of objects."""
+        if hasattr(self.object_list, 'query'):
+            return fast_count(self.object_list)
+        return super().count
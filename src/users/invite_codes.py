@@ -0,0 +1,361 @@
+"""
+Per-process index of the invite codes.
+
+Validating referral codes is dominated by misses: typos and code guessing.
+The index answers them without a query. A Bloom filter of all the codes
+rejects most invalid codes outright, the codes it cannot rule out are
+looked up in an LRU cache of recent hits and only then in the database.
+
+The filter is built in a background thread on first use (lookups go to the
+database until it is ready), receives the codes of the users created by the
+process on commit, picks up the users created by other processes every
+`INVITE_CODE_SYNC_SECONDS` and is rebuilt from scratch every
+`INVITE_CODE_REBUILD_SECONDS` or once it holds more codes than it was
+sized for. A code created by another process can therefore be rejected for
+up to `INVITE_CODE_SYNC_SECONDS`.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, connection
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# One row per code, in the order of the codes, matched on the upper(invite_code)
+# indexes. Archived users are restored on login, their codes stay valid.
+FIND_USER_IDS = """
+SELECT COALESCE(
+    (SELECT id FROM {users} WHERE upper(invite_code) = codes.code LIMIT 1),
+    (SELECT id FROM {archive} WHERE upper(invite_code) = codes.code LIMIT 1)
+)
+FROM unnest(%s::text[]) WITH ORDINALITY AS codes(code, position)
+ORDER BY codes.position
+"""
+
+
+class BloomFilter:
+    """Bloom filter of strings sized for a capacity and a false positive rate."""
+
+    def __init__(self, capacity, fp_rate):
+        self.capacity = max(capacity, 1)
+        self.fp_rate = fp_rate
+        self.size = max(int(-self.capacity * math.log(fp_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / self.capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # Double hashing: the k positions are h1 + i * h2.
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        """Add the value to the filter."""
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+    @property
+    def memory(self):
+        """Return the size of the bit array in bytes."""
+        return len(self.bits)
+
+    @property
+    def estimated_fp_rate(self):
+        """Return the expected false positive rate at the current fill."""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class LRUCache:
+    """Thread-safe LRU cache with expiring entries."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value or None."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Cache the value, evicting the least recently used entry if full."""
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove the key from the cache."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class InviteCodeIndex:
+    """Lookup of the user ID by invite code, see the module docstring."""
+
+    def __init__(self):
+        self.fp_rate = settings.INVITE_CODE_BLOOM_FP_RATE
+        self.cache = LRUCache(settings.INVITE_CODE_LRU_SIZE, settings.INVITE_CODE_LRU_TTL)
+        self.bloom = None
+        self.built_at = self.synced_at = self.sync_from = None
+        self.stats = dict.fromkeys(
+            ('lookups', 'bloom_rejects', 'bloom_false_positives', 'cache_hits', 'db_hits', 'db_misses'), 0
+        )
+        self._lock = threading.Lock()
+        self._building = False
+        self._added = []
+
+    @staticmethod
+    def normalize(code):
+        """Return the code in the case-insensitive form used as the key."""
+        return code.strip().upper()
+
+    def lookup(self, code):
+        """Return the ID of the user with the invite code or None."""
+        code = self.normalize(code)
+        self.stats['lookups'] += 1
+        bloom = self.maintain()
+        # The cache holds the codes added by this process, which a filter
+        # swapped in by a rebuild may not have yet.
+        user_id = self.cache.get(code)
+        if user_id is not None:
+            self.stats['cache_hits'] += 1
+            return user_id
+
+        if bloom is not None and code not in bloom:
+            self.stats['bloom_rejects'] += 1
+            return None
+
+        user_id = find_user_id(code)
+        if user_id is None:
+            self.stats['db_misses'] += 1
+            if bloom is not None:
+                self.stats['bloom_false_positives'] += 1
+            return None
+        self.stats['db_hits'] += 1
+        self.cache.set(code, user_id)
+        return user_id
+
+    def add(self, code, user_id):
+        """Add the code of a new user."""
+        code = self.normalize(code)
+        with self._lock:
+            if self.bloom is not None:
+                self.bloom.add(code)
+            if self._building:
+                # Also added to the filter being built, once it is swapped in.
+                self._added.append(code)
+        self.cache.set(code, user_id)
+
+    def discard(self, code):
+        """Forget the cached code of a deleted user."""
+        self.cache.delete(self.normalize(code))
+
+    def maintain(self):
+        """Return the current filter, scheduling its build, sync or rebuild."""
+        now = time.monotonic()
+        bloom = self.bloom
+        if bloom is None or now - self.built_at > settings.INVITE_CODE_REBUILD_SECONDS:
+            self.start_build()
+        elif now - self.synced_at > settings.INVITE_CODE_SYNC_SECONDS:
+            self.sync()
+        return self.bloom
+
+    def start_build(self):
+        """Build the filter in a background thread, unless already building."""
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+        threading.Thread(target=self._build_in_thread, name='invite-codes', daemon=True).start()
+
+    def _build_in_thread(self):
+        try:
+            self.build()
+        except Exception:
+            logger.exception('Building the invite code filter failed')
+        finally:
+            close_old_connections()
+            with self._lock:
+                self._building = False
+                self._added = []
+
+    def build(self):
+        """Build the filter from all the codes."""
+        from .models import ArchivedUser
+
+        User = get_user_model()
+        started = time.monotonic()
+        started_at = timezone.now()
+        count = User.objects.count() + ArchivedUser.objects.count()
+        capacity = settings.INVITE_CODE_BLOOM_CAPACITY or max(count * 2, 100000)
+        bloom = BloomFilter(capacity, self.fp_rate)
+        # Archived users are restored on login, their codes stay valid.
+        for model in (User, ArchivedUser):
+            codes = model.objects.annotate(code=Upper('invite_code')).values_list('code', flat=True)
+            for code in codes.order_by().iterator(chunk_size=10000):
+                bloom.add(code)
+
+        with self._lock:
+            # The codes added while building are carried over, those of
+            # users created by other processes are picked up by the next sync.
+            for code in self._added:
+                bloom.add(code)
+            self._added = []
+            self.bloom = bloom
+            self.built_at = self.synced_at = time.monotonic()
+            self.sync_from = started_at
+        logger.info(
+            'Built the invite code filter of %d codes in %.2fs: %d KiB, %d hashes, '
+            'estimated false positive rate %.4f',
+            bloom.count, time.monotonic() - started, bloom.memory // 1024,
+            bloom.hashes, bloom.estimated_fp_rate
+        )
+
+    def sync(self):
+        """Add the codes of the users created since the last sync."""
+        User = get_user_model()
+        with self._lock:
+            if self.synced_at is None or time.monotonic() - self.synced_at <= settings.INVITE_CODE_SYNC_SECONDS:
+                return
+            self.synced_at = time.monotonic()
+            since = self.sync_from
+            self.sync_from = timezone.now()
+
+        # Users are looked up by their join time with an overlap, so those
+        # committed after a later join are not missed.
+        since -= timezone.timedelta(seconds=settings.INVITE_CODE_SYNC_OVERLAP_SECONDS)
+        codes = User.objects.filter(date_joined__gte=since).annotate(
+            code=Upper('invite_code')
+        ).values_list('code', flat=True)
+        bloom = self.bloom
+        for code in codes.order_by():
+            bloom.add(code)
+        if bloom.count > bloom.capacity:
+            # Overfilled: the false positive rate grows, size a new filter.
+            self.start_build()
+
+    def report(self):
+        """Return the statistics of the index."""
+        bloom = self.bloom
+        rejects, misses = self.stats['bloom_rejects'], self.stats['bloom_false_positives']
+        return {
+            **self.stats,
+            'ready': bloom is not None,
+            'codes': bloom.count if bloom else 0,
+            'capacity': bloom.capacity if bloom else 0,
+            'hashes': bloom.hashes if bloom else 0,
+            'bloom_bytes': bloom.memory if bloom else 0,
+            'cached_codes': len(self.cache),
+            'target_fp_rate': self.fp_rate,
+            'estimated_fp_rate': bloom.estimated_fp_rate if bloom else None,
+            'observed_fp_rate': misses / (rejects + misses) if rejects + misses else None,
+        }
+
+
+_index = None
+_index_pid = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Return the index of the current process."""
+    global _index, _index_pid
+    if _index_pid != os.getpid():
+        with _index_lock:
+            if _index_pid != os.getpid():
+                _index = InviteCodeIndex()
+                _index_pid = os.getpid()
+    return _index
+
+
+def adopt_index():
+    """
+    Keep the index of the parent process in a forked child.
+
+    Called in the gunicorn workers, forked from the master once it built the
+    index while warming up, so they share its filter instead of each
+    building its own. No thread of the master holds the locks at the fork.
+    """
+    global _index_pid
+    if _index is not None:
+        _index_pid = os.getpid()
+
+
+def find_user_id(code):
+    """Query the ID of the user with the invite code, archived or not."""
+    from .models import ArchivedUser
+
+    for model in (get_user_model(), ArchivedUser):
+        user_id = model.objects.filter(invite_code__iexact=code).values_list('pk', flat=True).first()
+        if user_id is not None:
+            return user_id
+    return None
+
+
+def find_user_ids(codes, chunk_size=1000):
+    """
+    Yield the ID of the user with each invite code or None, in the order of the codes.
+
+    On PostgreSQL all the codes are resolved by one query, whose rows are
+    fetched from a server-side cursor in chunks as they are consumed
+    (unless `DISABLE_SERVER_SIDE_CURSORS` is set, then all at once).
+    """
+    from .models import ArchivedUser
+
+    codes = [InviteCodeIndex.normalize(code) for code in codes]
+    if connection.vendor != 'postgresql':
+        yield from (find_user_id(code) for code in codes)
+        return
+    quote = connection.ops.quote_name
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(FIND_USER_IDS.format(
+            users=quote(get_user_model()._meta.db_table),
+            archive=quote(ArchivedUser._meta.db_table),
+        ), [codes])
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            for row in rows:
+                yield row[0]
+
+
+def lookup(code):
+    """Return the ID of the user with the invite code or None."""
+    if not settings.INVITE_CODE_INDEX_ENABLED:
+        return find_user_id(code)
+    return get_index().lookup(code)
@@ -0,0 +1,74 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from users.archive import archive_batch
+from users.models import ArchivedUser
+
+
+class Command(BaseCommand):
+    help = (
+        'Move the users who are deactivated or have not logged in for '
+        'months to the users archive, in small batches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=settings.USER_ARCHIVE_INACTIVE_MONTHS,
+            help='Archive the users inactive for this many 30-day months.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of users scanned per batch.'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Seconds to pause between batches to spread the load.'
+        )
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='Vacuum the users table and the archive afterwards.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('archive_inactive_users requires PostgreSQL.')
+        if options['months'] < 1:
+            raise CommandError('--months must be at least 1.')
+        cutoff = timezone.now() - timezone.timedelta(days=30 * options['months'])
+        tracked_since = None
+        if settings.USER_LOGIN_TRACKED_SINCE:
+            tracked_since = timezone.datetime.fromisoformat(settings.USER_LOGIN_TRACKED_SINCE)
+            if timezone.is_naive(tracked_since):
+                tracked_since = timezone.make_aware(tracked_since)
+
+        # Each batch moves its users in one statement, a short transaction
+        # walking the primary key, like purge_auth_codes.
+        last_id, total = 0, 0
+        while True:
+            with connection.cursor() as cursor:
+                last_id, moved = archive_batch(cursor, last_id, options['batch_size'], cutoff, tracked_since)
+            if last_id is None:
+                break
+            total += moved
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        if options['vacuum']:
+            User = get_user_model()
+            with connection.cursor() as cursor:
+                for model in (User, ArchivedUser):
+                    cursor.execute(f'VACUUM (ANALYZE) {connection.ops.quote_name(model._meta.db_table)}')
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} inactive users.'))
@@ -0,0 +1,216 @@
+import random
+import statistics
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from config import db
+from users import phones
+from users.management.commands.seed_users import COLUMNS, UNUSABLE_PASSWORD
+from users.management.commands.seed_users import Command as SeedCommand
+from users.partitioning import (create_guards, create_indexes, create_table,
+                                guard_name, inspect_table, quote)
+from users.seeding import generate_users
+
+User = get_user_model()
+
+PLAIN_SCHEMA = 'bench_plain'
+PARTITIONED_SCHEMA = 'bench_partitioned'
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare a plain and a hash-partitioned users table loaded with the '
+        'same synthetic users. The tables are built in scratch schemas, '
+        'which are dropped afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=200000,
+            help='Number of users to load.'
+        )
+        parser.add_argument(
+            '--partitions',
+            type=int,
+            default=8,
+            help='Number of hash partitions.'
+        )
+        parser.add_argument(
+            '--samples',
+            type=int,
+            default=2000,
+            help='Number of executions of each query.'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed of the generated users and the sampled keys.'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the scratch schemas.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning requires PostgreSQL.')
+        if options['partitions'] < 2:
+            raise CommandError('--partitions must be at least 2.')
+
+        users = list(generate_users(options['rows'] + options['samples'], seed=options['seed']))
+        loaded, inserted = users[:options['rows']], users[options['rows']:]
+        with connection.cursor() as cursor:
+            layout = inspect_table(cursor, User._meta.db_table)
+
+        results = {}
+        try:
+            for schema, partitions in ((PLAIN_SCHEMA, 0), (PARTITIONED_SCHEMA, options['partitions'])):
+                self.stdout.write(f'Benchmarking {schema}')
+                results[schema] = self.benchmark(
+                    layout, schema, partitions, loaded, inserted,
+                    random.Random(options['seed']), options['samples'],
+                )
+        finally:
+            if not options['keep']:
+                with connection.cursor() as cursor:
+                    for schema in (PLAIN_SCHEMA, PARTITIONED_SCHEMA):
+                        cursor.execute(f'DROP SCHEMA IF EXISTS {quote(schema)} CASCADE')
+
+        partitioned = f'{options["partitions"]} partitions'
+        self.stdout.write(f'{"(median/p95)":<28}{"plain":>16}{partitioned:>16}')
+        for metric in results[PLAIN_SCHEMA]:
+            self.stdout.write(
+                f'{metric:<28}'
+                + ''.join(f'{results[schema][metric]:>16}' for schema in results)
+            )
+
+    def benchmark(self, layout, schema, partitions, loaded, inserted, rng, samples):
+        """Build the table in the schema and return the measurements."""
+        results = {}
+        columns = ', '.join(quote(column) for column in COLUMNS)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP SCHEMA IF EXISTS {quote(schema)} CASCADE')
+            cursor.execute(f'CREATE SCHEMA {quote(schema)}')
+            target = create_table(
+                cursor, layout, f'public.{quote(layout.table)}', schema, partitions
+            )
+
+            started = perf_counter()
+            db.copy_from(
+                cursor,
+                f'COPY {target} ({columns}) FROM STDIN WITH (FORMAT csv)',
+                SeedCommand.to_csv(loaded)
+            )
+            results['load (COPY)'] = seconds(perf_counter() - started)
+            started = perf_counter()
+            create_indexes(cursor, layout, target)
+            if partitions:
+                create_guards(cursor, layout, schema, target)
+            results['build indexes'] = seconds(perf_counter() - started)
+            cursor.execute(f'ANALYZE {target}')
+
+            cursor.execute(f'SELECT id, phone_key, invite_code FROM {target}')
+            keys = rng.sample(cursor.fetchall(), samples)
+            inviters = [code for _, _, code in keys]
+            phone_guard = f'{quote(schema)}.{quote(guard_name(layout.table, "phone_key"))}'
+            queries = {
+                'get by id': (f'SELECT * FROM {target} WHERE id = %s', [[pk] for pk, _, _ in keys]),
+                'get by phone': (f'SELECT * FROM {target} WHERE phone_key = %s', [[key] for _, key, _ in keys]),
+                'get by invite code': (
+                    f'SELECT * FROM {target} WHERE upper(invite_code) = upper(%s)',
+                    [[code] for code in inviters]
+                ),
+                'invitees page': (
+                    f'SELECT * FROM {target} WHERE invited_by_code = %s ORDER BY date_joined DESC LIMIT 10',
+                    [[code] for code in inviters]
+                ),
+                'list page': (
+                    f'SELECT * FROM {target} ORDER BY date_joined DESC LIMIT 10 OFFSET %s',
+                    [[rng.randrange(1000)] for _ in range(samples)]
+                ),
+            }
+            queries['update last_login'] = (
+                f'UPDATE {target} SET last_login = now() WHERE id = %s',
+                [[pk] for pk, _, _ in keys]
+            )
+            for name, (sql, params) in queries.items():
+                results[name] = self.time_queries(cursor, sql, params)
+            # The plain table has no guards: its phone lookups use the unique index.
+            results['get by phone (guard)'] = self.time_guarded(
+                cursor, target, phone_guard, [key for _, key, _ in keys]
+            ) if partitions else results['get by phone']
+
+            insert = f'INSERT INTO {target} ({columns}) VALUES ({", ".join(["%s"] * len(COLUMNS))})'
+            results['insert'] = self.time_queries(cursor, insert, [
+                [
+                    user['phone'], phones.to_key(user['phone']), user['invite_code'],
+                    user['invited_by_code'], 0, user['email'], user['first_name'],
+                    user['last_name'], user['date_joined'], UNUSABLE_PASSWORD, False, False, True,
+                ]
+                for user in inserted
+            ])
+
+            started = perf_counter()
+            cursor.execute(f'VACUUM (ANALYZE) {target}')
+            results['vacuum'] = seconds(perf_counter() - started)
+            started = perf_counter()
+            cursor.execute(f'REINDEX TABLE {target}')
+            results['reindex'] = seconds(perf_counter() - started)
+
+            cursor.execute(
+                """
+                SELECT sum(pg_total_relation_size(c.oid))
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = %s AND c.relkind IN ('r', 'p')
+                """,
+                [schema]
+            )
+            results['total size'] = f'{cursor.fetchone()[0] / 2 ** 20:.1f} MB'
+        return results
+
+    @staticmethod
+    def time_queries(cursor, sql, params_list):
+        """Execute the query with each parameters and return the latencies."""
+        timings = []
+        for params in params_list:
+            started = perf_counter()
+            cursor.execute(sql, params)
+            if cursor.description:
+                cursor.fetchall()
+            timings.append(perf_counter() - started)
+        return percentiles(timings)
+
+    @staticmethod
+    def time_guarded(cursor, target, guard, phone_keys):
+        """Look up the users by phone key the way `filter_unique` does."""
+        timings = []
+        for phone_key in phone_keys:
+            started = perf_counter()
+            cursor.execute(f'SELECT user_id FROM {guard} WHERE value = %s', [phone_key])
+            cursor.execute(
+                f'SELECT * FROM {target} WHERE id = %s AND phone_key = %s', [cursor.fetchone()[0], phone_key]
+            )
+            cursor.fetchall()
+            timings.append(perf_counter() - started)
+        return percentiles(timings)
+
+
+def percentiles(timings):
+    """Format the median and the 95th percentile of the latencies."""
+    timings = sorted(timings)
+    median = statistics.median(timings)
+    p95 = timings[int(len(timings) * 0.95)]
+    return f'{median * 1e6:.0f}/{p95 * 1e6:.0f} µs'
+
+
+def seconds(value):
+    """Format the duration in seconds."""
+    return f'{value:.2f} s'
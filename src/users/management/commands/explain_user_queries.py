@@ -0,0 +1,107 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.v1.users.views import UserViewSet
+
+User = get_user_model()
+
+
+def walk(plan):
+    """Yield the node and all the child nodes of the plan."""
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from walk(child)
+
+
+class Command(BaseCommand):
+    help = (
+        'Show the EXPLAIN plans of the user list for each supported filter '
+        'with the default ordering, and of the invite code lookups.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help=(
+                'Fail if a query cannot use an index: the plans are built with '
+                'sequential and bitmap scans disabled, whatever the data looks '
+                'like, so a remaining sequential scan, a scan '
+                'filtering rows instead of looking them up in an index, or an '
+                'explicit sort of a page of a non-unique filter, means a missing '
+                'index.'
+            )
+        )
+
+    def get_queries(self):
+        """
+        Return the checked queries.
+
+        Each query is described by its name, queryset and whether its rows
+        should come ordered from an index rather than an explicit sort.
+        """
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        queries = [('list', User.objects.all()[:page_size], True)]
+        for name in UserViewSet.filterset_fields:
+            queries.append((
+                f'filter {name}',
+                User.objects.filter(**{name: 'value'})[:page_size],
+                not User._meta.get_field(name).unique,
+            ))
+        queries += [
+            (
+                'invited users',
+                User.objects.filter(invited_by_code__iexact='value'),
+                False,
+            ),
+            (
+                'invite code lookup',
+                User.objects.filter(invite_code__iexact='value').order_by(),
+                False,
+            ),
+        ]
+        return queries
+
+    def explain(self, queryset, fmt):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT {fmt}) {sql}', params)
+            rows = cursor.fetchall()
+        if fmt == 'JSON':
+            plan = rows[0][0]
+            return (json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan']
+        return '\n'.join(row[0] for row in rows)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Query plans are only checked on PostgreSQL.')
+
+        failures = []
+        with transaction.atomic():
+            if options['check']:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+                    # A bitmap scan loses the index order: for values rare in
+                    # the data the planner may prefer it and sort, although the
+                    # index could return the rows in order.
+                    cursor.execute('SET LOCAL enable_bitmapscan = off')
+
+            for name, queryset, sorted_by_index in self.get_queries():
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                self.stdout.write(self.explain(queryset, 'TEXT'))
+                self.stdout.write('')
+
+                for node in walk(self.explain(queryset, 'JSON')):
+                    if node['Node Type'] == 'Seq Scan':
+                        failures.append(f'{name}: sequential scan of {node["Relation Name"]}')
+                    elif 'Filter' in node and 'Relation Name' in node:
+                        failures.append(f'{name}: filter {node["Filter"]} on {node["Relation Name"]}')
+                    elif node['Node Type'] == 'Sort' and sorted_by_index:
+                        failures.append(f'{name}: sort by {", ".join(node["Sort Key"])}')
+
+        if options['check'] and failures:
+            raise CommandError('\n'.join(failures))
@@ -0,0 +1,42 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.invite_codes import InviteCodeIndex
+
+
+class Command(BaseCommand):
+    help = (
+        'Build the invite code index and report its memory use and false '
+        'positive rate, measured with random codes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--probe',
+            type=int,
+            default=10000,
+            help='Number of random codes looked up.'
+        )
+
+    def handle(self, *args, **options):
+        index = InviteCodeIndex()
+        started = time.monotonic()
+        index.build()
+        self.stdout.write(f'built in {time.monotonic() - started:.2f}s')
+
+        rng = random.Random(0)
+        alphabet = string.ascii_uppercase + string.digits
+        started = time.monotonic()
+        for _ in range(options['probe']):
+            index.lookup(''.join(rng.choices(alphabet, k=6)))
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'{options["probe"]} random lookups in {elapsed:.2f}s '
+            f'({elapsed / max(options["probe"], 1) * 1e6:.1f}us each)'
+        )
+
+        for name, value in index.report().items():
+            self.stdout.write(f'{name}: {value}')
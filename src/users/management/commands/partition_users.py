@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from users.partitioning import convert, partition_count
+
+
+class Command(BaseCommand):
+    help = (
+        'Convert the users table to a table partitioned by hash of the ID, '
+        'or back to a plain table with --partitions 0. The table is locked '
+        'and copied in one transaction: run it in a maintenance window and '
+        'restart the application processes afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partitions',
+            type=int,
+            required=True,
+            help='Number of hash partitions, 0 for a plain table.'
+        )
+        parser.add_argument(
+            '--keep-old',
+            action='store_true',
+            help='Keep the previous table as users_user_old.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning requires PostgreSQL.')
+        if options['partitions'] < 0 or options['partitions'] == 1:
+            raise CommandError('--partitions must be 0 or at least 2.')
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            layout = convert(cursor, options['partitions'], keep_old=options['keep_old'])
+            partitions = partition_count(cursor, layout.table)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{layout.table}: {layout.partitions or "no"} partitions before, {partitions or "no"} now.'
+        ))
@@ -0,0 +1,76 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from users.models import AuthCode
+
+PURGE_BATCH = """
+WITH batch AS (
+    SELECT id FROM {table}
+    WHERE id > %(last_id)s
+    ORDER BY id
+    LIMIT %(batch_size)s
+), deleted AS (
+    DELETE FROM {table} AS code
+    USING batch
+    WHERE code.id = batch.id AND code.created < %(cutoff)s
+    RETURNING code.id
+)
+SELECT (SELECT max(id) FROM batch), (SELECT count(*) FROM deleted)
+"""
+
+
+class Command(BaseCommand):
+    help = 'Delete the expired auth codes in small batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of rows scanned per batch.'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Seconds to pause between batches to spread the load.'
+        )
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='Vacuum the table after the purge.'
+        )
+
+    def handle(self, *args, **options):
+        table = connection.ops.quote_name(AuthCode._meta.db_table)
+        cutoff = timezone.now() - timezone.timedelta(
+            minutes=settings.AUTH_CODE_EXPIRES_MINUTES
+        )
+
+        # Each batch is a short transaction walking the primary key, so the
+        # purge never holds locks for long, never rescans the dead rows left by
+        # the previous batches, and lets autovacuum reclaim them as it goes.
+        last_id, total = 0, 0
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(PURGE_BATCH.format(table=table), {
+                    'last_id': last_id,
+                    'batch_size': options['batch_size'],
+                    'cutoff': cutoff,
+                })
+                last_id, deleted = cursor.fetchone()
+            if last_id is None:
+                break
+            total += deleted
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        if options['vacuum'] and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'VACUUM (ANALYZE) {table}')
+
+        self.stdout.write(self.style.SUCCESS(f'Deleted {total} expired auth codes.'))
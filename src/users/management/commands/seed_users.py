@@ -0,0 +1,202 @@
+import csv
+import io
+from datetime import date, datetime, time, timezone
+from itertools import islice
+from time import monotonic
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from config import db
+from referrals import attach
+from users import phones
+from users.models import ArchivedUser
+from users.seeding import REFERRAL_MODELS, generate_users
+
+User = get_user_model()
+
+COLUMNS = (
+    'phone', 'phone_key', 'invite_code', 'invited_by_code', 'invited_count', 'email',
+    'first_name', 'last_name', 'date_joined', 'password', 'is_superuser', 'is_staff',
+    'is_active',
+)
+# Rebuild the indexes when loading at least 1/REBUILD_RATIO of the existing rows
+REBUILD_RATIO = 4
+# Nobody can log in with a password: users authenticate by phone.
+UNUSABLE_PASSWORD = '!'
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate synthetic users with a referral graph and load them with '
+        'COPY. The generated data depends only on the seed and the users '
+        'already in the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            required=True,
+            help='Number of users to generate.'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed of the generator.'
+        )
+        parser.add_argument(
+            '--referral-model',
+            choices=REFERRAL_MODELS,
+            default='preferential',
+            help='How the inviters are chosen, see users.seeding.ReferralGraph.'
+        )
+        parser.add_argument(
+            '--referral-rate',
+            type=float,
+            default=0.6,
+            help='Share of the users invited by another user.'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Period over which the users joined.'
+        )
+        parser.add_argument(
+            '--end',
+            type=date.fromisoformat,
+            help='Date the period ends on (YYYY-MM-DD), today by default.'
+        )
+        parser.add_argument(
+            '--indexes',
+            choices=('auto', 'keep', 'rebuild'),
+            default='auto',
+            help=(
+                'Whether to drop the secondary indexes and unique constraints '
+                'during the load and rebuild them afterwards. Rebuilding is much '
+                'faster per row but covers the whole table: `auto` rebuilds '
+                'when the new rows are at least a quarter of the existing ones.'
+            )
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100000,
+            help='Number of rows per COPY.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('seed_users requires PostgreSQL.')
+        if not 0 <= options['referral_rate'] <= 1:
+            raise CommandError('--referral-rate must be between 0 and 1.')
+
+        table = connection.ops.quote_name(User._meta.db_table)
+        archive = connection.ops.quote_name(ArchivedUser._meta.db_table)
+        with connection.cursor() as cursor:
+            # Raw rows: converting millions of phones to PhoneNumber is slow.
+            # Archived users keep their codes and phones, restored on login.
+            cursor.execute(
+                f'SELECT upper(invite_code), phone, false FROM {table} '
+                f'UNION ALL SELECT upper(invite_code), phone, true FROM {archive}'
+            )
+            existing = cursor.fetchall()
+        existing_users = sum(1 for _, _, archived in existing if not archived)
+        users = generate_users(
+            options['count'],
+            seed=options['seed'],
+            referral_model=options['referral_model'],
+            referral_rate=options['referral_rate'],
+            days=options['days'],
+            end=options['end'] and datetime.combine(options['end'], time.min, timezone.utc),
+            existing_codes=(code for code, _, _ in existing),
+            existing_phones=(phone for _, phone, _ in existing if phone),
+        )
+        sql = 'COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(
+            table, ', '.join(connection.ops.quote_name(column) for column in COLUMNS)
+        )
+
+        rebuild_indexes = options['indexes'] == 'rebuild' or (
+            options['indexes'] == 'auto' and options['count'] * REBUILD_RATIO >= existing_users
+        )
+        started, loaded = monotonic(), 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            if rebuild_indexes:
+                rebuild = self.drop_indexes(cursor, User._meta.db_table)
+            while True:
+                batch = list(islice(users, options['batch_size']))
+                if not batch:
+                    break
+                db.copy_from(cursor, sql, self.to_csv(batch))
+                loaded += len(batch)
+                self.stdout.write(f'{loaded} users loaded')
+            if rebuild_indexes:
+                self.stdout.write(f'Rebuilding {len(rebuild)} indexes and constraints')
+                cursor.execute("SET LOCAL maintenance_work_mem = '256MB'")
+                for statement in rebuild:
+                    cursor.execute(statement)
+            # The loaded users are counted by their inviters.
+            attach.recount()
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {table}')
+
+        elapsed = monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {loaded} users in {elapsed:.1f}s ({loaded / max(elapsed, 1e-9):.0f} rows/s).'
+        ))
+
+    @staticmethod
+    def drop_indexes(cursor, table):
+        """
+        Drop the secondary indexes and unique constraints of the table.
+
+        Return the statements recreating them. The primary key is kept.
+        """
+        cursor.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype = 'u'
+            """,
+            [table]
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid)
+            FROM pg_index
+            WHERE indrelid = %s::regclass
+              AND NOT indisprimary
+              AND indexrelid NOT IN (SELECT conindid FROM pg_constraint)
+            """,
+            [table]
+        )
+        indexes = cursor.fetchall()
+
+        quoted = connection.ops.quote_name(table)
+        for name, _ in constraints:
+            cursor.execute(f'ALTER TABLE {quoted} DROP CONSTRAINT {connection.ops.quote_name(name)}')
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {name}')
+        return [
+            f'ALTER TABLE {quoted} ADD CONSTRAINT {connection.ops.quote_name(name)} {definition}'
+            for name, definition in constraints
+        ] + [definition for _, definition in indexes]
+
+    @staticmethod
+    def to_csv(batch):
+        """Return the CSV of the rows, with empty unquoted fields for NULL."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for user in batch:
+            writer.writerow((
+                user['phone'], phones.to_key(user['phone']), user['invite_code'],
+                user['invited_by_code'], 0, user['email'], user['first_name'],
+                user['last_name'], user['date_joined'].isoformat(), UNUSABLE_PASSWORD,
+                'f', 'f', 't',
+            ))
+        buffer.seek(0)
+        return buffer
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:26
+
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("users", "0002_authcode"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(fields=["-date_joined"], name="users_date_joined_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(
+                fields=["first_name", "-date_joined"], name="users_first_name_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(
+                fields=["last_name", "-date_joined"], name="users_last_name_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(
+                fields=["invited_by_code", "-date_joined"],
+                name="users_invited_by_code_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(
+                django.db.models.functions.text.Upper("invited_by_code"),
+                models.OrderBy(models.F("date_joined"), descending=True),
+                name="users_invited_by_upper_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(
+                django.db.models.functions.text.Upper("invite_code"),
+                name="users_invite_code_upper_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:02
+
+import django.db.models.functions.text
+import django.utils.timezone
+import phonenumber_field.modelfields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_authcode_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedUser',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, verbose_name='superuser status')),
+                ('phone', phonenumber_field.modelfields.PhoneNumberField(blank=True, max_length=12, null=True, region=None, unique=True, verbose_name='phone')),
+                ('invite_code', models.CharField(max_length=6, unique=True, verbose_name='invite code')),
+                ('invited_by_code', models.CharField(blank=True, max_length=6, null=True, verbose_name='invited by code')),
+                ('email', models.EmailField(blank=True, max_length=254, null=True, verbose_name='email')),
+                ('first_name', models.CharField(blank=True, max_length=32, null=True, verbose_name='first name')),
+                ('last_name', models.CharField(blank=True, max_length=32, null=True, verbose_name='last name')),
+                ('is_staff', models.BooleanField(default=False, verbose_name='staff status')),
+                ('is_active', models.BooleanField(default=True, verbose_name='active')),
+                ('date_joined', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='archived at')),
+            ],
+            options={
+                'verbose_name': 'archived user',
+                'verbose_name_plural': 'archived users',
+                'db_table': 'users_archive',
+                'ordering': ['-archived_at'],
+                'indexes': [models.Index(django.db.models.functions.text.Upper('invited_by_code'), name='users_archive_invited_by_idx'), models.Index(django.db.models.functions.text.Upper('invite_code'), name='users_archive_invite_code_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+
+# partition_users replaces the unique constraints of a partitioned users
+# table with guard tables, so the phone key cannot be made unique there.
+PARTITIONED = "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('users_user')"
+
+
+def check_not_partitioned(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(PARTITIONED)
+        row = cursor.fetchone()
+    if row and row[0]:
+        raise RuntimeError(
+            'users_user is partitioned: run `manage.py partition_users --partitions 0` '
+            'before migrating, and partition it again afterwards.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_archiveduser'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_not_partitioned, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='user',
+            name='phone_key',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='phone key'),
+        ),
+        migrations.AddField(
+            model_name='archiveduser',
+            name='phone_key',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='phone key'),
+        ),
+        migrations.AddField(
+            model_name='authcode',
+            name='phone_key',
+            field=models.BigIntegerField(editable=False, null=True, verbose_name='phone key'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+TABLES = ('users_user', 'users_archive', 'users_authcode')
+
+# Rows updated per statement, each committed on its own
+BATCH_SIZE = 10000
+
+# The digits of the E.164 phones, see users.phones.to_key
+BACKFILL = r"""
+UPDATE {table}
+SET phone_key = substring(phone from '^\+(\d{{1,15}})$')::bigint
+WHERE id >= %s AND id < %s AND phone IS NOT NULL AND phone_key IS NULL
+"""
+
+
+def backfill(apps, schema_editor):
+    quote = schema_editor.connection.ops.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        for table in TABLES:
+            cursor.execute(f'SELECT min(id), max(id) FROM {quote(table)}')
+            first, last = cursor.fetchone()
+            if first is None:
+                continue
+            for start in range(first, last + 1, BATCH_SIZE):
+                cursor.execute(BACKFILL.format(table=quote(table)), [start, start + BATCH_SIZE])
+
+
+class Migration(migrations.Migration):
+
+    # Each batch commits, so the rows are locked for one batch at a time.
+    atomic = False
+
+    dependencies = [
+        ('users', '0006_phone_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
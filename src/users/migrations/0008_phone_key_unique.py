@@ -0,0 +1,81 @@
+from django.db import migrations, models
+
+TABLES = ('users_user', 'users_archive', 'users_authcode')
+
+CONSTRAINT_EXISTS = 'SELECT 1 FROM pg_constraint WHERE conrelid = %s::regclass AND conname = %s'
+
+
+def constraint_name(schema_editor, table):
+    """Return the name Django gives the unique constraint of the column."""
+    return schema_editor._create_index_name(table, ['phone_key'], suffix='_uniq')
+
+
+def add_unique(apps, schema_editor):
+    """
+    Build the unique indexes without blocking writes and attach them as constraints.
+
+    An index left invalid by an interrupted build is dropped and rebuilt.
+    """
+    quote = schema_editor.connection.ops.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        for table in TABLES:
+            name = constraint_name(schema_editor, table)
+            cursor.execute(CONSTRAINT_EXISTS, [quote(table), name])
+            if cursor.fetchone():
+                continue
+            cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {quote(name)}')
+            cursor.execute(f'CREATE UNIQUE INDEX CONCURRENTLY {quote(name)} ON {quote(table)} (phone_key)')
+            cursor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} UNIQUE USING INDEX {quote(name)}')
+
+
+def remove_unique(apps, schema_editor):
+    quote = schema_editor.connection.ops.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        for table in TABLES:
+            name = constraint_name(schema_editor, table)
+            cursor.execute(f'ALTER TABLE {quote(table)} DROP CONSTRAINT IF EXISTS {quote(name)}')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('users', '0007_phone_key_backfill'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(add_unique, remove_unique),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='user',
+                    name='phone_key',
+                    field=models.BigIntegerField(
+                        blank=True, editable=False, null=True, unique=True, verbose_name='phone key'
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name='archiveduser',
+                    name='phone_key',
+                    field=models.BigIntegerField(
+                        blank=True, editable=False, null=True, unique=True, verbose_name='phone key'
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name='authcode',
+                    name='phone_key',
+                    field=models.BigIntegerField(editable=False, null=True, unique=True, verbose_name='phone key'),
+                ),
+            ],
+        ),
+        # The auth codes table only holds the pending codes, so scanning it
+        # under the lock of SET NOT NULL is short.
+        migrations.AlterField(
+            model_name='authcode',
+            name='phone_key',
+            field=models.BigIntegerField(editable=False, unique=True, verbose_name='phone key'),
+        ),
+    ]
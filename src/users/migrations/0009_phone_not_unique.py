@@ -0,0 +1,33 @@
+import phonenumber_field.modelfields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_phone_key_unique'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='phone',
+            field=phonenumber_field.modelfields.PhoneNumberField(
+                blank=True, max_length=12, null=True, region=None, verbose_name='phone'
+            ),
+        ),
+        migrations.AlterField(
+            model_name='archiveduser',
+            name='phone',
+            field=phonenumber_field.modelfields.PhoneNumberField(
+                blank=True, max_length=12, null=True, region=None, verbose_name='phone'
+            ),
+        ),
+        migrations.AlterField(
+            model_name='authcode',
+            name='phone',
+            field=phonenumber_field.modelfields.PhoneNumberField(
+                max_length=12, region=None, verbose_name='phone'
+            ),
+        ),
+    ]
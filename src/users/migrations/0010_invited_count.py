@@ -0,0 +1,42 @@
+from django.db import migrations, models
+
+# The invitees of each user, archived or not, see referrals.attach.RECOUNT
+RECOUNT = """
+WITH counts AS (
+    SELECT upper(invited_by_code) AS code, count(*) AS invited
+    FROM (
+        SELECT invited_by_code FROM users_user
+        UNION ALL
+        SELECT invited_by_code FROM users_archive
+    ) AS invitees
+    WHERE invited_by_code IS NOT NULL
+    GROUP BY 1
+)
+UPDATE {table} AS inviter SET invited_count = counts.invited
+FROM counts
+WHERE upper(inviter.invite_code) = counts.code
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_phone_not_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='invited_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='invited count'),
+        ),
+        migrations.AddField(
+            model_name='archiveduser',
+            name='invited_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='invited count'),
+        ),
+        *(
+            migrations.RunSQL(sql=RECOUNT.format(table=table), reverse_sql=migrations.RunSQL.noop)
+            for table in ('users_user', 'users_archive')
+        ),
+    ]
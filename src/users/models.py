@@ -6,12 +6,26 @@ from django.contrib.auth.base_user import AbstractBaseUser
 from django.contrib.auth.models import PermissionsMixin
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Upper
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from phonenumber_field.modelfields import PhoneNumberField
 
+from . import invite_codes, phones
 from .managers import UserManager
 
+# Written by referrals.attach only
+REFERRAL_FIELDS = ('invited_by_code', 'invited_count')
+
+
+def set_phone_key(instance, save_kwargs):
+    """Set the phone key of the instance being saved from its phone."""
+    instance.phone_key = phones.to_key(instance.phone)
+    update_fields = save_kwargs.get('update_fields')
+    if update_fields is not None and 'phone' in update_fields:
+        save_kwargs['update_fields'] = {*update_fields, 'phone_key'}
+
 
 class User(AbstractBaseUser, PermissionsMixin):
     """Custom user model for the application."""
@@ -19,10 +33,17 @@ class User(AbstractBaseUser, PermissionsMixin):
     phone = PhoneNumberField(
         verbose_name=_('phone'),
         max_length=12,
-        unique=True,
         blank=True,
         null=True
     )
+    # Unique and looked up instead of the phone, see users.phones
+    phone_key = models.BigIntegerField(
+        verbose_name=_('phone key'),
+        unique=True,
+        blank=True,
+        null=True,
+        editable=False
+    )
     invite_code = models.CharField(
         verbose_name=_('invite code'),
         max_length=6,
@@ -35,6 +56,11 @@ class User(AbstractBaseUser, PermissionsMixin):
         blank=True,
         null=True
     )
+    invited_count = models.PositiveIntegerField(
+        verbose_name=_('invited count'),
+        default=0,
+        editable=False
+    )
     email = models.EmailField(
         verbose_name=_('email'),
         unique=True,
@@ -77,6 +103,33 @@ class User(AbstractBaseUser, PermissionsMixin):
         verbose_name = _('user')
         verbose_name_plural = _('users')
         ordering = ['-date_joined']
+        indexes = [
+            models.Index(
+                fields=['-date_joined'],
+                name='users_date_joined_idx'
+            ),
+            models.Index(
+                fields=['first_name', '-date_joined'],
+                name='users_first_name_idx'
+            ),
+            models.Index(
+                fields=['last_name', '-date_joined'],
+                name='users_last_name_idx'
+            ),
+            models.Index(
+                fields=['invited_by_code', '-date_joined'],
+                name='users_invited_by_code_idx'
+            ),
+            models.Index(
+                Upper('invited_by_code'),
+                F('date_joined').desc(),
+                name='users_invited_by_upper_idx'
+            ),
+            models.Index(
+                Upper('invite_code'),
+                name='users_invite_code_upper_idx'
+            ),
+        ]
 
     def __str__(self):
         """Return the invite code of the user as a string.
@@ -98,8 +151,18 @@ class User(AbstractBaseUser, PermissionsMixin):
         """
         if self._state.adding:
             self.invite_code = self.generate_invite_code()
+        elif kwargs.get('update_fields') is None:
+            # The referral is only changed by the conditional updates of
+            # referrals.attach, which a stale instance must not overwrite.
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in REFERRAL_FIELDS
+                and field.attname not in deferred
+            ]
         if self.email:
             self.email = self.email.lower()
+        set_phone_key(self, kwargs)
         super().save(*args, **kwargs)
 
     def clean(self):
@@ -108,6 +171,7 @@ class User(AbstractBaseUser, PermissionsMixin):
         Raises:
             ValidationError: If invited_by_code is the same as the invite_code.
             ValidationError: If the user with invited_by_code does not exist.
+            ValidationError: If another user has the same phone.
 
         """
         if self.invited_by_code:
@@ -116,12 +180,16 @@ class User(AbstractBaseUser, PermissionsMixin):
                     {'invited_by_code': 'Cannot specify your own code.'}
                 )
 
-            try:
-                User.objects.get(invite_code__iexact=self.invited_by_code)
-            except User.DoesNotExist:
+            if invite_codes.lookup(self.invited_by_code) is None:
                 raise ValidationError(
                     {'invited_by_code': 'User with this code does not exist.'}
                 )
+        # The phone is unique through its key, which forms do not validate.
+        phone_key = phones.to_key(self.phone)
+        if phone_key and User.objects.filter(phone_key=phone_key).exclude(pk=self.pk).exists():
+            raise ValidationError(
+                {'phone': 'User with this phone already exists.'}
+            )
         super().clean()
 
     def generate_invite_code(self):
@@ -135,18 +203,132 @@ class User(AbstractBaseUser, PermissionsMixin):
             code = ''.join(random.choices(
                 string.ascii_uppercase + string.digits, k=6
             ))
-            if not User.objects.filter(invite_code__iexact=code).exists():
+            # Archived users keep their codes, they can be restored.
+            if not (
+                User.objects.filter(invite_code__iexact=code).exists()
+                or ArchivedUser.objects.filter(invite_code__iexact=code).exists()
+            ):
                 return code
 
 
-class AuthCode(models.Model):
-    """Model for storing authorization codes."""
+class ArchivedUser(models.Model):
+    """
+    User moved to cold storage, see `users.archive`.
 
+    The row keeps the ID, the invite code and the referral of the user, so
+    the user can be moved back when logging in again.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    password = models.CharField(_('password'), max_length=128)
+    last_login = models.DateTimeField(_('last login'), blank=True, null=True)
+    is_superuser = models.BooleanField(_('superuser status'), default=False)
     phone = PhoneNumberField(
         verbose_name=_('phone'),
         max_length=12,
+        blank=True,
+        null=True
+    )
+    phone_key = models.BigIntegerField(
+        verbose_name=_('phone key'),
+        unique=True,
+        blank=True,
+        null=True,
+        editable=False
+    )
+    invite_code = models.CharField(
+        verbose_name=_('invite code'),
+        max_length=6,
         unique=True
     )
+    invited_by_code = models.CharField(
+        verbose_name=_('invited by code'),
+        max_length=6,
+        blank=True,
+        null=True
+    )
+    invited_count = models.PositiveIntegerField(
+        verbose_name=_('invited count'),
+        default=0,
+        editable=False
+    )
+    email = models.EmailField(
+        verbose_name=_('email'),
+        max_length=254,
+        blank=True,
+        null=True
+    )
+    first_name = models.CharField(
+        verbose_name=_('first name'),
+        max_length=32,
+        blank=True,
+        null=True
+    )
+    last_name = models.CharField(
+        verbose_name=_('last name'),
+        max_length=32,
+        blank=True,
+        null=True
+    )
+    is_staff = models.BooleanField(
+        verbose_name=_('staff status'),
+        default=False
+    )
+    is_active = models.BooleanField(
+        verbose_name=_('active'),
+        default=True
+    )
+    date_joined = models.DateTimeField(
+        verbose_name=_('date joined'),
+        default=timezone.now,
+    )
+    archived_at = models.DateTimeField(
+        verbose_name=_('archived at'),
+        default=timezone.now,
+    )
+
+    class Meta:
+        """Metadata."""
+
+        db_table = 'users_archive'
+        verbose_name = _('archived user')
+        verbose_name_plural = _('archived users')
+        ordering = ['-archived_at']
+        indexes = [
+            models.Index(
+                Upper('invited_by_code'),
+                name='users_archive_invited_by_idx'
+            ),
+            models.Index(
+                Upper('invite_code'),
+                name='users_archive_invite_code_idx'
+            ),
+        ]
+
+    def __str__(self):
+        """Return the invite code of the user as a string."""
+        return str(self.invite_code)
+
+    def to_user(self):
+        """Return an unsaved User with the fields of the archived user."""
+        return User(**{
+            field.attname: getattr(self, field.attname)
+            for field in User._meta.concrete_fields
+        })
+
+
+class AuthCode(models.Model):
+    """Model for storing authorization codes."""
+
+    phone = PhoneNumberField(
+        verbose_name=_('phone'),
+        max_length=12
+    )
+    phone_key = models.BigIntegerField(
+        verbose_name=_('phone key'),
+        unique=True,
+        editable=False
+    )
     code = models.CharField(
         verbose_name=_('code')
     )
@@ -162,6 +344,11 @@ class AuthCode(models.Model):
         verbose_name_plural = 'Коды авторизации'
         ordering = ['-created']
 
+    def save(self, *args, **kwargs):
+        """Save the code, keying it by the phone."""
+        set_phone_key(self, kwargs)
+        super().save(*args, **kwargs)
+
     def expire_date(self):
         """
         Calculate the expiration date for the authorization code.
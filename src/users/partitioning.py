@@ -0,0 +1,300 @@
+"""
+Hash partitioning of the users table.
+
+The table can be converted between a plain table and a table partitioned
+by hash of `id` with `manage.py partition_users`. The ID never changes, so
+rows never move between partitions, and the lookups of a user by ID (the
+user endpoints, the token authentication) are pruned to one partition.
+
+PostgreSQL only enforces unique constraints that include the partition
+key, so on the partitioned table the model's unique columns (`phone_key`,
+`email`, `invite_code`) are guarded by one table per column, holding each
+value with the ID of its user. Triggers keep them up to date, and their
+primary keys reject duplicates with the same IntegrityError as a unique
+constraint. They also serve as global indexes: the user filters on these
+columns look up the ID in the guard table first, so the query is pruned to
+one partition instead of probing the index of every partition.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+
+PARTITION_KEY = 'id'
+
+GUARD_FUNCTION = """
+CREATE FUNCTION {function}() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' AND OLD.{column} IS NOT NULL
+       AND (TG_OP = 'DELETE' OR NEW.{column} IS DISTINCT FROM OLD.{column}) THEN
+        DELETE FROM {guard} WHERE value = OLD.{column};
+    END IF;
+    IF TG_OP <> 'DELETE' AND NEW.{column} IS NOT NULL
+       AND (TG_OP = 'INSERT' OR NEW.{column} IS DISTINCT FROM OLD.{column}) THEN
+        INSERT INTO {guard} (value, user_id) VALUES (NEW.{column}, NEW.{key});
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+INDEX_TARGET = re.compile(r' ON (ONLY )?\S+ USING ')
+
+
+def quote(name):
+    """Quote the identifier."""
+    return connection.ops.quote_name(name)
+
+
+def guard_name(table, column):
+    """Return the name of the guard table of the column."""
+    return f'{table}_{column}_unique'
+
+
+@dataclass
+class TableLayout:
+    """Definition of the users table that is kept across conversions."""
+
+    table: str
+    unique_columns: list
+    index_definitions: list
+    foreign_keys: list
+    partitions: int
+
+
+def unique_columns():
+    """Return the columns the model declares unique, besides the key."""
+    User = get_user_model()
+    return [
+        field.column for field in User._meta.concrete_fields
+        if field.unique and not field.primary_key
+    ]
+
+
+def partition_count(cursor, table, schema='public'):
+    """Return the number of partitions of the table, 0 if it is plain."""
+    cursor.execute(
+        """
+        SELECT count(inhrelid)
+        FROM pg_partitioned_table
+        LEFT JOIN pg_inherits ON inhparent = partrelid
+        WHERE partrelid = %s::regclass
+        GROUP BY partrelid
+        """,
+        [f'{quote(schema)}.{quote(table)}']
+    )
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def inspect_table(cursor, table):
+    """Return the layout of the table in the public schema."""
+    qualified = f'public.{quote(table)}'
+    cursor.execute(
+        """
+        SELECT pg_get_indexdef(indexrelid)
+        FROM pg_index
+        WHERE indrelid = %s::regclass
+          AND NOT indisprimary
+          AND indexrelid NOT IN (SELECT conindid FROM pg_constraint)
+        ORDER BY indexrelid
+        """,
+        [qualified]
+    )
+    index_definitions = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        """
+        SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE confrelid = %s::regclass AND contype = 'f'
+        """,
+        [qualified]
+    )
+    return TableLayout(
+        table=table,
+        unique_columns=unique_columns(),
+        index_definitions=index_definitions,
+        foreign_keys=cursor.fetchall(),
+        partitions=partition_count(cursor, table),
+    )
+
+
+def create_table(cursor, layout, like, schema, partitions):
+    """
+    Create an empty users table in the schema, plain or partitioned.
+
+    The columns are copied from the `like` table. The unique columns get
+    unique constraints on a plain table and guard tables, filled by
+    `create_guards` once the data is loaded, on a partitioned one.
+    """
+    target = f'{quote(schema)}.{quote(layout.table)}'
+    cursor.execute(
+        f'CREATE TABLE {target} (LIKE {like} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS)'
+        + (f' PARTITION BY HASH ({quote(PARTITION_KEY)})' if partitions else '')
+    )
+    for remainder in range(partitions):
+        cursor.execute(
+            f'CREATE TABLE {quote(schema)}.{quote(f"{layout.table}_p{remainder}")} '
+            f'PARTITION OF {target} FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})'
+        )
+    cursor.execute(f'ALTER TABLE {target} ADD PRIMARY KEY ({quote(PARTITION_KEY)})')
+    if not partitions:
+        for column in layout.unique_columns:
+            cursor.execute(f'ALTER TABLE {target} ADD UNIQUE ({quote(column)})')
+    return target
+
+
+def create_indexes(cursor, layout, target):
+    """Create the secondary indexes of the layout on the table."""
+    for definition in layout.index_definitions:
+        cursor.execute(INDEX_TARGET.sub(f' ON {target} USING ', definition, count=1))
+
+
+def column_type(cursor, table, column):
+    """Return the SQL type of the column of the table."""
+    cursor.execute(
+        """
+        SELECT format_type(atttypid, atttypmod)
+        FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attname = %s
+        """,
+        [table, column]
+    )
+    return cursor.fetchone()[0]
+
+
+def create_guards(cursor, layout, schema, target):
+    """Create, fill and attach the guard tables of the unique columns."""
+    for column in layout.unique_columns:
+        name = guard_name(layout.table, column)
+        guard = f'{quote(schema)}.{quote(name)}'
+        function = f'{quote(schema)}.{quote(f"{name}_guard")}'
+        cursor.execute(
+            f'CREATE TABLE {guard} '
+            f'(value {column_type(cursor, target, column)} PRIMARY KEY, user_id bigint NOT NULL)'
+        )
+        cursor.execute(
+            f'INSERT INTO {guard} (value, user_id) '
+            f'SELECT {quote(column)}, {quote(PARTITION_KEY)} FROM {target} '
+            f'WHERE {quote(column)} IS NOT NULL'
+        )
+        cursor.execute(GUARD_FUNCTION.format(
+            function=function, guard=guard, column=quote(column), key=quote(PARTITION_KEY)
+        ))
+        cursor.execute(
+            f'CREATE TRIGGER {quote(f"{name}_guard")} '
+            f'AFTER INSERT OR UPDATE OF {quote(column)} OR DELETE ON {target} '
+            f'FOR EACH ROW EXECUTE FUNCTION {function}()'
+        )
+
+
+def drop_guards(cursor, layout, schema='public'):
+    """Drop the guard tables and triggers of the unique columns."""
+    for column in layout.unique_columns:
+        name = guard_name(layout.table, column)
+        cursor.execute(f'DROP FUNCTION IF EXISTS {quote(schema)}.{quote(f"{name}_guard")}() CASCADE')
+        cursor.execute(f'DROP TABLE IF EXISTS {quote(schema)}.{quote(name)}')
+
+
+def rename_table(cursor, table, new_name):
+    """
+    Rename the table with its partitions, indexes and identity sequence.
+
+    Names starting with the table name get the new one, others a suffix.
+    """
+    cursor.execute(
+        """
+        SELECT c.relname, c.relkind
+        FROM pg_class c
+        WHERE c.oid IN (
+            SELECT indexrelid FROM pg_index
+            WHERE indrelid = %(table)s::regclass
+               OR indrelid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %(table)s::regclass)
+            UNION
+            SELECT inhrelid FROM pg_inherits WHERE inhparent = %(table)s::regclass
+            UNION
+            SELECT pg_get_serial_sequence(%(table)s, %(key)s)::regclass
+        )
+        """,
+        {'table': quote(table), 'key': PARTITION_KEY}
+    )
+    relations = cursor.fetchall()
+    cursor.execute(f'ALTER TABLE {quote(table)} RENAME TO {quote(new_name)}')
+    for name, kind in relations:
+        renamed = quote(new_name + name[len(table):] if name.startswith(table) else f'{name}_old')
+        if kind == 'S':
+            cursor.execute(f'ALTER SEQUENCE {quote(name)} RENAME TO {renamed}')
+        elif kind in ('i', 'I'):
+            cursor.execute(f'ALTER INDEX {quote(name)} RENAME TO {renamed}')
+        else:
+            cursor.execute(f'ALTER TABLE {quote(name)} RENAME TO {renamed}')
+
+
+def convert(cursor, partitions, keep_old=False):
+    """
+    Rebuild the users table with the given number of hash partitions.
+
+    With 0 partitions the table becomes a plain table again. The table is
+    locked and copied in the current transaction, so the conversion needs
+    a maintenance window proportional to the table size. The foreign keys
+    referencing the table are moved to the new one.
+    """
+    User = get_user_model()
+    table = User._meta.db_table
+    cursor.execute(f'LOCK TABLE {quote(table)} IN ACCESS EXCLUSIVE MODE')
+    layout = inspect_table(cursor, table)
+
+    old = f'{table}_old'
+    for relation, name, _ in layout.foreign_keys:
+        cursor.execute(f'ALTER TABLE {relation} DROP CONSTRAINT {quote(name)}')
+    drop_guards(cursor, layout)
+    rename_table(cursor, table, old)
+
+    target = create_table(cursor, layout, quote(old), 'public', partitions)
+    columns = ', '.join(quote(field.column) for field in User._meta.concrete_fields)
+    cursor.execute(f'INSERT INTO {target} ({columns}) SELECT {columns} FROM {quote(old)}')
+    cursor.execute(
+        'SELECT setval(pg_get_serial_sequence(%s, %s), '
+        f'(SELECT coalesce(max({quote(PARTITION_KEY)}), 0) + 1 FROM {target}), false)',
+        [target, PARTITION_KEY]
+    )
+    create_indexes(cursor, layout, target)
+    if partitions:
+        create_guards(cursor, layout, 'public', target)
+    for relation, name, definition in layout.foreign_keys:
+        cursor.execute(f'ALTER TABLE {relation} ADD CONSTRAINT {quote(name)} {definition}')
+    if not keep_old:
+        cursor.execute(f'DROP TABLE {quote(old)}')
+    cursor.execute(f'ANALYZE {target}')
+    return layout
+
+
+@lru_cache(maxsize=None)
+def is_partitioned():
+    """Check once per process whether the users table is partitioned."""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        return partition_count(cursor, get_user_model()._meta.db_table) > 0
+
+
+def filter_unique(queryset, column, value):
+    """
+    Restrict the queryset to the user with the unique value, by ID.
+
+    On the partitioned table the ID is looked up in the guard table first
+    and passed to the query as a constant, so the planner prunes it to the
+    partition of the user. The queryset is returned as is if the value is
+    unknown or the table is plain, where the unique index of the column is
+    used directly.
+    """
+    if not is_partitioned():
+        return queryset
+    guard = quote(guard_name(queryset.model._meta.db_table, column))
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'SELECT user_id FROM {guard} WHERE value = %s', [value])
+        row = cursor.fetchone()
+    return queryset if row is None else queryset.filter(pk=row[0])
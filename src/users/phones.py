@@ -0,0 +1,69 @@
+"""
+Phone number keys.
+
+Phones are stored twice: `phone`, the E.164 string returned to clients,
+and `phone_key`, the digits of the same E.164 number as a bigint. Country
+codes never start with 0, so the key is lossless (`+79991234567` is
+`79991234567`). The unique indexes are on the key, and phone lookups filter
+on it: 8 fixed-width bytes compared as integers instead of a variable-length
+string compared by collation.
+
+Parsing and validating an input with `phonenumbers` takes tens of
+microseconds, and the same phones come back with every code request and
+login, so `parse` memoizes them per process.
+"""
+
+import re
+from functools import lru_cache
+
+import phonenumbers
+from django.conf import settings
+from phonenumber_field.phonenumber import PhoneNumber, to_python
+
+E164 = re.compile(r'^\+(\d{1,15})$')
+
+
+def to_key(phone):
+    """Return the key of the phone number or E.164 string, None if it has none."""
+    if phone is None:
+        return None
+    if isinstance(phone, phonenumbers.PhoneNumber):
+        if not phone.national_number:
+            return None
+        # format_number does not validate the number again, unlike as_e164.
+        phone = phonenumbers.format_number(phone, phonenumbers.PhoneNumberFormat.E164)
+    match = E164.match(str(phone))
+    return int(match[1]) if match else None
+
+
+def from_key(key):
+    """Return the E.164 string of the key."""
+    return f'+{key}'
+
+
+@lru_cache(maxsize=settings.PHONE_PARSE_CACHE_SIZE)
+def _parse(value, region):
+    phone = to_python(value, region=region)
+    if not phone.is_valid():
+        return None
+    return phone, to_key(phone)
+
+
+def parse(value, region=None):
+    """
+    Return the phone number of the input, None if it is not a valid number.
+
+    The parsed numbers are cached, so each call returns a copy.
+    """
+    parsed = _parse(value, region or getattr(settings, 'PHONENUMBER_DEFAULT_REGION', None))
+    if parsed is None:
+        return None
+    phone = PhoneNumber()
+    phone.merge_from(parsed[0])
+    return phone
+
+
+def parse_key(value, region=None):
+    """Return the key of the phone number input, None if it is not a valid number."""
+    parsed = _parse(value, region or getattr(settings, 'PHONENUMBER_DEFAULT_REGION', None))
+    return parsed and parsed[1]
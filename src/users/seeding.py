@@ -0,0 +1,137 @@
+"""
+Deterministic generation of synthetic users.
+
+Invite codes and phone numbers are produced by affine permutations of the
+row number (`a * n + b` modulo the size of the code or phone space, with `a`
+coprime to it), so they are unique without checking the ones generated
+before, and everything derives from the seed: the same seed on the same
+database always generates the same users.
+"""
+
+import math
+import random
+import string
+from datetime import datetime, timedelta, timezone
+
+CODE_ALPHABET = string.digits + string.ascii_uppercase
+CODE_LENGTH = 6
+CODE_SPACE = len(CODE_ALPHABET) ** CODE_LENGTH
+PHONE_PREFIX = '+79'
+PHONE_SPACE = 10 ** 9
+
+REFERRAL_MODELS = ('none', 'uniform', 'preferential')
+
+FIRST_NAMES = (
+    'Alexander', 'Anna', 'Artem', 'Daria', 'Dmitry', 'Elena', 'Ivan',
+    'Maria', 'Maxim', 'Natalia', 'Nikita', 'Olga', 'Pavel', 'Sofia',
+    'Timur', 'Victoria', 'Azat', 'Aigul', 'Ruslan', 'Kamila',
+)
+LAST_NAMES = (
+    'Ivanov', 'Smirnov', 'Kuznetsov', 'Popov', 'Vasiliev', 'Petrov',
+    'Sokolov', 'Mikhailov', 'Novikov', 'Fedorov', 'Morozov', 'Volkov',
+    'Alekseev', 'Lebedev', 'Semenov', 'Egorov', 'Temirov', 'Sadykov',
+)
+
+
+def affine_permutation(rng, space, coprime_to):
+    """Return a random bijection of `range(space)` onto itself."""
+    while True:
+        a = rng.randrange(1, space)
+        if math.gcd(a, coprime_to) == 1:
+            break
+    b = rng.randrange(space)
+    return lambda n: (a * n + b) % space
+
+
+def encode_code(number):
+    """Return the invite code of the number in the code space."""
+    chars = []
+    for _ in range(CODE_LENGTH):
+        number, index = divmod(number, len(CODE_ALPHABET))
+        chars.append(CODE_ALPHABET[index])
+    return ''.join(reversed(chars))
+
+
+class ReferralGraph:
+    """
+    Choice of the inviter of each new user.
+
+    - `none`: nobody is invited.
+    - `uniform`: the inviter is any of the previous users.
+    - `preferential`: the inviter is chosen with a probability proportional
+      to the number of users they already invited plus one, which gives
+      the power-law distribution of invitations of real referral programs,
+      with a few users inviting most of the others.
+    """
+
+    def __init__(self, model, rate, rng):
+        if model not in REFERRAL_MODELS:
+            raise ValueError(f'Unknown referral model {model!r}.')
+        self.model = model
+        self.rate = rate
+        self.rng = rng
+        self.count = 0
+        # Each user appears once, plus once for each user they invited.
+        self.weighted = []
+
+    def choose(self):
+        """Return the index of the inviter of the next user or None."""
+        inviter = None
+        if self.model != 'none' and self.count and self.rng.random() < self.rate:
+            if self.model == 'uniform':
+                inviter = self.rng.randrange(self.count)
+            else:
+                inviter = self.rng.choice(self.weighted)
+                self.weighted.append(inviter)
+        if self.model == 'preferential':
+            self.weighted.append(self.count)
+        self.count += 1
+        return inviter
+
+
+def generate_users(count, seed=0, referral_model='preferential', referral_rate=0.6,
+                   days=365, end=None, existing_codes=(), existing_phones=()):
+    """
+    Yield the field values of `count` synthetic users.
+
+    Users join in order over the `days` days before `end` (the start of the
+    current day in UTC by default) and can only be invited by the users who
+    joined before them. Codes and phones already taken by `existing_codes`
+    and `existing_phones` are skipped.
+    """
+    rng = random.Random(seed)
+    code_of = affine_permutation(rng, CODE_SPACE, CODE_SPACE)
+    phone_of = affine_permutation(rng, PHONE_SPACE, PHONE_SPACE)
+    graph = ReferralGraph(referral_model, referral_rate, rng)
+    existing_codes, existing_phones = set(existing_codes), set(existing_phones)
+
+    if end is None:
+        end = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=days)
+    step = timedelta(days=days) / max(count, 1)
+    codes = []
+    code_number = phone_number = 0
+    for index in range(count):
+        code = encode_code(code_of(code_number))
+        while code in existing_codes:
+            code_number += 1
+            code = encode_code(code_of(code_number))
+        code_number += 1
+        phone = PHONE_PREFIX + f'{phone_of(phone_number):09d}'
+        while phone in existing_phones:
+            phone_number += 1
+            phone = PHONE_PREFIX + f'{phone_of(phone_number):09d}'
+        phone_number += 1
+
+        codes.append(code)
+        inviter = graph.choose()
+        named = rng.random() < 0.7
+        yield {
+            'phone': phone,
+            'invite_code': code,
+            'invited_by_code': codes[inviter] if inviter is not None else None,
+            'email': f'{code.lower()}@example.com' if rng.random() < 0.5 else None,
+            'first_name': rng.choice(FIRST_NAMES) if named else None,
+            'last_name': rng.choice(LAST_NAMES) if named else None,
+            'date_joined': start + step * index + timedelta(seconds=rng.random() * step.total_seconds()),
+        }
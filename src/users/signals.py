@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.db import connections, transaction
+
+from . import invite_codes
+from .models import AuthCode
+
+
+def apply_auth_code_storage(sender, using, **kwargs):
+    """
+    Make the auth code table logged or unlogged as configured.
+
+    Called after migrations, so the table persistence follows the
+    `AUTH_CODE_UNLOGGED` setting. The table is altered only when its
+    persistence differs, as the change rewrites the table.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+
+    table = AuthCode._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            # No row when the table does not exist, e.g. after `migrate users zero`.
+            'SELECT relpersistence FROM pg_class WHERE oid = to_regclass(%s)',
+            [connection.ops.quote_name(table)]
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return
+        unlogged = row[0] == 'u'
+        if unlogged != settings.AUTH_CODE_UNLOGGED:
+            persistence = 'UNLOGGED' if settings.AUTH_CODE_UNLOGGED else 'LOGGED'
+            cursor.execute(
+                f'ALTER TABLE {connection.ops.quote_name(table)} SET {persistence}'
+            )
+
+
+def add_invite_code(sender, instance, created, **kwargs):
+    """Add the code of a new user to the invite code index on commit."""
+    if created and settings.INVITE_CODE_INDEX_ENABLED:
+        transaction.on_commit(
+            lambda: invite_codes.get_index().add(instance.invite_code, instance.pk)
+        )
+
+
+def discard_invite_code(sender, instance, **kwargs):
+    """Forget the code of a deleted user in the invite code index."""
+    if settings.INVITE_CODE_INDEX_ENABLED:
+        invite_codes.get_index().discard(instance.invite_code)
+
+
+def forget_invitee(sender, instance, **kwargs):
+    """Decrement the invited count of the inviter of a deleted user."""
+    from referrals import attach
+
+    if instance.invited_by_code:
+        attach.forget_invitee(instance.invited_by_code)
@@ -0,0 +1,11 @@
+from django.contrib.auth import get_user_model
+from django.utils.dateparse import parse_datetime
+
+from tasks.registry import task
+
+
+@task
+def record_login(user_id, logged_in_at):
+    """Store the time of the user's last login."""
+    User = get_user_model()
+    User.objects.filter(pk=user_id).update(last_login=parse_datetime(logged_in_at))